@@ -0,0 +1,210 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import unquote
+
+# Configuration
+CACHE_DIRECTORY = 'article_cache'
+MAX_CACHE_SIZE = 2 * 1024 ** 3      # compressed bytes kept on disk
+MAX_AGE = 24 * 60 * 60              # seconds an entry is served without revalidation
+
+
+class CacheMiss(KeyError):
+    """Raised in offline mode for a page which is not in the cache."""
+
+
+def normalize_path(url):
+    """
+    Normalize an article link so that different spellings of the same page
+    share one cache entry, e.g. '/wiki/Polish%20language#History' becomes
+    '/wiki/Polish_language'.
+
+    :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+    :return: Normalized link.
+    """
+    return unquote(url.split('#')[0]).replace(' ', '_')
+
+
+class ArticleCache:
+    """
+    A content-addressed on-disk cache of fetched article pages.
+
+    Pages are stored gzip-compressed under the SHA-256 of their content, so
+    pages reached through several links are kept once. An SQLite index maps
+    normalized links to the stored content together with the ETag and
+    Last-Modified validators used to revalidate stale entries.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, max_size=MAX_CACHE_SIZE,
+                 max_age=MAX_AGE, offline=False):
+        """
+        Open (or create) the cache in the given directory.
+
+        :param directory: Directory holding the index and compressed pages.
+        :param max_size: Maximum size of the compressed pages in bytes; least
+                         recently used pages are evicted above it.
+        :param max_age: Age in seconds after which an entry is revalidated.
+        :param offline: If True, pages are served only from the cache and
+                        missing pages raise CacheMiss.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+        self.offline = offline
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, 'index.sqlite'),
+                                  check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                path TEXT PRIMARY KEY, digest TEXT, etag TEXT,
+                last_modified TEXT, fetched_at REAL, last_used REAL);
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY, size INTEGER);
+            CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+        """)
+        self.total_size = self.db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def blob_path(self, digest):
+        """Return the path of the compressed page with the given digest."""
+        return os.path.join(self.directory, 'objects', digest[:2], digest + '.gz')
+
+    def read(self, digest):
+        """Read and decompress the stored page with the given digest."""
+        with gzip.open(self.blob_path(digest), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def lookup(self, path):
+        """
+        Find the index entry of a normalized link.
+
+        :param path: Normalized link of the article.
+        :return: A tuple (digest, etag, last_modified, fetched_at) or None.
+        """
+        with self.lock:
+            return self.db.execute(
+                'SELECT digest, etag, last_modified, fetched_at FROM pages WHERE path = ?',
+                (path,)).fetchone()
+
+    def touch(self, path, fetched=False):
+        """Mark the entry as used now, and as revalidated if fetched is True."""
+        now = time.time()
+        with self.lock:
+            if fetched:
+                self.db.execute('UPDATE pages SET last_used = ?, fetched_at = ? WHERE path = ?',
+                                (now, now, path))
+            else:
+                self.db.execute('UPDATE pages SET last_used = ? WHERE path = ?', (now, path))
+            self.db.commit()
+
+    def store(self, path, text, etag=None, last_modified=None):
+        """
+        Store a fetched page and evict old pages if the cache grew too big.
+
+        :param path: Normalized link of the article.
+        :param text: The HTML content of the article.
+        :param etag: ETag header of the response, if any.
+        :param last_modified: Last-Modified header of the response, if any.
+        """
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self.blob_path(digest)
+        now = time.time()
+
+        with self.lock:
+            if self.db.execute('SELECT 1 FROM blobs WHERE digest = ?', (digest,)).fetchone() is None:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                temporary_path = f'{blob_path}.{threading.get_ident()}.tmp'
+                with gzip.open(temporary_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temporary_path, blob_path)
+                size = os.path.getsize(blob_path)
+                self.db.execute('INSERT INTO blobs VALUES (?, ?)', (digest, size))
+                self.total_size += size
+
+            previous = self.db.execute('SELECT digest FROM pages WHERE path = ?', (path,)).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+                            (path, digest, etag, last_modified, now, now))
+            if previous is not None and previous[0] != digest:
+                self.remove_unreferenced_blob(previous[0])
+            self.evict()
+            self.db.commit()
+
+    def remove_unreferenced_blob(self, digest):
+        """Delete a stored page no index entry points to anymore."""
+        if self.db.execute('SELECT 1 FROM pages WHERE digest = ?', (digest,)).fetchone() is not None:
+            return
+        size = self.db.execute('SELECT size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        if size is None:
+            return
+        self.db.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+        self.total_size -= size[0]
+        try:
+            os.remove(self.blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_size."""
+        while self.total_size > self.max_size:
+            oldest = self.db.execute(
+                'SELECT path, digest FROM pages ORDER BY last_used LIMIT 1').fetchone()
+            if oldest is None:
+                break
+            self.db.execute('DELETE FROM pages WHERE path = ?', (oldest[0],))
+            self.remove_unreferenced_blob(oldest[1])
+
+    def fetch(self, get, url, variant=''):
+        """
+        Return the page for the given link, from the cache when it is fresh,
+        otherwise with a conditional request revalidating the cached copy.
+
+        :param get: Function get(url, headers) sending the HTTP request for
+                    the link and returning the response.
+        :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+        :param variant: Name of the kind of page fetched for the link (e.g.
+                        full page or lead section), kept as separate entries.
+        :return: The content of the page.
+        :raises CacheMiss: When offline and the page is not cached, e.g. it
+                           was never fetched or it was evicted.
+        """
+        path = variant + normalize_path(url)
+        entry = self.lookup(path)
+
+        if entry is not None and (self.offline or time.time() - entry[3] < self.max_age):
+            try:
+                text = self.read(entry[0])
+            except FileNotFoundError:
+                # evicted by another thread in the meantime
+                entry = None
+            else:
+                self.touch(path)
+                return text
+        if self.offline:
+            raise CacheMiss(path)
+
+        headers = {}
+        if entry is not None:
+            if entry[1]:
+                headers['If-None-Match'] = entry[1]
+            if entry[2]:
+                headers['If-Modified-Since'] = entry[2]
+
+        response = get(url, headers)
+        if entry is not None and response.status_code == 304:
+            try:
+                text = self.read(entry[0])
+            except FileNotFoundError:
+                return get(url, {}).text
+            self.touch(path, fetched=True)
+            return text
+
+        if response.status_code == 200:
+            self.store(path, response.text,
+                       response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.text
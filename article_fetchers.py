@@ -0,0 +1,110 @@
+import json
+from html import escape
+from urllib.parse import unquote
+from http_client import MAXLAG
+
+# CONSTANTS
+URL_BASE = "https://en.wikipedia.org"
+API_PATH = "/w/api.php"
+ARTICLE_PATH = "/wiki/"
+
+
+class FullPageFetcher:
+    """
+    Fetches the complete rendered page of an article.
+
+    Every fetcher provides get(url, headers), sending the HTTP request for an
+    article link, and fetch(url, cache), returning the article as HTML which
+    article_parser.parse_article understands.
+    """
+
+    name = 'full'
+
+    def __init__(self, session, url_base=URL_BASE):
+        """
+        :param session: Client used for the HTTP requests, e.g. http_client.get_client().
+        :param url_base: Address of the Wikipedia site, e.g. of a local stub.
+        """
+        self.session = session
+        self.url_base = url_base
+
+    def get(self, url, headers=None):
+        """
+        Send the request for the article.
+
+        :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+        :param headers: Additional request headers, e.g. for revalidation.
+        :return: The HTTP response.
+        """
+        return self.session.get(self.url_base + url, headers=headers)
+
+    def to_html(self, text):
+        """Convert the response text into the HTML of the article."""
+        return text
+
+    def fetch(self, url, cache=None):
+        """
+        Fetch the article, through the cache if one is given.
+
+        :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+        :param cache: Optional ArticleCache.
+        :return: The HTML content of the article.
+        """
+        if cache is None:
+            text = self.get(url).text
+        else:
+            text = cache.fetch(self.get, url, self.name)
+        return self.to_html(text)
+
+
+class LeadSectionFetcher(FullPageFetcher):
+    """
+    Fetches only the lead section of an article (section 0, which holds the
+    infobox) through the gzip-compressed parse API, an order of magnitude
+    less data than the full page.
+    """
+
+    name = 'lead'
+
+    def get(self, url, headers=None):
+        """
+        Send the parse API request for the lead section of the article.
+
+        :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+        :param headers: Additional request headers, e.g. for revalidation.
+        :return: The HTTP response.
+        """
+        parameters = {
+            'action': 'parse',
+            'format': 'json',
+            'formatversion': 2,
+            'page': unquote(url[len(ARTICLE_PATH):].split('#')[0]),
+            'prop': 'text',
+            'section': 0,
+            'redirects': 1,
+            'disableeditsection': 1,
+            'maxlag': MAXLAG,
+        }
+        headers = dict(headers or {}, **{'Accept-Encoding': 'gzip'})
+        return self.session.get(self.url_base + API_PATH, params=parameters, headers=headers)
+
+    def to_html(self, text):
+        """
+        Wrap the lead section returned by the parse API into the markup of a
+        full page, so that it is parsed in the same way.
+        """
+        try:
+            parsed = json.loads(text)['parse']
+        except (ValueError, KeyError):
+            return ''
+        return (f'<span class="mw-page-title-main">{escape(parsed["title"])}</span>'
+                f'<div id="mw-content-text">{parsed["text"]}</div>')
+
+    def fetch(self, url, cache=None):
+        """
+        Fetch the lead section of the article, through the cache if one is given.
+        Links outside the article namespace path have no lead section.
+        """
+        if not url.startswith(ARTICLE_PATH):
+            return ''
+        return super().fetch(url, cache)
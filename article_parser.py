@@ -0,0 +1,170 @@
+import re
+from bisect import bisect_left
+from collections import namedtuple
+from html.parser import HTMLParser
+
+# CONSTANTS
+ARTICLE_TITLE_CLASS = 'mw-page-title-main'
+HEADER_CONTENT_BEGIN_ID = 'mw-content-text'
+HEADER_CONTENT_END_CLASS = 'mw-heading mw-heading2'
+INFOBOX_CLASS = 'infobox'
+INFOBOX_LABEL_CLASS = 'infobox-label'
+
+# Tags whose content is left out of the lead text (pronunciations, references)
+# and of the infobox labels
+SKIPPED_TAGS = ('span', 'sup', 'style')
+LABEL_SKIPPED_TAGS = ('sup', 'style')
+
+SENTENCE_UNTIL_PERIOD = re.compile(r".*?\.[ ]")
+
+# Link found in the lead text; start and end are character offsets in it
+Link = namedtuple('Link', ['start', 'end', 'text', 'title', 'href'])
+
+
+class ParsedArticle:
+    """The parts of an article used for extraction, produced by one pass over its HTML."""
+
+    def __init__(self):
+        self.title = None
+        self.lead_text = ''
+        self.sentences = []
+        self.links = []
+        self.infobox_labels = []
+
+    def sentence_links(self, start, end):
+        """
+        Return the links beginning inside the given part of the lead text.
+
+        :param start: Offset of the first character of the sentence.
+        :param end: Offset after the last character of the sentence.
+        :return: A list of Link tuples.
+        """
+        starts = [link.start for link in self.links]
+        return self.links[bisect_left(starts, start):bisect_left(starts, end)]
+
+    def get_hrefs(self):
+        """Return the targets of the internal links found in the lead text."""
+        return [link.href for link in self.links if link.href.startswith('/')]
+
+
+class ArticleParser(HTMLParser):
+    """
+    A streaming HTML parser collecting the article title, the text and links
+    of the lead paragraphs and the labels of the infobox rows.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.article = ParsedArticle()
+        self.lead = []
+        self.lead_length = 0
+        self.content_state = 'before'
+        self.infobox_state = 'before'
+        self.in_paragraph = False
+        self.skipped_tag = None
+        self.skip_depth = 0
+        self.title = None
+        self.link = None
+        self.link_text = None
+        self.label = None
+
+    def append_text(self, text):
+        """Append text to the lead, keeping track of its length for link offsets."""
+        self.lead.append(text)
+        self.lead_length += len(text)
+        if self.link_text is not None:
+            self.link_text.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        css_class = attrs.get('class') or ''
+
+        if self.skipped_tag is not None:
+            if tag == self.skipped_tag:
+                self.skip_depth += 1
+        elif self.in_paragraph:
+            if tag in SKIPPED_TAGS:
+                self.skipped_tag, self.skip_depth = tag, 1
+            elif tag == 'a':
+                self.link = (self.lead_length, attrs.get('href') or '', attrs.get('title'))
+                self.link_text = []
+        elif self.label is not None:
+            if tag in LABEL_SKIPPED_TAGS:
+                self.skipped_tag, self.skip_depth = tag, 1
+        elif tag == 'p' and not attrs and self.content_state == 'inside':
+            self.in_paragraph = True
+            if self.lead_length > 0:
+                self.append_text(' ')
+        elif tag == 'span' and css_class == ARTICLE_TITLE_CLASS and self.article.title is None:
+            self.title = []
+        elif tag == 'div':
+            if self.content_state == 'before' and attrs.get('id') == HEADER_CONTENT_BEGIN_ID:
+                self.content_state = 'inside'
+            elif self.content_state == 'inside' and css_class.startswith(HEADER_CONTENT_END_CLASS):
+                self.content_state = 'after'
+        elif tag == 'table' and self.infobox_state == 'before' and css_class == INFOBOX_CLASS:
+            self.infobox_state = 'inside'
+        elif tag == 'th' and self.infobox_state == 'inside' and css_class == INFOBOX_LABEL_CLASS:
+            self.label = []
+
+    def handle_endtag(self, tag):
+        if self.skipped_tag is not None:
+            if tag == self.skipped_tag:
+                self.skip_depth -= 1
+                if self.skip_depth == 0:
+                    self.skipped_tag = None
+        elif tag == 'a' and self.link is not None:
+            start, href, title = self.link
+            text = ''.join(self.link_text)
+            self.article.links.append(Link(start, self.lead_length, text, title or text, href))
+            self.link = self.link_text = None
+        elif tag == 'p' and self.in_paragraph:
+            self.in_paragraph = False
+            # drop the trailing whitespace of the paragraph
+            while self.lead and not self.lead[-1].strip():
+                self.lead_length -= len(self.lead.pop())
+            if self.lead:
+                text = self.lead[-1].rstrip()
+                self.lead_length -= len(self.lead[-1]) - len(text)
+                self.lead[-1] = text
+        elif tag == 'span' and self.title is not None:
+            self.article.title = ''.join(self.title)
+            self.title = None
+        elif tag == 'th' and self.label is not None:
+            label = ''.join(self.label)
+            # skipping sub-properties with •, as they were raising exception
+            if '•' not in label:
+                self.article.infobox_labels.append(label.strip())
+            self.label = None
+        elif tag == 'table' and self.infobox_state == 'inside':
+            self.infobox_state = 'after'
+
+    def handle_data(self, data):
+        if self.skipped_tag is not None:
+            return
+        if self.in_paragraph:
+            self.append_text(data.replace('\n', ' '))
+        elif self.label is not None:
+            self.label.append(data)
+        elif self.title is not None:
+            self.title.append(data)
+
+    def close(self):
+        super().close()
+        self.article.lead_text = ''.join(self.lead)
+        self.article.sentences = [match.span() for match in
+                                  SENTENCE_UNTIL_PERIOD.finditer(self.article.lead_text)]
+        return self.article
+
+
+def parse_article(html):
+    """
+    Parse the HTML of an article in one pass.
+
+    :param html: The HTML content of the article.
+    :return: ParsedArticle with the title, lead text, sentence boundaries,
+             links and infobox labels of the article.
+    """
+    parser = ArticleParser()
+    parser.feed(html)
+    return parser.close()
@@ -0,0 +1,305 @@
+import random
+import string
+import time
+from itertools import accumulate
+from entity_alignment import NgramIndex, get_ngrams, normalize_name, similarity
+from spacy_models import disabled_components, get_model
+from triples_parse_and_verify import reprocess_aggregation_relations
+from wikipedia_triples_extract import SentenceContext, WikipediaExtractor
+
+# Configuration
+LINKS_PER_SENTENCE = [10, 50, 200]
+REPEATS = 5
+TRIPLES_COUNTS = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+LEGACY_MAX_TRIPLES = 10 ** 4     # the quadratic baseline is skipped above it
+NAMES_COUNTS = [10 ** 5, 10 ** 6]
+QUERIES = 200                   # misspelled names aligned in each corpus
+BRUTE_FORCE_QUERIES = 5         # of them, aligned by comparing with every name
+VOCABULARY_SIZE = 50000        # pseudo-words the names are made of
+# (min_overlap, max_candidates, max_probes) of the blocking index, most recall first
+ALIGNMENT_SETTINGS = [(0.3, 50, None), (0.4, 10, None), (0.4, 10, 6), (0.4, 5, 3)]
+
+ADJECTIVES = ['electric', 'mechanical', 'large', 'modern', 'digital', 'ancient',
+              'public', 'central', 'urban', 'national', 'small', 'primary']
+NOUNS = ['vehicle', 'engine', 'wheel', 'road', 'passenger', 'transport', 'device',
+         'language', 'airport', 'computer', 'brain', 'planet', 'system', 'machine']
+
+
+def legacy_get_full_class_name(value, links_text, links_titles):
+    """
+    The implementation of WikipediaExtractor.get_full_class_name before the
+    per-sentence context, used as the baseline of benchmark_full_class_name().
+    """
+    class_name = value.text
+    context = []
+    other_conenctions = []
+    sentence_links = links_text
+
+    link_class_name = None
+    children_deps = [child.dep_ for child in value.children]
+    if 'compund' in children_deps or 'amod' in children_deps:
+        if len(list(value.lefts)) > 0:
+            class_name = list(value.lefts)[-1].text+" "+class_name
+            match_ctr = 0
+            for link in sentence_links:
+                if class_name in link:
+                    if match_ctr == 0:
+                        link_class_name = link
+                    else:
+                        link_class_name = None
+                    match_ctr += 1
+    if link_class_name is None:
+        class_name = value.text
+        if [t.text for t in value.doc].count(class_name)<2:
+            match_ctr = 0
+            for link in sentence_links:
+                if class_name in link:
+                    if match_ctr == 0:
+                        link_class_name = link
+                    else:
+                        link_class_name = None
+                    match_ctr += 1
+        if link_class_name is None:
+            if value.pos_ != 'NOUN':
+                return ['']
+
+            for child in value.children:
+                if child.text == 'of':
+                    return ['']
+                if (child.dep_ == 'compound' or child.dep_ == 'amod') \
+                   and child in value.lefts:
+                    class_name = child.text +' '+ class_name
+                    context.append(child.text)
+
+            if len(context) > 1:
+                context = sorted(context, key=lambda x: [v.text for v in value.lefts].index(x), reverse=True)
+                class_name = value.text
+                for v in context[:-1]:
+                    if v[:-1] == '-':
+                        class_name = v + class_name
+                    else:
+                        class_name = v + ' ' + class_name
+    if link_class_name is not None:
+        class_name = links_titles[links_text.index(link_class_name)]
+    for child in value.children:
+        if child.dep_ == 'conj':
+            other_conenctions += legacy_get_full_class_name(
+                child,
+                links_text,
+                links_titles)
+
+    return [class_name] + other_conenctions
+
+
+def legacy_reprocess_aggregation_relations(triples):
+    """
+    The implementation of reprocess_aggregation_relations before the pair
+    index, used as the baseline of benchmark_reverse_relations().
+    """
+    final_triples = []
+    for triple in triples:
+        sub, rel, obj, rel_t, sub_t, obj_t = triple
+        if rel_t == 'aggregation':
+            if any(sub == obj_rev and obj == sub_rev \
+            for (sub_rev, _, obj_rev,_,_,_) in triples):
+                triple = (sub, rel, obj, 'composition', sub_t, obj_t)
+        final_triples.append(triple)
+    return final_triples
+
+
+def build_link_dense_sentence(links_count):
+    """
+    Build a long lead-like sentence with the given number of linked phrases.
+
+    :param links_count: Number of links in the sentence.
+    :return: A tuple (sentence, links_texts, links_titles).
+    """
+    random.seed(links_count)
+    phrases = [f'{random.choice(ADJECTIVES)} {random.choice(NOUNS)}' for _ in range(links_count)]
+    sentence = 'A car is a motor vehicle which includes ' + ', '.join(
+        f'the {phrase}' for phrase in phrases[:-1]) + f' and the {phrases[-1]}. '
+    return sentence, phrases, [phrase.capitalize() for phrase in phrases]
+
+
+def benchmark_full_class_name():
+    """
+    Compare the per-sentence time of resolving class names of all nouns in
+    link-dense sentences with and without the shared SentenceContext, and
+    check that both give the same names.
+    """
+    nlp = get_model()
+    extractor = WikipediaExtractor()
+
+    for links_count in LINKS_PER_SENTENCE:
+        sentence, links_texts, links_titles = build_link_dense_sentence(links_count)
+        doc = nlp(sentence, disable=disabled_components(nlp, 'extraction'))
+        nouns = [token for token in doc if token.pos_ in ('NOUN', 'PROPN')]
+
+        start_time = time.perf_counter()
+        for _ in range(REPEATS):
+            expected = [legacy_get_full_class_name(token, links_texts, links_titles)
+                        for token in nouns]
+        legacy_time = (time.perf_counter() - start_time) / REPEATS
+
+        start_time = time.perf_counter()
+        for _ in range(REPEATS):
+            sentence_context = SentenceContext(doc, links_texts, links_titles)
+            result = [extractor.get_full_class_name(token, sentence_context)
+                      for token in nouns]
+        context_time = (time.perf_counter() - start_time) / REPEATS
+
+        assert result == expected
+        print(f'{links_count} links, {len(doc)} tokens: '
+              f'{legacy_time * 1000:.2f} ms -> {context_time * 1000:.2f} ms per sentence '
+              f'({legacy_time / context_time:.1f}x)')
+
+
+def build_processed_triples(triples_count):
+    """
+    Build random processed triples over a vocabulary growing with their
+    number, so that some aggregations have reverse triples.
+
+    :param triples_count: Number of triples.
+    :return: A list of (sub, rel, obj, rel_t, sub_t, obj_t) tuples.
+    """
+    random.seed(triples_count)
+    names = [f'{adjective} {noun} {i}' for i in range(max(1, triples_count // 50))
+             for adjective in ADJECTIVES[:5] for noun in NOUNS[:5]]
+    relations = [('has parts', 'aggregation'), ('part of', 'aggregation'),
+                 ('uses', 'association'), ('is a', 'inheritance')]
+    triples = []
+    for _ in range(triples_count):
+        rel, rel_t = random.choice(relations)
+        triples.append((random.choice(names), rel, random.choice(names), rel_t, 'class', 'class'))
+    return triples
+
+
+def benchmark_reverse_relations():
+    """
+    Compare the time of reprocess_aggregation_relations with the reverse
+    pair index and with the previous linear scan per triple, and check
+    that both give the same triples.
+    """
+    for triples_count in TRIPLES_COUNTS:
+        triples = build_processed_triples(triples_count)
+
+        start_time = time.perf_counter()
+        result = reprocess_aggregation_relations(triples)
+        index_time = time.perf_counter() - start_time
+
+        if triples_count > LEGACY_MAX_TRIPLES:
+            print(f'{triples_count} triples: {index_time * 1000:.1f} ms')
+            continue
+
+        start_time = time.perf_counter()
+        expected = legacy_reprocess_aggregation_relations(triples)
+        legacy_time = time.perf_counter() - start_time
+
+        assert result == expected
+        print(f'{triples_count} triples: {legacy_time * 1000:.1f} ms -> {index_time * 1000:.1f} ms '
+              f'({legacy_time / index_time:.1f}x)')
+
+
+def build_entity_names(names_count):
+    """
+    Build random distinct entity names of one to three pseudo-words. The
+    words are drawn with Zipf-distributed frequencies, so that, as in real
+    names, some words and their n-grams are found in many names.
+
+    :param names_count: Number of names.
+    :return: A list of names.
+    """
+    random.seed(names_count)
+    onsets = ['', 'b', 'br', 'ch', 'd', 'dr', 'f', 'g', 'gr', 'h', 'k', 'l', 'm', 'n',
+              'p', 'pr', 'r', 's', 'sh', 'st', 't', 'th', 'tr', 'v', 'w', 'z']
+    syllables = [onset + vowel + coda for onset in onsets
+                 for vowel in ('a', 'e', 'i', 'o', 'u', 'ai', 'ea', 'ou')
+                 for coda in ('', 'n', 'r', 's', 'l', 't', 'nd')]
+    vocabulary = list({''.join(random.choices(syllables, k=random.randint(1, 3)))
+                       for _ in range(VOCABULARY_SIZE)})
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    names = set()
+    while len(names) < names_count:
+        names.add(' '.join(random.choices(vocabulary, cum_weights=cum_weights, k=random.randint(1, 3))))
+    return sorted(names)
+
+
+def misspell(name):
+    """Return the name with one character replaced, deleted, inserted or swapped with the next one."""
+    i = random.randrange(len(name) - 1)
+    edit = random.randrange(4)
+    if edit == 0:
+        return name[:i] + random.choice(string.ascii_lowercase) + name[i + 1:]
+    if edit == 1:
+        return name[:i] + name[i + 1:]
+    if edit == 2:
+        return name[:i] + random.choice(string.ascii_lowercase) + name[i:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def brute_force_alignment(names, queries):
+    """
+    Align misspelled names by comparing each of them with every name.
+
+    :param names: The normalized names of the corpus.
+    :param queries: A list of (misspelled name, name it was made from) pairs.
+    :return: A tuple (number of queries aligned with their name, seconds per query).
+    """
+    corpus_ngrams = [get_ngrams(name) for name in names]
+    found = 0
+    start_time = time.perf_counter()
+    for query, name in queries:
+        query_ngrams = get_ngrams(normalize_name(query))
+        best = max(range(len(names)), key=lambda i: similarity(query_ngrams, corpus_ngrams[i]))
+        found += names[best] == name
+    return found, (time.perf_counter() - start_time) / len(queries)
+
+
+def benchmark_entity_alignment():
+    """
+    Align misspelled names with corpora of NAMES_COUNTS names through the
+    n-gram blocking index, for each of ALIGNMENT_SETTINGS, and report the
+    recall (the share of names aligned with the name they were made from)
+    and the cost (candidates scored and time per name). The time of
+    comparing every name with the whole corpus is measured on
+    BRUTE_FORCE_QUERIES names.
+    """
+    for names_count in NAMES_COUNTS:
+        names = build_entity_names(names_count)
+        # a misspelling leaves too little of the shortest names to align them
+        queries = [(misspell(name), name)
+                   for name in random.sample([name for name in names if len(name) > 3], QUERIES)]
+
+        start_time = time.perf_counter()
+        index = NgramIndex(names)
+        build_time = time.perf_counter() - start_time
+
+        found, brute_force_time = brute_force_alignment(index.names, queries[:BRUTE_FORCE_QUERIES])
+        print(f'{names_count} names, index built in {build_time:.1f} s: brute force recall '
+              f'{found / BRUTE_FORCE_QUERIES:.0%}, {brute_force_time * 1000:.0f} ms per name')
+
+        for min_overlap, max_candidates, max_probes in ALIGNMENT_SETTINGS:
+            start_time = time.perf_counter()
+            matches = [index.best_match(query, 0.0, min_overlap, max_candidates, max_probes)
+                       for query, _ in queries]
+            query_time = (time.perf_counter() - start_time) / QUERIES
+
+            found = sum(match is not None and match[0] == name
+                        for match, (_, name) in zip(matches, queries))
+            candidates = sum(len(index.candidates(normalize_name(query), min_overlap,
+                                                  max_candidates, max_probes))
+                             for query, _ in queries)
+
+            print(f'  overlap {min_overlap}, {max_candidates} candidates, {max_probes or "all"} '
+                  f'probes: recall {found / QUERIES:.1%}, {candidates / QUERIES:.1f} candidates, '
+                  f'{query_time * 1000:.2f} ms per name ({brute_force_time / query_time:.0f}x)')
+
+
+def main():
+    """Run all benchmarks."""
+    benchmark_full_class_name()
+    benchmark_reverse_relations()
+    benchmark_entity_alignment()
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+from inheritance_closure import InheritanceClosure
+from triple_store import load_triples
+
+# Configuration
+DIRECT_GENERALIZATIONS_ONLY = False     # leave out inheritance relations implied by other ones
+
 # CONSTANTS
 RELATIONS_DICT = {
     'association': '-->',
@@ -8,46 +14,105 @@ RELATIONS_DICT = {
 
 def read_file(filename):
     """
-    Reads triples and attributes from a specified file.
+    Reads triples and attributes from a specified dataset of verified triples.
 
-    :param filename: The name of the file to read.
+    :param filename: The name of the dataset in the triple store (the
+                     verified file it was saved to).
     :return: A tuple containing a list of triples and a dictionary of attributes.
     """
     triples = []
     attributes = {}
 
-    with open(filename, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        for line in lines:
-            splitted_line = line.split(", ")
-            if len(splitted_line) == 3:
-                subject = splitted_line[0].split(" (")[0][1:-1]
-                subject_type = splitted_line[0].split(" (")[1][:-1]
-
-                subject_2 = splitted_line[2].split(" (")[0][1:-1]
-                subject_2_type = splitted_line[2].split(" (")[1].split(')')[0]
-
-                relation = splitted_line[2].split(" : ")[1][0:-1]
-                relation_name = splitted_line[1][1:-1]
+    for triple in load_triples(filename):
+        element = get_uml_element(triple)
+        if element is None:
+            continue
+        if element[0] == 'attribute':
+            _, subject, subject_2 = element
+            if subject in attributes:
+                attributes[subject].append(subject_2)
             else:
-                continue
-
-            if subject_type == 'object' or subject_2_type == 'object':
-                continue
-
-            if ('has characteristic' in line or 
-                'properties for this type' in line or 
-                'has properties' in line) and relation == 'attributes':
-                if subject in attributes:
-                    attributes[subject].append(subject_2)
-                else:
-                    attributes[subject] = [subject_2]
-                continue
-            # else treat as class relation class
-            triples.append((subject, relation_name, relation, subject_2))
+                attributes[subject] = [subject_2]
+        else:
+            triples.append(element[1])
     return triples, attributes
 
 
+def get_uml_element(triple):
+    """
+    Decides what a verified triple becomes in the UML diagram.
+
+    :param triple: Verified triple (sub, rel, obj, rel_t, sub_t, obj_t).
+    :return: ('attribute', class, attribute), ('relation', (subject,
+             relation name, relation, subject_2)) or None for triples left
+             out of the diagram (objects).
+    """
+    if len(triple) != 6:
+        return None
+    subject, relation_name, subject_2, relation, subject_type, subject_2_type = triple
+
+    if subject_type == 'object' or subject_2_type == 'object':
+        return None
+
+    if relation_name in ('has characteristic', 'properties for this type',
+                         'has properties') and relation == 'attributes':
+        return ('attribute', subject, subject_2)
+    # else treat as class relation class
+    return ('relation', (subject, relation_name, relation, subject_2))
+
+
+def remove_implied_generalizations(relations):
+    """
+    Leaves out the inheritance relations implied by other ones: when "car"
+    inherits from "motor vehicle" and "motor vehicle" from "vehicle", the
+    relation of "car" and "vehicle" is left out, so every class is linked to
+    its direct superclasses only.
+
+    :param relations: A list of relations (subject, relation name, relation, subject_2).
+    :return: The list without the implied inheritance relations.
+    """
+    closure = InheritanceClosure()
+    parents = {}
+    for subject, _, relation, subject_2 in relations:
+        if relation == 'inheritance':
+            closure.add_edge(subject, subject_2)
+            parents.setdefault(subject, set()).add(subject_2)
+
+    def is_implied(subject, subject_2):
+        # parents in a cycle with the subject imply every ancestor, so they are skipped
+        return any(parent != subject_2 and closure.is_ancestor(subject_2, parent)
+                   and not closure.is_ancestor(subject, parent)
+                   for parent in parents[subject])
+
+    return [triple for triple in relations
+            if triple[2] != 'inheritance' or not is_implied(triple[0], triple[3])]
+
+
+def format_class(single_class, attributes):
+    """
+    Formats the definition of a class with its attributes.
+
+    :param single_class: The name of the class.
+    :param attributes: A list of attribute names.
+    :return: The PlantUML text of the class.
+    """
+    lines = [f'class "{single_class}" {{\n']
+    for attr in attributes:
+        lines.append(f'  +"{attr}" : String\n')
+    lines.append("}\n")
+    return ''.join(lines)
+
+
+def format_relation(triple):
+    """
+    Formats a relationship between classes.
+
+    :param triple: A tuple (subject, relation name, relation, subject_2).
+    :return: The PlantUML line of the relationship.
+    """
+    return f'"{triple[0]}" {RELATIONS_DICT[triple[2]]} "{triple[3]}" : {triple[1]}\n'
+
+
 def write_classes_to_file(classes, filename):
     """
     Writes class definitions with their attributes to a specified file.
@@ -57,10 +122,7 @@ def write_classes_to_file(classes, filename):
     """
     with open(filename, 'a', encoding='utf-8') as f:
         for single_class, attributes in classes.items():
-            f.write(f'class "{single_class}" {{\n')            
-            for attr in attributes:
-                f.write(f'  +"{attr}" : String\n')
-            f.write("}\n")
+            f.write(format_class(single_class, attributes))
 
 
 def write_relations_to_file(triples, filename):
@@ -73,7 +135,7 @@ def write_relations_to_file(triples, filename):
     with open(filename, 'a', encoding='utf-8') as f:
         f.write("\n")
         for triple in triples:
-            f.write(f'"{triple[0]}" {RELATIONS_DICT[triple[2]]} "{triple[3]}" : {triple[1]}\n')
+            f.write(format_relation(triple))
 
 
 def write_file(classes, relations, filename):
@@ -93,7 +155,16 @@ def write_file(classes, relations, filename):
     with open(filename, 'a', encoding='utf-8') as f:
         f.write('@endtuml')
 
-# Example usage
-filename = 'verified_files/output_Polish_language_triples_from_wikipedia.txt'
-relations, classes = read_file(filename)
-write_file(classes, relations, filename.split('/')[1] + '_output_test.iuml')
+def main():
+    """
+    Example usage: converts the verified triples of one article into UML.
+    """
+    filename = 'verified_files/output_Polish_language_triples_from_wikipedia.txt'
+    relations, classes = read_file(filename)
+    if DIRECT_GENERALIZATIONS_ONLY:
+        relations = remove_implied_generalizations(relations)
+    write_file(classes, relations, filename.split('/')[1] + '_output_test.iuml')
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,152 @@
+from collections import Counter
+
+# Configuration
+NGRAM_SIZE = 3
+MIN_SIMILARITY = 0.8        # Dice coefficient of the n-grams of two names aligned together
+MIN_OVERLAP = MIN_SIMILARITY / 2    # share of the n-grams of a name a candidate must have
+MAX_CANDIDATES = 10         # candidates scored per name
+MAX_PROBES = None           # rarest n-grams of a name whose postings are read, None for all
+
+
+def normalize_name(name):
+    """Fold the case and whitespace of a name."""
+    return ' '.join(name.casefold().split())
+
+def get_ngrams(name, size=NGRAM_SIZE):
+    """
+    Return the character n-grams of a normalized name, padded with spaces so
+    that its first and last characters start and end n-grams of their own.
+
+    :param name: The normalized name.
+    :param size: Length of the n-grams.
+    :return: A set of strings.
+    """
+    padded = ' ' + name + ' '
+    return {padded[i:i + size] for i in range(max(1, len(padded) - size + 1))}
+
+def similarity(ngrams_a, ngrams_b):
+    """
+    Return the Dice coefficient of the n-grams of two names, between 0 and 1.
+    """
+    if not ngrams_a or not ngrams_b:
+        return 0.0
+    return 2 * len(ngrams_a & ngrams_b) / (len(ngrams_a) + len(ngrams_b))
+
+
+class NgramIndex:
+    """
+    A blocking index for approximate matching of entity names: an inverted
+    index from character n-grams to the names containing them. A query
+    counts, through the postings of its n-grams, how many n-grams each
+    indexed name shares with it, and only the names sharing enough of them
+    (the candidates) are scored with the similarity function, instead of
+    every indexed name.
+
+    The trade-off of recall and cost is tuned by:
+      - min_overlap: a Dice coefficient of s needs at least s / 2 of the
+        n-grams of the query, so MIN_SIMILARITY / 2 loses no match; a
+        higher share gives fewer candidates,
+      - max_candidates: the number of candidates scored per query,
+      - max_probes: the number of n-grams of the query whose postings are
+        read, the rarest first. Common n-grams (e.g. 'ion') have the longest
+        postings and say the least; a candidate with enough n-grams in
+        common must still share one of the rarest ones.
+    """
+
+    def __init__(self, names=(), size=NGRAM_SIZE):
+        """
+        :param names: Iterable of names to index.
+        :param size: Length of the n-grams.
+        """
+        self.size = size
+        self.names = []
+        self.ids = {}
+        self.postings = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """
+        Add a name to the index.
+
+        :param name: The name; it is normalized first.
+        :return: The ID of the normalized name.
+        """
+        name = normalize_name(name)
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            for ngram in get_ngrams(name, self.size):
+                self.postings.setdefault(ngram, []).append(name_id)
+        return name_id
+
+    def candidates(self, name, min_overlap=MIN_OVERLAP, max_candidates=MAX_CANDIDATES,
+                   max_probes=MAX_PROBES):
+        """
+        Find the indexed names sharing the most n-grams with a name.
+
+        :param name: The normalized name.
+        :param min_overlap: Share of the n-grams of the name a candidate must have.
+        :param max_candidates: Maximum number of candidates.
+        :param max_probes: Number of the rarest n-grams whose postings are read, None for all.
+        :return: A list of name IDs, the most shared probed n-grams first.
+        """
+        ngrams = get_ngrams(name, self.size)
+        # n-grams of no indexed name, e.g. from a misspelling, are left out
+        postings = sorted((self.postings[ngram] for ngram in ngrams if ngram in self.postings), key=len)
+        probed = postings[:max_probes]
+        counts = Counter()
+        for posting in probed:
+            counts.update(posting)
+        # a candidate may also share the n-grams which were not probed
+        needed = max(1, min_overlap * len(ngrams) - (len(postings) - len(probed)))
+        return [name_id for name_id, count in counts.most_common(max_candidates) if count >= needed]
+
+    def best_match(self, name, min_similarity=MIN_SIMILARITY, min_overlap=MIN_OVERLAP,
+                   max_candidates=MAX_CANDIDATES, max_probes=MAX_PROBES):
+        """
+        Find the indexed name most similar to a name.
+
+        :param name: The name; it is normalized first.
+        :param min_similarity: Minimum Dice coefficient of a match.
+        :param min_overlap: See candidates().
+        :param max_candidates: See candidates().
+        :param max_probes: See candidates().
+        :return: A tuple (indexed name, similarity), or None if no candidate
+                 is similar enough.
+        """
+        name = normalize_name(name)
+        if name in self.ids:
+            return name, 1.0
+        ngrams = get_ngrams(name, self.size)
+        best = None
+        for name_id in self.candidates(name, min_overlap, max_candidates, max_probes):
+            score = similarity(ngrams, get_ngrams(self.names[name_id], self.size))
+            if score >= min_similarity and (best is None or score > best[1]):
+                best = (self.names[name_id], score)
+        return best
+
+
+def align_entities(source_names, target_names, min_similarity=MIN_SIMILARITY,
+                   min_overlap=MIN_OVERLAP, max_candidates=MAX_CANDIDATES, max_probes=MAX_PROBES):
+    """
+    Align entity names of one source (e.g. Wikipedia link titles) with the
+    most similar names of another one (e.g. Wikidata labels).
+
+    :param source_names: Iterable of names to align.
+    :param target_names: Iterable of names they are aligned with.
+    :param min_similarity: Minimum Dice coefficient of an alignment.
+    :param min_overlap: See NgramIndex.candidates().
+    :param max_candidates: See NgramIndex.candidates().
+    :param max_probes: See NgramIndex.candidates().
+    :return: A dictionary mapping the source names to the target names
+             they are aligned with; names without a match are left out.
+    """
+    index = NgramIndex(target_names)
+    aligned = {}
+    for name in source_names:
+        match = index.best_match(name, min_similarity, min_overlap, max_candidates, max_probes)
+        if match is not None:
+            aligned[name] = match[0]
+    return aligned
@@ -0,0 +1,182 @@
+from spacy_models import DEFAULT_MODEL, disabled_components, get_model
+from triple_store import load_triples
+
+# Configuration
+FAST_MODEL = "en_core_web_sm"
+ENTITY_LABELS = ('ORG', 'GPE')
+BATCH_SIZE = 64
+
+# Wikidata classes whose instances are named entities, e.g. ('Warsaw', 'instance of', 'city')
+ENTITY_TYPES = (
+    'country', 'sovereign state', 'state', 'city', 'big city', 'capital',
+    'human settlement', 'organization', 'company', 'business', 'enterprise',
+    'airline', 'airport', 'university', 'political party',
+)
+
+
+def build_gazetteer(triples):
+    """
+    Build a gazetteer of known strings from Wikidata triples: instances of
+    ENTITY_TYPES are named entities, both sides of 'subclass of' are classes.
+    Strings found as both are left out.
+
+    :param triples: Triples (subject, relation, object).
+    :return: A dictionary mapping lowercase strings to True for named
+             entities and False for classes.
+    """
+    gazetteer = {}
+    conflicts = set()
+    for sub, rel, obj in triples:
+        sub, rel, obj = sub.lower(), rel.lower(), obj.lower()
+        if rel == 'instance of' and obj in ENTITY_TYPES:
+            known = [(sub, True)]
+        elif rel == 'subclass of':
+            known = [(sub, False), (obj, False)]
+        else:
+            continue
+        for text, is_entity in known:
+            if gazetteer.setdefault(text, is_entity) != is_entity:
+                conflicts.add(text)
+    for text in conflicts:
+        del gazetteer[text]
+    return gazetteer
+
+def load_gazetteer(filenames):
+    """
+    Build the gazetteer from triples saved by wikidata_triples_extract.py.
+    Missing datasets are skipped.
+
+    :param filenames: Names of the datasets of the triple store.
+    :return: The gazetteer, see build_gazetteer().
+    """
+    return build_gazetteer(triple[:3] for filename in filenames
+                           for triple in load_triples(filename) if None not in triple[:3])
+
+
+class EntityClassifier:
+    """
+    Decides whether strings are named entities (ORG or GPE), trying cheap
+    tiers first and sending only unclear strings to the transformer model:
+
+      1. gazetteer: strings known from Wikidata types,
+      2. fast model: NER of the small model on two views of the string, as
+         it is and title-cased (the verifier lowercases the triples, which
+         hides the capitalization NER relies on); the result is accepted
+         when both views agree,
+      3. accurate model: NER of the transformer model.
+
+    With cascade=False every string goes to the accurate model. With
+    measure_agreement=True the accurate model also classifies the strings
+    settled by the cheap tiers, and the disagreements are counted.
+    """
+
+    def __init__(self, gazetteer=None, cascade=True, measure_agreement=False,
+                 fast_model=FAST_MODEL, accurate_model=DEFAULT_MODEL):
+        """
+        :param gazetteer: Dictionary mapping lowercase strings to True for
+                          named entities and False for classes.
+        :param cascade: If False, only the accurate model is used.
+        :param measure_agreement: If True, compare the cascade with the
+                                  accurate model on every string.
+        :param fast_model: Name of the small SpaCy model.
+        :param accurate_model: Name of the transformer SpaCy model.
+        """
+        self.gazetteer = gazetteer or {}
+        self.cascade = cascade
+        self.measure_agreement = measure_agreement
+        self.fast_model = fast_model
+        self.accurate_model = accurate_model
+        self.tier_counts = {'gazetteer': 0, 'fast': 0, 'accurate': 0}
+        self.compared = 0
+        self.disagreements = []
+
+    def run_ner(self, model_name, texts):
+        """
+        Run the NER of a model on the texts in batches.
+
+        :param model_name: Name of the SpaCy model.
+        :param texts: List of strings.
+        :return: A list of booleans, True for named entities.
+        """
+        if not texts:
+            return []
+        nlp = get_model(model_name)
+        docs = nlp.pipe(texts, batch_size=BATCH_SIZE,
+                        disable=disabled_components(nlp, 'verification'))
+        return [any(ent.label_ in ENTITY_LABELS for ent in doc.ents) for doc in docs]
+
+    def classify(self, texts):
+        """
+        Classify the strings.
+
+        :param texts: List of distinct strings.
+        :return: A dictionary mapping each string to True if it is a named
+                 entity, False otherwise.
+        """
+        results = {}
+        pending = list(texts)
+
+        if self.cascade:
+            unknown = []
+            for text in pending:
+                if text.lower() in self.gazetteer:
+                    results[text] = self.gazetteer[text.lower()]
+                    self.tier_counts['gazetteer'] += 1
+                else:
+                    unknown.append(text)
+
+            views = self.run_ner(self.fast_model, unknown + [text.title() for text in unknown])
+            pending = []
+            for text, as_is, titled in zip(unknown, views[:len(unknown)], views[len(unknown):]):
+                if as_is == titled:
+                    results[text] = as_is
+                    self.tier_counts['fast'] += 1
+                else:
+                    pending.append(text)
+
+        settled = list(results)
+        self.tier_counts['accurate'] += len(pending)
+        if self.measure_agreement:
+            pending += settled
+        for text, is_entity in zip(pending, self.run_ner(self.accurate_model, pending)):
+            if text in results:
+                self.compared += 1
+                if results[text] != is_entity:
+                    self.disagreements.append((text, results[text], is_entity))
+            else:
+                results[text] = is_entity
+        return results
+
+    def pop_counts(self):
+        """
+        Return the counts of the classified strings and reset them, e.g. to
+        send them from a worker process.
+
+        :return: A tuple (tier_counts, compared, disagreements).
+        """
+        counts = (self.tier_counts, self.compared, self.disagreements)
+        self.tier_counts = dict.fromkeys(self.tier_counts, 0)
+        self.compared = 0
+        self.disagreements = []
+        return counts
+
+    def add_counts(self, counts):
+        """
+        Add counts returned by pop_counts() of another classifier.
+
+        :param counts: A tuple (tier_counts, compared, disagreements).
+        """
+        tier_counts, compared, disagreements = counts
+        for tier, count in tier_counts.items():
+            self.tier_counts[tier] += count
+        self.compared += compared
+        self.disagreements += disagreements
+
+    def report(self):
+        """Print how many strings each tier settled and, if measured, the disagreements."""
+        print('Classified strings: ' + ', '.join(
+            f'{tier} {count}' for tier, count in self.tier_counts.items()))
+        if self.measure_agreement and self.compared:
+            print(f'Cascade disagrees with {self.accurate_model} on {len(self.disagreements)} '
+                  f'of {self.compared} strings settled by the cheap tiers '
+                  f'({len(self.disagreements) / self.compared:.1%})')
@@ -0,0 +1,77 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Configuration
+STORE_PATH = 'entity_store.sqlite'
+MAX_AGE = 7 * 24 * 60 * 60          # seconds an entry is used before it is fetched again
+
+
+class EntityStore:
+    """
+    A persistent SQLite store of Wikidata entity labels and relation claims.
+
+    Every entry keeps the time it was fetched; entries older than max_age
+    are left out when the store is loaded, so they are fetched again and
+    replaced. The store is loaded into memory once at startup with preload().
+    """
+
+    def __init__(self, path=STORE_PATH, max_age=MAX_AGE):
+        """
+        Open (or create) the store.
+
+        :param path: Path of the SQLite database.
+        :param max_age: Age in seconds after which an entry is refreshed.
+        """
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS labels (
+                entity_id TEXT PRIMARY KEY, label TEXT, fetched_at REAL);
+            CREATE TABLE IF NOT EXISTS claims (
+                entity_id TEXT PRIMARY KEY, claims TEXT, fetched_at REAL);
+        """)
+
+    def preload(self):
+        """
+        Load all entries which are not older than max_age.
+
+        :return: A tuple (labels, claims) of dictionaries mapping entity IDs
+                 to their label (None for entities without an English label)
+                 and to their relation claims ({property_id: [entity IDs]}).
+        """
+        oldest = time.time() - self.max_age
+        with self.lock:
+            labels = dict(self.db.execute(
+                'SELECT entity_id, label FROM labels WHERE fetched_at >= ?', (oldest,)))
+            claims = {entity_id: json.loads(entity_claims) for entity_id, entity_claims
+                      in self.db.execute('SELECT entity_id, claims FROM claims WHERE fetched_at >= ?',
+                                         (oldest,))}
+        return labels, claims
+
+    def store_labels(self, labels):
+        """
+        Store fetched labels, replacing older entries of the same entities.
+
+        :param labels: A dictionary mapping entity IDs to labels or None.
+        """
+        now = time.time()
+        with self.lock:
+            self.db.executemany('INSERT OR REPLACE INTO labels VALUES (?, ?, ?)',
+                                [(entity_id, label, now) for entity_id, label in labels.items()])
+            self.db.commit()
+
+    def store_claims(self, claims):
+        """
+        Store fetched relation claims, replacing older entries of the same entities.
+
+        :param claims: A dictionary mapping entity IDs to their relation claims.
+        """
+        now = time.time()
+        with self.lock:
+            self.db.executemany('INSERT OR REPLACE INTO claims VALUES (?, ?, ?)',
+                                [(entity_id, json.dumps(entity_claims), now)
+                                 for entity_id, entity_claims in claims.items()])
+            self.db.commit()
@@ -1,3 +1,26 @@
+from entity_alignment import NgramIndex
+from spacy_models import disabled_components, get_model
+from triple_store import load_triples
+
+# Configuration
+LEMMATIZE = True
+LEMMA_MODEL = "en_core_web_sm"
+BATCH_SIZE = 256
+# Match subjects and objects with similar reference ones, see entity_alignment.py; off by
+# default, as the aligned matches raise the precision and recall compared with earlier runs
+ALIGN_ENTITIES = False
+
+# Relation types matched as the same type; both sources are mapped through the table
+RELATION_EQUIVALENCES = {
+    'composition': 'aggregation',   # reverse pairs marking compositions are rarely in both sources
+}
+
+# Normalized (lemmatized, lowercase) subjects and objects matched as the same one
+ENTITY_EQUIVALENCES = {
+    'motor car': 'car',
+    'automobile': 'car',
+}
+
 FILES = [
     ('output_Airport_triples_from_wikipedia.txt','output_Q1248784_triples.txt'),
     ('output_Brain_triples_from_wikipedia.txt','output_Q1073_triples.txt'),
@@ -12,36 +35,170 @@ FOLDER = 'verified_files/'
 
 def read_triples(filename):
     """
-    Reads triples from a given file and returns them as a list of tuples.
+    Reads verified triples from a given dataset and returns them as a list of tuples.
     
-    :param filename: The name of the file to read the triples from.
-    :return: A list of tuples representing triples (subject, relation, object).
+    :param filename: The name of the dataset in the triple store (the
+                     verified file it was saved to).
+    :return: A list of tuples representing triples (subject, relation type, object).
     """
     triples = []
-    with open(filename, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        for line in lines:
-            line = line.lower().split(", ")
-            if len(line) == 3:
-                subject = line[0].split(" (")[0][1:-1]
-                subject_2 = line[2].split(" (")[0][1:-1]
-                relation = line[2].split(" : ")[1][0:-1]
-                triples.append((subject, relation, subject_2))
+    for triple in load_triples(filename):
+        if len(triple) == 6:
+            subject, _, subject_2, relation = (text.lower() for text in triple[:4])
+            triples.append((subject, relation, subject_2))
     return triples
 
-def compare_triples(triples_wikipedia, triples_wikidata):
+class TripleMatcher:
+    """
+    Maps triples (subject, relation type, object) to normalized keys, so
+    that triples of the two sources match as a hash join: case and
+    whitespace are folded, subjects and objects are lemmatized ('cars' and
+    'car') and mapped through the entity equivalence table, relation types
+    through the relation equivalence table. Every distinct string is
+    normalized once; the lemmatizer runs on batches of new strings.
+
+    With align=True, the subjects and objects of the reference triples
+    (see reference_keys()) are put into an n-gram blocking index, and the
+    subjects and objects of other triples missing from the reference are
+    replaced by the most similar reference ones, e.g. 'polsh language' by
+    'polish language'.
+    """
+
+    def __init__(self, lemmatize=LEMMATIZE, relation_equivalences=None, entity_equivalences=None,
+                 align=ALIGN_ENTITIES):
+        """
+        :param lemmatize: If False, only case and whitespace are folded.
+        :param relation_equivalences: Dictionary mapping relation types to
+                                      the type they match as, by default
+                                      RELATION_EQUIVALENCES.
+        :param entity_equivalences: Dictionary mapping normalized subjects
+                                    and objects to the one they match as,
+                                    by default ENTITY_EQUIVALENCES.
+        :param align: If True, align subjects and objects with the reference ones,
+                      which raises the precision and recall; by default
+                      ALIGN_ENTITIES (off).
+        """
+        self.lemmatize = lemmatize
+        self.relation_equivalences = RELATION_EQUIVALENCES if relation_equivalences is None \
+            else relation_equivalences
+        self.entity_equivalences = ENTITY_EQUIVALENCES if entity_equivalences is None \
+            else entity_equivalences
+        self.normalized = {}
+        self.align = align
+        self.reference_index = None
+        self.aligned = {}
+
+    def normalize_texts(self, texts):
+        """
+        Normalize the strings not normalized before.
+
+        :param texts: Iterable of subjects and objects.
+        """
+        new_texts = {text: ' '.join(text.casefold().split())
+                     for text in texts if text not in self.normalized}
+        if not new_texts:
+            return
+        folded = list(new_texts.values())
+        if self.lemmatize:
+            nlp = get_model(LEMMA_MODEL)
+            docs = nlp.pipe(folded, batch_size=BATCH_SIZE,
+                            disable=disabled_components(nlp, 'normalization'))
+            folded = [' '.join(token.lemma_.lower() for token in doc) for doc in docs]
+        for text, normalized in zip(new_texts, folded):
+            self.normalized[text] = self.entity_equivalences.get(normalized, normalized)
+
+    def key(self, triple):
+        """
+        Return the normalized key of a triple.
+
+        :param triple: A tuple (subject, relation type, object).
+        :return: The tuple (subject, relation type, object) used for matching.
+        """
+        sub, rel_t, obj = triple
+        if sub not in self.normalized or obj not in self.normalized:
+            self.normalize_texts((sub, obj))
+        rel_t = ' '.join(rel_t.casefold().split())
+        return (self.align_entity(self.normalized[sub]), self.relation_equivalences.get(rel_t, rel_t),
+                self.align_entity(self.normalized[obj]))
+
+    def align_entity(self, text):
+        """
+        Return the reference subject or object a normalized one is aligned
+        with, or the text itself if there is none.
+        """
+        if self.reference_index is None:
+            return text
+        if text not in self.aligned:
+            match = self.reference_index.best_match(text)
+            self.aligned[text] = text if match is None else match[0]
+        return self.aligned[text]
+
+    def keys(self, triples):
+        """
+        Return the normalized keys of the triples, normalizing their new
+        strings in batches first.
+
+        :param triples: A list of (subject, relation type, object) tuples.
+        :return: A list of keys, in the order of the triples.
+        """
+        self.normalize_texts({text for sub, _, obj in triples for text in (sub, obj)})
+        return [self.key(triple) for triple in triples]
+
+    def reference_keys(self, triples):
+        """
+        Return the normalized keys of the reference triples, which the keys
+        of other triples are compared with, and align the subjects and
+        objects of later keys with theirs.
+
+        :param triples: A list of (subject, relation type, object) tuples.
+        :return: A set of keys.
+        """
+        self.reference_index = None
+        keys = set(self.keys(triples))
+        if self.align:
+            self.reference_index = NgramIndex(text for sub, _, obj in keys for text in (sub, obj))
+            self.aligned = {}
+        return keys
+
+
+def match_triples(triples_wikipedia, triples_wikidata, matcher=None):
+    """
+    Find the Wikipedia triples matching a Wikidata triple, in linear time:
+    the normalized keys of the Wikidata triples are put into a hash set
+    and the keys of the Wikipedia triples, aligned with the Wikidata
+    subjects and objects, are looked up in it.
+
+    The Wikidata triples serve as the reference: precision is the share of
+    distinct Wikipedia keys found in Wikidata, recall the share of distinct
+    Wikidata keys found in Wikipedia.
+
+    :param triples_wikipedia: A list of triples from Wikipedia.
+    :param triples_wikidata: A list of triples from Wikidata.
+    :param matcher: The TripleMatcher, by default one with the configured tables.
+    :return: A tuple (list of matching Wikipedia triples, precision, recall).
+    """
+    matcher = matcher or TripleMatcher()
+    wikidata_keys = matcher.reference_keys(triples_wikidata)
+    wikipedia_keys = matcher.keys(triples_wikipedia)
+    common_triples = [triple for triple, key in zip(triples_wikipedia, wikipedia_keys)
+                      if key in wikidata_keys]
+
+    common_keys = wikidata_keys.intersection(wikipedia_keys)
+    wikipedia_keys = set(wikipedia_keys)
+    precision = len(common_keys) / len(wikipedia_keys) if wikipedia_keys else 0.0
+    recall = len(common_keys) / len(wikidata_keys) if wikidata_keys else 0.0
+    return common_triples, precision, recall
+
+def compare_triples(triples_wikipedia, triples_wikidata, matcher=None):
     """
     Compares two lists of triples and returns common triples.
 
     :param triples_wikipedia: A list of triples from Wikipedia.
     :param triples_wikidata: A list of triples from Wikidata.
-    :return: A list of common triples found in both input lists.
+    :param matcher: The TripleMatcher, by default one with the configured tables.
+    :return: A list of the Wikipedia triples matching a Wikidata triple.
     """
-    common_triples = []
-    for wiki_triple in triples_wikipedia:
-        if wiki_triple in triples_wikidata:
-            common_triples.append(wiki_triple)
-    return common_triples
+    return match_triples(triples_wikipedia, triples_wikidata, matcher)[0]
 
 def save_common_triples(common_triples, output_filename):
     """
@@ -54,12 +211,21 @@ def save_common_triples(common_triples, output_filename):
         for triple in common_triples:
             f.write(f"'{triple[0]}'  '{triple[1]}', '{triple[2]}' \n")
 
-for file1, file2 in FILES:
-    triples_wikipedia = read_triples(FOLDER+file1)
-    triples_wikidata = read_triples(FOLDER+file2)
+def main():
+    """
+    Compares the verified Wikipedia and Wikidata triples of each pair of FILES.
+    """
+    matcher = TripleMatcher()
+    for file1, file2 in FILES:
+        triples_wikipedia = read_triples(FOLDER+file1)
+        triples_wikidata = read_triples(FOLDER+file2)
+
+        common_triples, precision, recall = match_triples(triples_wikipedia, triples_wikidata, matcher)
 
-    common_triples = compare_triples(triples_wikipedia, triples_wikidata)
+        save_common_triples(common_triples, file1.split('_')[1]+'_common_triples.txt')
 
-    save_common_triples(common_triples, file1.split('_')[1]+'_common_triples.txt')
+        print(f"Found {len(common_triples)} common triples for {file1.split('_')[1]} "
+              f"(precision {precision:.1%}, recall {recall:.1%}).")
 
-    print(f"Found {len(common_triples)} common triples for {file1.split('_')[1]}.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import random
+import threading
+import time
+from collections import deque, namedtuple
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configuration
+USER_AGENT = 'wikipedia-triples-extract/1.0 (python-requests)'
+POOL_SIZE = 16                  # kept-alive connections per host
+TIMEOUT = (5, 30)               # seconds to connect and to wait for the response
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 0.5            # the n-th retry waits up to BACKOFF_FACTOR * 2 ** n seconds
+MAX_BACKOFF = 60
+REQUESTS_PER_SECOND = 10        # rate limit of every host
+BURST = 10                      # requests sent at once before the rate limit applies
+MAXLAG = 5                      # seconds of database lag tolerated by the MediaWiki API
+REQUEST_LOG_SIZE = 1000         # recent requests kept in HttpClient.request_log
+
+# CONSTANTS
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# A finished request; latency in seconds, size in bytes of the body as received, before decompression
+RequestRecord = namedtuple('RequestRecord', ['url', 'status_code', 'latency', 'size', 'attempt'])
+
+# Global variables
+shared_client = None
+client_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Limits the rate of requests: every request takes a token, and tokens are
+    added at a constant rate up to the capacity of the bucket.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        :param rate: Tokens added per second.
+        :param capacity: Maximum number of tokens, i.e. the allowed burst.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting until one is available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # a missing token is reserved, so that waiting threads are served in order
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class HttpClient:
+    """
+    An HTTP client shared by the crawlers: a pooled keep-alive session with
+    timeouts, per-host rate limiting and retries with exponential backoff of
+    failed, throttled (429, Retry-After) and lagged (MediaWiki maxlag)
+    requests. It records the latency and size of every request.
+
+    get() takes the arguments of requests.Session.get used by the crawlers,
+    so the client can be passed wherever a session was.
+    """
+
+    def __init__(self, requests_per_second=REQUESTS_PER_SECOND, burst=BURST,
+                 max_retries=MAX_RETRIES, timeout=TIMEOUT, pool_size=POOL_SIZE):
+        """
+        :param requests_per_second: Rate limit of every host.
+        :param burst: Number of requests sent at once before the rate limit applies.
+        :param max_retries: Number of retries of a failed request.
+        :param timeout: Timeout of the requests, as accepted by requests.
+        :param pool_size: Number of kept-alive connections per host.
+        """
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip'})
+
+        self.buckets = {}
+        self.stats = {}
+        self.request_log = deque(maxlen=REQUEST_LOG_SIZE)
+        self.lock = threading.Lock()
+
+    def bucket(self, host):
+        """Return the token bucket of a host."""
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+            return self.buckets[host]
+
+    def record(self, host, url, status_code, latency, size, attempt):
+        """Add a finished request or a failed attempt to the counters of its host."""
+        with self.lock:
+            stats = self.stats.setdefault(host, {'requests': 0, 'retries': 0, 'errors': 0,
+                                                 'seconds': 0.0, 'bytes': 0})
+            stats['requests'] += 1
+            stats['retries'] += attempt > 0
+            stats['errors'] += status_code is None or status_code >= 400
+            stats['seconds'] += latency
+            stats['bytes'] += size
+            self.request_log.append(RequestRecord(url, status_code, latency, size, attempt))
+
+    @staticmethod
+    def should_retry(response):
+        """Check whether the response asks to repeat the request later."""
+        return response.status_code in RETRY_STATUSES \
+            or response.headers.get('MediaWiki-API-Error') == 'maxlag'
+
+    @staticmethod
+    def retry_after(response):
+        """
+        Read the Retry-After header of a response.
+
+        :return: Seconds to wait, or None if the header is missing or invalid.
+        """
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return int(value)
+        try:
+            return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def backoff(attempt):
+        """Return the randomized exponential delay before the given retry."""
+        return min(MAX_BACKOFF, BACKOFF_FACTOR * 2 ** attempt) * random.uniform(0.5, 1)
+
+    @staticmethod
+    def received_size(response):
+        """
+        Return the size of the body of a response as it was received, i.e.
+        compressed for gzip responses, whether or not it had a Content-Length.
+        """
+        # reading the content makes the whole body pass through the connection
+        content = response.content
+        try:
+            return response.raw.tell()
+        except AttributeError:
+            return len(content)
+
+    def get(self, url, params=None, headers=None):
+        """
+        Send a GET request, retrying it on connection errors, timeouts,
+        server errors, throttling and database lag.
+
+        :param url: Address of the request.
+        :param params: Query parameters.
+        :param headers: Additional request headers.
+        :return: The HTTP response; the last one if all retries failed.
+        """
+        host = urlsplit(url).netloc
+        for attempt in range(self.max_retries + 1):
+            self.bucket(host).acquire()
+            start_time = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self.record(host, url, None, time.perf_counter() - start_time, 0, attempt)
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                self.record(host, url, response.status_code,
+                            time.perf_counter() - start_time, self.received_size(response), attempt)
+                if attempt == self.max_retries or not self.should_retry(response):
+                    return response
+                delay = self.retry_after(response)
+                delay = self.backoff(attempt) if delay is None else min(delay, MAX_BACKOFF)
+            time.sleep(delay)
+
+    def report(self):
+        """Print the request counters of every host."""
+        with self.lock:
+            for host, stats in sorted(self.stats.items()):
+                average = stats['seconds'] / stats['requests'] if stats['requests'] else 0
+                print(f"{host}: {stats['requests']} requests ({stats['retries']} retries, "
+                      f"{stats['errors']} errors), {stats['bytes'] / 1024 ** 2:.1f} MB, "
+                      f"{average * 1000:.0f} ms on average")
+
+
+def get_client():
+    """
+    Return the HTTP client shared by the whole process, creating it on first use.
+
+    :return: The shared HttpClient.
+    """
+    global shared_client
+    with client_lock:
+        if shared_client is None:
+            shared_client = HttpClient()
+        return shared_client
@@ -0,0 +1,124 @@
+# CONSTANTS
+# Relations of the Wikipedia and Wikidata triples meaning "subject inherits from object"
+INHERITANCE_RELATIONS = ('is a', 'instance of', 'subclass of')
+
+
+class InheritanceClosure:
+    """
+    The transitive closure of inheritance triples, e.g. ('car', 'subclass of',
+    'motor vehicle') and ('motor vehicle', 'is a', 'vehicle') make 'vehicle'
+    an ancestor of 'car'.
+
+    Every class gets an index, and its ancestors and descendants are kept as
+    bitsets (Python integers with the bits of the indexes set), so checking
+    whether one class inherits from another is a single bit test. New edges
+    update the closure in place, without recomputing it.
+    """
+
+    def __init__(self):
+        self.indexes = {}
+        self.names = []
+        self.ancestors = []
+        self.descendants = []
+
+    @classmethod
+    def from_triples(cls, triples, relations=INHERITANCE_RELATIONS):
+        """
+        Build the closure of the inheritance triples among the given ones.
+
+        :param triples: Triples (subject, relation, object, ...); further
+                        fields, e.g. of processed triples, are ignored.
+        :param relations: Relations treated as inheritance.
+        :return: InheritanceClosure of the triples.
+        """
+        closure = cls()
+        closure.add_triples(triples, relations)
+        return closure
+
+    def index(self, name):
+        """Return the index of a class, adding the class if it is new."""
+        index = self.indexes.get(name)
+        if index is None:
+            index = self.indexes[name] = len(self.names)
+            self.names.append(name)
+            self.ancestors.append(0)
+            self.descendants.append(0)
+        return index
+
+    def add_edge(self, child, parent):
+        """
+        Add the edge "child inherits from parent" and update the closure:
+        the child and all its descendants get the parent and all its
+        ancestors as ancestors.
+
+        :param child: Name of the inheriting class.
+        :param parent: Name of the class inherited from.
+        """
+        child_index = self.index(child)
+        parent_index = self.index(parent)
+        if self.ancestors[child_index] >> parent_index & 1:
+            return
+
+        new_ancestors = self.ancestors[parent_index] | 1 << parent_index
+        new_descendants = self.descendants[child_index] | 1 << child_index
+        for index in self.members(new_descendants):
+            self.ancestors[index] |= new_ancestors
+        for index in self.members(new_ancestors):
+            self.descendants[index] |= new_descendants
+
+    def add_triples(self, triples, relations=INHERITANCE_RELATIONS):
+        """
+        Add the inheritance triples among the given ones.
+
+        :param triples: Triples (subject, relation, object, ...).
+        :param relations: Relations treated as inheritance.
+        """
+        for triple in triples:
+            if triple[1] in relations:
+                self.add_edge(triple[0], triple[2])
+
+    @staticmethod
+    def members(bitset):
+        """Return the indexes of the bits set in the bitset."""
+        indexes = []
+        while bitset:
+            lowest = bitset & -bitset
+            indexes.append(lowest.bit_length() - 1)
+            bitset ^= lowest
+        return indexes
+
+    def is_ancestor(self, ancestor, name):
+        """
+        Check whether a class inherits, directly or not, from another one.
+
+        :param ancestor: Name of the possible ancestor.
+        :param name: Name of the class.
+        :return: True if name inherits from ancestor.
+        """
+        if ancestor not in self.indexes or name not in self.indexes:
+            return False
+        return bool(self.ancestors[self.indexes[name]] >> self.indexes[ancestor] & 1)
+
+    def get_ancestors(self, name):
+        """Return the set of names of all classes the given class inherits from."""
+        if name not in self.indexes:
+            return set()
+        return {self.names[index] for index in self.members(self.ancestors[self.indexes[name]])}
+
+    def get_ancestors_of_all(self, names):
+        """
+        Return the set of names of all classes any of the given classes
+        inherits from, with one pass over the union of their bitsets.
+        """
+        ancestors = 0
+        for name in names:
+            index = self.indexes.get(name)
+            if index is not None:
+                ancestors |= self.ancestors[index]
+        return {self.names[index] for index in self.members(ancestors)}
+
+    def get_descendants(self, name):
+        """Return the set of names of all classes inheriting from the given class."""
+        if name not in self.indexes:
+            return set()
+        return {self.names[index] for index in self.members(self.descendants[self.indexes[name]])}
@@ -0,0 +1,120 @@
+import time
+from multiprocessing import Pool
+from article_cache import ArticleCache
+from spacy_models import get_model
+from wikipedia_triples_extract import (
+    OFFLINE_MODE, TESTED_LINKS, WikipediaExtractor, create_fetcher
+)
+
+# Configuration
+MAX_DEPTH_LEVEL = 2
+MAX_SENTENCES_FROM_PARAGRAPH = 7
+PROCESSES = None            # number of worker processes, None for one per core
+ARTICLES_PER_TASK = 64      # articles sent to a worker process at once
+
+# Global variables of a worker process
+worker_extractor = None
+
+def init_worker(max_sentences_from_paragraph):
+    """
+    Prepare a worker process: create its extractor and load the SpaCy model
+    once for all articles the worker gets.
+
+    :param max_sentences_from_paragraph: Maximum number of sentences
+                                         to extract from each paragraph.
+    """
+    global worker_extractor
+    worker_extractor = WikipediaExtractor(
+        max_sentences_from_paragraph=max_sentences_from_paragraph)
+    get_model(worker_extractor.model_name)
+
+def extract_articles(articles):
+    """
+    Extract the triples of each article separately, with the sentences of all
+    given articles parsed in one batch.
+
+    :param articles: A list of (url, ParsedArticle) pairs.
+    :return: A dictionary mapping each url to the set of its triples.
+    """
+    article_triples = {}
+    for url, article in articles:
+        article_triples[url] = worker_extractor.get_triples_from_infobox(article)
+        worker_extractor.queue_sentences(article, url)
+
+    for url, triples in worker_extractor.process_sentence_queue().items():
+        article_triples[url] |= triples
+    worker_extractor.triples.clear()
+    return article_triples
+
+def collect_seed_articles(seeds, articles, max_depth_level, cache=None, fetcher=None):
+    """
+    Crawl every seed as extract() would, without parsing the sentences, and
+    keep the fetched articles in a store shared by all seeds, so that an
+    article reachable from several seeds is fetched once.
+
+    :param seeds: Links of the starting articles in format '/wiki/ARTICLE_NAME'.
+    :param articles: Shared article store mapping links to ParsedArticle objects.
+    :param max_depth_level: Maximum depth level for recursion.
+    :param cache: Optional ArticleCache serving previously fetched articles.
+    :param fetcher: Optional fetcher of the articles' HTML.
+    :return: A dictionary mapping each seed to the links of the articles it visits.
+    """
+    seed_urls = {}
+    for seed in seeds:
+        crawler = WikipediaExtractor(max_depth_level=max_depth_level, cache=cache, fetcher=fetcher)
+        crawler.loaded_articles = articles
+        crawler.prefetch_articles(seed)
+        seed_urls[seed] = [url for url, _ in crawler.traverse(seed)]
+    return seed_urls
+
+def run_seeds(seeds, max_depth_level=MAX_DEPTH_LEVEL,
+              max_sentences_from_paragraph=MAX_SENTENCES_FROM_PARAGRAPH,
+              processes=PROCESSES, cache=None, fetcher=None):
+    """
+    Extract triples for several seeds. Every article reached by any seed is
+    parsed once in a pool of worker processes and its triples are attributed
+    to all seeds reaching it, giving each seed the same triples as a separate
+    WikipediaExtractor run.
+
+    :param seeds: Links of the starting articles in format '/wiki/ARTICLE_NAME'.
+    :param max_depth_level: Maximum depth level for recursion.
+    :param max_sentences_from_paragraph: Maximum number of sentences
+                                         to extract from each paragraph.
+    :param processes: Number of worker processes, None for one per core.
+    :param cache: Optional ArticleCache serving previously fetched articles.
+    :param fetcher: Optional fetcher of the articles' HTML.
+    :return: A dictionary mapping each seed to its set of triples.
+    """
+    articles = {}
+    seed_urls = collect_seed_articles(seeds, articles, max_depth_level, cache, fetcher)
+
+    urls = sorted({url for visited in seed_urls.values() for url in visited})
+    tasks = [[(url, articles[url]) for url in urls[i:i + ARTICLES_PER_TASK]]
+             for i in range(0, len(urls), ARTICLES_PER_TASK)]
+
+    article_triples = {}
+    with Pool(processes, initializer=init_worker,
+              initargs=(max_sentences_from_paragraph,)) as pool:
+        for result in pool.imap_unordered(extract_articles, tasks):
+            article_triples.update(result)
+
+    return {seed: set().union(*(article_triples[url] for url in visited))
+            for seed, visited in seed_urls.items()}
+
+def main():
+    """
+    Run extraction for tested links in worker processes and save the triples
+    of each of them as wikipedia_triples_extract.py does.
+    """
+    start_time = time.time()
+    seed_triples = run_seeds(TESTED_LINKS, cache=ArticleCache(offline=OFFLINE_MODE),
+                             fetcher=create_fetcher())
+    print(f'Run finished for {len(TESTED_LINKS)} links, execution time: {time.time() - start_time}')
+
+    for seed, triples in seed_triples.items():
+        we = WikipediaExtractor()
+        we.triples = triples
+        we.save_triples_to_file(seed.split('/')[2]+'_triples_from_wikipedia.txt')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+class PairIndex:
+    """
+    An index of processed triples (sub, rel, obj, rel_t, sub_t, obj_t) by
+    their (subject, object) pair, built in one pass. It tells whether a
+    triple has a reverse one in constant time instead of a scan over all
+    triples.
+    """
+
+    def __init__(self, triples):
+        """
+        :param triples: List of processed triples.
+        """
+        self.pairs = {(triple[0], triple[2]) for triple in triples}
+
+    def has_reverse(self, sub, obj):
+        """Check whether any triple goes from obj back to sub."""
+        return (obj, sub) in self.pairs
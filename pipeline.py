@@ -0,0 +1,341 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from itertools import islice
+import convert_from_triples_to_UML
+import triples_parse_and_verify
+from article_cache import ArticleCache
+from convert_from_triples_to_UML import (
+    format_class, format_relation, get_uml_element, remove_implied_generalizations
+)
+from find_common_wikipedia_wikidata import TripleMatcher, read_triples, save_common_triples
+from inheritance_closure import InheritanceClosure
+from triples_parse_and_verify import (
+    add_inherited_classes, identified_classes, identify_entities, load_entity_cache,
+    normalize_triple, save_entity_cache, type_triple
+)
+from wikipedia_triples_extract import OFFLINE_MODE, WikipediaExtractor, create_fetcher
+
+# Configuration
+MAX_DEPTH_LEVEL = 2
+QUEUE_SIZE = 16                 # crawled articles waiting for the extraction
+CLASSIFY_BATCH_SIZE = 256       # triples whose subjects and objects are classified together
+COMPARE_BATCH_SIZE = 256        # triples whose subjects and objects are lemmatized together
+STATE_CACHE_KIB = 8192          # memory of the state kept by a stage until the end of the stream
+VERIFIED_FORMAT = 'verified_files/output_{}_triples.txt'
+
+# Seeds with the Wikidata entities their triples are compared with
+PIPELINE_RUNS = [
+    ('/wiki/Polish_language', 'Q809'),
+    ('/wiki/Computer', 'Q68'),
+    ('/wiki/Airport', 'Q1248784'),
+    ('/wiki/Islam', 'Q432'),
+    ('/wiki/Car', 'Q1420'),
+    ('/wiki/Giraffe', 'Q15083'),
+    ('/wiki/Brain', 'Q1073'),
+    ('/wiki/Planet', 'Q634'),
+]
+
+# Exception raised by the producer of buffered(), passed on to its consumer
+Failure = namedtuple('Failure', ['error'])
+DONE = object()
+
+
+def buffered(iterable, maxsize=QUEUE_SIZE):
+    """
+    Run a stage in a thread of its own, passing its items on through a
+    bounded queue. The stage pauses when the queue is full, so it cannot get
+    further ahead of its consumer than maxsize items (back-pressure).
+
+    :param iterable: The stage, e.g. a generator.
+    :param maxsize: Maximum number of items waiting in the queue.
+    :return: A generator of the items of the stage.
+    """
+    items = queue.Queue(maxsize)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as error:
+            put(Failure(error))
+            return
+        put(DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = items.get()
+            if item is DONE:
+                return
+            if isinstance(item, Failure):
+                raise item.error
+            yield item
+    finally:
+        # lets the producer end if the consumer stops early
+        stopped.set()
+
+def open_state(schema):
+    """
+    Open a temporary database for the state a stage keeps until the end of
+    the stream, e.g. the triples seen so far. SQLite keeps at most
+    STATE_CACHE_KIB of it in memory and writes the rest to a temporary file,
+    removed when the database is closed, so memory does not grow with the
+    number of triples.
+
+    :param schema: SQL creating the tables of the state.
+    :return: The sqlite3 connection.
+    """
+    state = sqlite3.connect('')
+    state.execute(f'PRAGMA cache_size = -{STATE_CACHE_KIB}')
+    state.executescript(schema)
+    return state
+
+def extract(extractor, articles):
+    """
+    Extraction stage: yield the triples of the articles as they arrive, with
+    the sentences parsed in batches of extractor.batch_size.
+
+    :param extractor: WikipediaExtractor used for the extraction.
+    :param articles: Iterable of (url, ParsedArticle) pairs, e.g. from traverse().
+    :return: A generator of (subject, relation, object) triples, each yielded once.
+    """
+    seen = open_state('CREATE TABLE seen (sub TEXT, rel TEXT, obj TEXT, PRIMARY KEY (sub, rel, obj));')
+
+    def new_triples(triples):
+        extractor.triples.clear()
+        return [triple for triple in sorted(triples)
+                if seen.execute('INSERT OR IGNORE INTO seen VALUES (?, ?, ?)', triple).rowcount]
+
+    try:
+        for _, article in articles:
+            yield from new_triples(extractor.get_triples_from_infobox(article))
+            extractor.queue_sentences(article)
+            if len(extractor.sentence_queue) >= extractor.batch_size:
+                yield from new_triples(set().union(*extractor.process_sentence_queue().values()))
+        yield from new_triples(set().union(*extractor.process_sentence_queue().values()))
+    finally:
+        seen.close()
+
+def classify(triples, batch_size=CLASSIFY_BATCH_SIZE):
+    """
+    Classification stage: normalize the triples, classify their subjects and
+    objects in batches and assign the relation types, as the verifier does.
+
+    :param triples: Iterable of extracted triples.
+    :param batch_size: Number of triples classified together.
+    :return: A generator of processed triples (sub, rel, obj, rel_t, sub_t, obj_t).
+    """
+    triples = iter(triples)
+    while True:
+        batch = list(islice(triples, batch_size))
+        if not batch:
+            return
+        batch = [triple for triple in map(normalize_triple, batch) if triple is not None]
+        identify_entities([text for sub, _, obj in batch for text in (sub, obj)])
+        for sub, rel, obj in batch:
+            yield type_triple(sub, rel, obj)
+
+def reprocess(triples):
+    """
+    Streaming version of reprocess_aggregation_relations: an aggregation
+    becomes a composition when the reverse pair appears anywhere in the
+    stream. Other triples pass at once; aggregations without a reverse pair
+    so far wait for it until the end of the stream.
+
+    :param triples: Iterable of processed triples.
+    :return: A generator of the processed triples with corrected relation types.
+    """
+    state = open_state("""
+        CREATE TABLE pairs (sub TEXT, obj TEXT, PRIMARY KEY (sub, obj));
+        CREATE TABLE waiting (position INTEGER PRIMARY KEY, sub TEXT, rel TEXT, obj TEXT,
+                              rel_t TEXT, sub_t TEXT, obj_t TEXT);
+        CREATE INDEX waiting_pairs ON waiting (obj, sub);
+    """)
+    select_waiting = 'SELECT sub, rel, obj, rel_t, sub_t, obj_t FROM waiting'
+    try:
+        for position, triple in enumerate(triples):
+            sub, rel, obj, rel_t, sub_t, obj_t = triple
+            state.execute('INSERT OR IGNORE INTO pairs VALUES (?, ?)', (sub, obj))
+            # aggregations waiting for this pair as their reverse one
+            reverse = (sub, obj)
+            waiting = state.execute(select_waiting + ' WHERE obj = ? AND sub = ? ORDER BY position',
+                                    reverse).fetchall()
+            if waiting:
+                state.execute('DELETE FROM waiting WHERE obj = ? AND sub = ?', reverse)
+            for waiting_triple in waiting:
+                yield waiting_triple[:3] + ('composition',) + waiting_triple[4:]
+
+            if rel_t != 'aggregation':
+                yield triple
+            elif state.execute('SELECT 1 FROM pairs WHERE sub = ? AND obj = ?', (obj, sub)).fetchone():
+                yield (sub, rel, obj, 'composition', sub_t, obj_t)
+            else:
+                state.execute('INSERT INTO waiting VALUES (?, ?, ?, ?, ?, ?, ?)', (position,) + triple)
+
+        yield from state.execute(select_waiting + ' ORDER BY position')
+    finally:
+        state.close()
+
+def apply_identified_classes(triples):
+    """
+    Stage marking subjects and objects as classes when the verifier
+    identified them as classes, as write_processed_triples does (with
+    INHERIT_CLASSES, together with the classes they inherit from). A class
+    can be identified by a later triple, so only triples of two classes pass
+    at once; the others wait until the end of the stream.
+
+    :param triples: Iterable of processed triples.
+    :return: A generator of the verified triples.
+    """
+    inherit_classes = triples_parse_and_verify.INHERIT_CLASSES
+    closure = InheritanceClosure()
+    waiting = open_state("""
+        CREATE TABLE waiting (position INTEGER PRIMARY KEY, sub TEXT, rel TEXT, obj TEXT,
+                              rel_t TEXT, sub_t TEXT, obj_t TEXT);
+    """)
+    try:
+        for position, triple in enumerate(triples):
+            if inherit_classes:
+                closure.add_triples([triple])
+            if triple[4] == 'class' and triple[5] == 'class':
+                yield triple
+            else:
+                waiting.execute('INSERT INTO waiting VALUES (?, ?, ?, ?, ?, ?, ?)', (position,) + triple)
+
+        if inherit_classes:
+            add_inherited_classes(closure)
+        for sub, rel, obj, rel_t, sub_t, obj_t in waiting.execute(
+                'SELECT sub, rel, obj, rel_t, sub_t, obj_t FROM waiting ORDER BY position'):
+            if obj in identified_classes:
+                obj_t = 'class'
+            if sub in identified_classes:
+                sub_t = 'class'
+            yield (sub, rel, obj, rel_t, sub_t, obj_t)
+    finally:
+        waiting.close()
+
+def compare(triples, reference, common, matcher, batch_size=COMPARE_BATCH_SIZE):
+    """
+    Comparison stage: pass the triples on, collecting the ones matching a
+    reference triple, as find_common_wikipedia_wikidata.py does. The new
+    subjects and objects of a batch of triples are lemmatized together.
+
+    :param triples: Iterable of verified triples.
+    :param reference: Set of normalized keys of the reference triples.
+    :param common: List the common (subject, relation type, object) tuples are added to.
+    :param matcher: TripleMatcher normalizing the triples.
+    :param batch_size: Number of triples normalized together.
+    :return: A generator of the verified triples.
+    """
+    triples = iter(triples)
+    while True:
+        batch = list(islice(triples, batch_size))
+        if not batch:
+            return
+        compared = [(triple[0].lower(), triple[3].lower(), triple[2].lower()) for triple in batch]
+        for triple, key in zip(compared, matcher.keys(compared)):
+            if key in reference:
+                common.append(triple)
+        yield from batch
+
+def emit_uml(triples, filename):
+    """
+    Final stage: write the UML diagram as the triples arrive. Relations are
+    written at once, classes with their attributes at the end. With
+    DIRECT_GENERALIZATIONS_ONLY, inheritance relations are written at the
+    end too, without the ones implied by other ones.
+
+    :param triples: Iterable of verified triples.
+    :param filename: The name of the file to write to.
+    :return: Number of triples consumed.
+    """
+    attributes = {}
+    direct_generalizations_only = convert_from_triples_to_UML.DIRECT_GENERALIZATIONS_ONLY
+    generalizations = []
+    count = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('@startuml '+filename+'\n')
+        f.write('hide empty methods\n\n')
+        for triple in triples:
+            count += 1
+            element = get_uml_element(triple)
+            if element is None:
+                continue
+            if element[0] == 'attribute':
+                attributes.setdefault(element[1], []).append(element[2])
+            elif direct_generalizations_only and element[1][2] == 'inheritance':
+                generalizations.append(element[1])
+            else:
+                f.write(format_relation(element[1]))
+        for relation in remove_implied_generalizations(generalizations):
+            f.write(format_relation(relation))
+        for single_class, class_attributes in attributes.items():
+            f.write(format_class(single_class, class_attributes))
+        f.write('@endtuml')
+    return count
+
+def run_pipeline(seed, reference, uml_filename, max_depth_level=MAX_DEPTH_LEVEL,
+                 cache=None, fetcher=None, matcher=None):
+    """
+    Crawl, extract, verify, compare and convert to UML the triples of one
+    seed in one process. The crawl runs in its own thread, ahead of the
+    other stages by at most QUEUE_SIZE articles, and every triple flows
+    through all stages without the complete lists being built.
+
+    :param seed: Link of the starting article in format '/wiki/ARTICLE_NAME'.
+    :param reference: List of (subject, relation type, object) tuples of Wikidata.
+    :param uml_filename: The name of the UML file to write.
+    :param max_depth_level: Maximum depth level of the crawl.
+    :param cache: Optional ArticleCache serving previously fetched articles.
+    :param fetcher: Optional fetcher of the articles' HTML.
+    :param matcher: Optional TripleMatcher of the comparison.
+    :return: A tuple (number of verified triples, list of common triples).
+    """
+    extractor = WikipediaExtractor(max_depth_level=max_depth_level, cache=cache, fetcher=fetcher)
+    identified_classes.clear()
+    matcher = matcher or TripleMatcher()
+    common = []
+
+    articles = buffered(extractor.traverse(seed))
+    triples = extract(extractor, articles)
+    triples = classify(triples)
+    triples = reprocess(triples)
+    triples = apply_identified_classes(triples)
+    triples = compare(triples, matcher.reference_keys(reference), common, matcher)
+    return emit_uml(triples, uml_filename), common
+
+def main():
+    """
+    Run the pipeline for every seed of PIPELINE_RUNS.
+    """
+    load_entity_cache()
+    cache = ArticleCache(offline=OFFLINE_MODE)
+    fetcher = create_fetcher()
+    matcher = TripleMatcher()
+    for seed, entity_id in PIPELINE_RUNS:
+        start_time = time.time()
+        name = seed.split('/')[2]
+        reference = read_triples(VERIFIED_FORMAT.format(entity_id))
+        count, common = run_pipeline(seed, reference, name + '_pipeline.iuml',
+                                     cache=cache, fetcher=fetcher, matcher=matcher)
+        save_common_triples(common, name + '_pipeline_common_triples.txt')
+        print(f"{seed}: {count} verified triples, {len(common)} common with {entity_id}, "
+              f"execution time: {time.time() - start_time}")
+    save_entity_cache()
+
+if __name__ == "__main__":
+    main()
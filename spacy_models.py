@@ -0,0 +1,39 @@
+import threading
+import spacy
+
+# CONSTANTS
+DEFAULT_MODEL = "en_core_web_trf"
+
+# Pipeline components used by each stage; the other ones are disabled
+STAGE_COMPONENTS = {
+    'extraction': ('transformer', 'tok2vec', 'tagger', 'attribute_ruler', 'parser'),
+    'verification': ('transformer', 'tok2vec', 'ner'),
+    'normalization': ('tok2vec', 'tagger', 'attribute_ruler', 'lemmatizer'),
+}
+
+# Global variables
+loaded_models = {}
+models_lock = threading.Lock()
+
+def get_model(name=DEFAULT_MODEL):
+    """
+    Return the process-wide instance of a SpaCy model, loading it on first use.
+
+    :param name: Name of the SpaCy model.
+    :return: The loaded model.
+    """
+    with models_lock:
+        if name not in loaded_models:
+            loaded_models[name] = spacy.load(name)
+        return loaded_models[name]
+
+def disabled_components(nlp, stage):
+    """
+    List the pipeline components of a model which a stage does not use, to be
+    passed as the 'disable' argument of nlp() and nlp.pipe().
+
+    :param nlp: The loaded SpaCy model.
+    :param stage: Name of the stage, one of STAGE_COMPONENTS.
+    :return: A list of component names.
+    """
+    return [name for name in nlp.pipe_names if name not in STAGE_COMPONENTS[stage]]
@@ -0,0 +1,30 @@
+from collections import namedtuple
+import pytest
+from article_cache import ArticleCache, CacheMiss
+
+Response = namedtuple('Response', ['status_code', 'text', 'headers'])
+
+
+def get_page(url, headers):
+    return Response(200, f'<html>{url}</html>' + 'x' * 1000, {})
+
+
+def test_offline_serves_cached_page(tmp_path):
+    ArticleCache(tmp_path).fetch(get_page, '/wiki/Car')
+    assert ArticleCache(tmp_path, offline=True).fetch(get_page, '/wiki/Car').startswith('<html>/wiki/Car')
+
+
+def test_offline_missing_page_raises(tmp_path):
+    cache = ArticleCache(tmp_path, offline=True)
+    with pytest.raises(CacheMiss):
+        cache.fetch(get_page, '/wiki/Car')
+
+
+def test_offline_evicted_page_raises(tmp_path):
+    cache = ArticleCache(tmp_path, max_size=100)
+    cache.fetch(get_page, '/wiki/Car')
+    cache.fetch(get_page, '/wiki/Bus')
+
+    offline = ArticleCache(tmp_path, max_size=100, offline=True)
+    with pytest.raises(CacheMiss):
+        offline.fetch(get_page, '/wiki/Car')
@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import pytest
+
+pytest.importorskip('requests')
+
+from article_fetchers import LeadSectionFetcher
+from article_parser import parse_article
+from http_client import HttpClient
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'article.html')
+
+
+def read_fixture():
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def lead_section(html):
+    """The text of section 0 as the parse API returns it: the parser output up to the first heading."""
+    start = html.index('<div class="mw-content-ltr mw-parser-output"')
+    return html[start:html.index('<div class="mw-heading mw-heading2')] + '</div>'
+
+
+class ParseApiHandler(BaseHTTPRequestHandler):
+    """Answers action=parse requests with the lead section of the fixture, gzip-compressed."""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        with self.server.lock:
+            self.server.requests.append((url.path, query, self.headers.get('Accept-Encoding', '')))
+        if query.get('page') == 'Car':
+            result = {'parse': {'title': 'Car', 'pageid': 1, 'text': lead_section(read_fixture())}}
+        else:
+            result = {'error': {'code': 'missingtitle', 'info': "The page you specified doesn't exist."}}
+        body = gzip.compress(json.dumps(result).encode('utf-8'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    stub = ThreadingHTTPServer(('127.0.0.1', 0), ParseApiHandler)
+    stub.daemon_threads = True
+    stub.lock = threading.Lock()
+    stub.requests = []
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    stub.url = f'http://127.0.0.1:{stub.server_address[1]}'
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+def parts(article):
+    sentences = [(article.lead_text[start:end], article.sentence_links(start, end))
+                 for start, end in article.sentences]
+    return article.title, sentences, article.get_hrefs(), article.infobox_labels
+
+
+def test_lead_section_parses_like_full_page(server):
+    fetcher = LeadSectionFetcher(HttpClient(requests_per_second=1000, burst=100, max_retries=0),
+                                 server.url)
+    html = fetcher.fetch('/wiki/Car')
+
+    assert parts(parse_article(html)) == parts(parse_article(read_fixture()))
+    path, query, accept_encoding = server.requests[0]
+    assert path == '/w/api.php'
+    assert (query['action'], query['page'], query['section'], query['prop']) == ('parse', 'Car', '0', 'text')
+    assert 'gzip' in accept_encoding
+
+
+def test_lead_section_of_missing_or_other_pages(server):
+    fetcher = LeadSectionFetcher(HttpClient(requests_per_second=1000, burst=100, max_retries=0),
+                                 server.url)
+    # an API error gives an empty article, links outside /wiki/ are not requested
+    assert fetcher.fetch('/wiki/No_such_page') == ''
+    assert parse_article('').title is None
+    assert fetcher.fetch('/w/index.php?title=Car') == ''
+    assert [query['page'] for _, query, _ in server.requests] == ['No_such_page']
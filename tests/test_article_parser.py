@@ -0,0 +1,90 @@
+import os
+import re
+import pytest
+from article_parser import parse_article
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'article.html')
+
+
+def read_fixture():
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def legacy_parse(html):
+    """
+    The regex and BeautifulSoup extraction before ArticleParser: the title,
+    the sentences with their link texts and titles, the links of the lead
+    paragraphs and the infobox labels.
+    """
+    BeautifulSoup = pytest.importorskip('bs4').BeautifulSoup
+    span = re.compile("<span[^>]*[^>]*>[^~]*?</span>")
+    sup = re.compile("<sup[^>]*[^>]*>[^~]*?</sup>")
+
+    title = re.findall('<span class="mw-page-title-main">([^~]*?)</span>', html)[0]
+
+    content = html[html.find('<div id="mw-content-text"'):html.find('<div class="mw-heading mw-heading2')]
+    content = " ".join(re.findall("<p>(.*)", content))
+    content = re.sub(span, '', content)
+    content = re.sub(sup, '', content)
+
+    sentences = []
+    for sentence_raw in re.findall(r".*?\.[ ]", content):
+        soup = BeautifulSoup(sentence_raw, "html.parser")
+        sentences.append((soup.get_text(), [a.get_text() for a in soup.find_all('a')],
+                          [a.get('title') or a.get_text() for a in soup.find_all('a')]))
+
+    hrefs = []
+    for link in re.findall("<a[^>]*[^>]*>[^~]*?</a>", content):
+        url = re.findall('href=\"(/.*)?\" ', link)
+        if len(url) > 0:
+            hrefs.append(url[0].split('"')[0])
+
+    infobox = html[html.find('<table class="infobox"'):html.find('</table>')]
+    soup = BeautifulSoup(re.sub(sup, '', infobox), 'html.parser')
+    labels = []
+    for row in soup.find('table', class_='infobox').find_all('tr'):
+        label_cell = row.find('th', class_='infobox-label')
+        if label_cell and '•' not in label_cell.get_text():
+            labels.append(label_cell.get_text().strip())
+
+    return title, sentences, hrefs, labels
+
+
+def parse(html):
+    """Return the same parts as legacy_parse() from a ParsedArticle."""
+    article = parse_article(html)
+    sentences = []
+    for start, end in article.sentences:
+        links = article.sentence_links(start, end)
+        sentences.append((article.lead_text[start:end], [link.text for link in links],
+                          [link.title for link in links]))
+    return article.title, sentences, article.get_hrefs(), article.infobox_labels
+
+
+def test_parser_gives_same_parts_as_legacy_extraction():
+    html = read_fixture()
+    assert parse(html) == legacy_parse(html)
+
+
+def test_parser_keeps_legacy_quirks():
+    title, sentences, hrefs, labels = parse(read_fixture())
+    texts = [text for text, _, _ in sentences]
+
+    assert title == 'Car'
+    # pronunciation spans and references are left out of the text
+    assert texts[0] == 'A car or automobile  is a motor vehicle with wheels. '
+    # a period followed by a space ends a sentence, even after an abbreviation
+    assert 'Cars use e.g. ' in texts
+    # a paragraph ends a sentence, but the last sentence of the lead is
+    # dropped, as no space follows its period
+    assert 'Cars include sedans and hatchbacks. ' in texts
+    assert not any('dropped' in text for text in texts)
+    # paragraphs with attributes and paragraphs after the first heading are not in the lead
+    assert not any('Latin' in text for text in texts)
+    # a link without a title is titled by its text
+    assert sentences[1][1:] == (['roads'], ['roads'])
+    # only internal links are followed
+    assert '/wiki/Road' in hrefs and not any(href.startswith('http') for href in hrefs)
+    # sub-properties marked with • are skipped, label styles and references are left out
+    assert labels == ['Classification', 'Industry', 'Fuel source', 'Powered']
@@ -0,0 +1,57 @@
+import random
+import pytest
+from entity_alignment import MIN_SIMILARITY, NgramIndex, align_entities, get_ngrams, similarity
+
+TARGETS = ['polish language', 'english language', 'warsaw', 'poland']
+
+
+def test_misspelled_name_is_aligned():
+    match = NgramIndex(TARGETS).best_match('Polsh language')
+    assert match[0] == 'polish language'
+    assert MIN_SIMILARITY <= match[1] < 1.0
+    assert align_entities(['Polsh language'], TARGETS) == {'Polsh language': 'polish language'}
+
+
+def test_name_below_threshold_is_not_aligned():
+    index = NgramIndex(TARGETS)
+    # 'polish lang' shares n-grams with 'polish language', but too few of them
+    assert similarity(get_ngrams('polish lang'), get_ngrams('polish language')) < MIN_SIMILARITY
+    assert index.best_match('polish lang') is None
+    assert index.best_match('french cuisine') is None
+    assert align_entities(['polish lang', 'Polsh language'], TARGETS) == {'Polsh language': 'polish language'}
+
+
+def test_exact_name_is_matched_after_normalization():
+    assert NgramIndex(TARGETS).best_match('  Polish   Language ') == ('polish language', 1.0)
+
+
+def test_blocking_finds_the_best_match_of_a_full_scan():
+    rng = random.Random(1)
+    words = ['polish', 'language', 'warsaw', 'river', 'city', 'north', 'vehicle', 'engine']
+    names = {' '.join(rng.sample(words, 2)) + f' {i}' for i in range(300)}
+    index = NgramIndex(names)
+    for name in rng.sample(sorted(names), 50):
+        query = name[:3] + name[4:]    # drop a character
+        ngrams = get_ngrams(query)
+        best = max(similarity(ngrams, get_ngrams(other)) for other in index.names)
+        match = index.best_match(query, max_candidates=None)
+        if best < MIN_SIMILARITY:
+            assert match is None
+        else:
+            assert match[1] == best
+
+
+def test_alignment_changes_the_metrics():
+    pytest.importorskip('spacy')
+    from find_common_wikipedia_wikidata import TripleMatcher, match_triples
+
+    wikipedia = [('poland', 'association', 'polsh language'), ('poland', 'association', 'europe')]
+    wikidata = [('poland', 'association', 'polish language'), ('poland', 'association', 'warsaw')]
+
+    # off by default: names must match exactly
+    common, precision, recall = match_triples(wikipedia, wikidata, TripleMatcher(lemmatize=False))
+    assert (common, precision, recall) == ([], 0.0, 0.0)
+
+    common, precision, recall = match_triples(wikipedia, wikidata, TripleMatcher(lemmatize=False, align=True))
+    assert common == [('poland', 'association', 'polsh language')]
+    assert (precision, recall) == (0.5, 0.5)
@@ -0,0 +1,97 @@
+import json
+import pytest
+
+pytest.importorskip('spacy')
+
+import triples_parse_and_verify as verifier
+
+GAZETTEER = {'warsaw': True, 'vehicle': False}
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """Set the classifier mode and gazetteer of the verifier, like a new run would."""
+    monkeypatch.setattr(verifier, 'entity_cache', {})
+    monkeypatch.setattr(verifier, 'manifest', {})
+
+    def use(cascade, gazetteer=GAZETTEER):
+        monkeypatch.setattr(verifier, 'USE_CASCADE_CLASSIFIER', cascade)
+        monkeypatch.setattr(verifier, 'load_gazetteer', lambda filenames: dict(gazetteer))
+        monkeypatch.setattr(verifier, 'entity_classifier', None)
+        verifier.entity_cache.clear()
+        verifier.manifest.clear()
+    return use
+
+
+def test_entity_cache_is_reused_with_same_settings(tmp_path, settings):
+    filename = str(tmp_path / 'entity_cache.json')
+    settings(True)
+    verifier.entity_cache.update({'warsaw': True, 'car': False})
+    verifier.save_entity_cache(filename)
+
+    settings(True)
+    verifier.load_entity_cache(filename)
+    assert verifier.entity_cache == {'warsaw': True, 'car': False}
+
+
+def test_entity_cache_is_dropped_when_classifier_mode_flips(tmp_path, settings):
+    filename = str(tmp_path / 'entity_cache.json')
+    settings(True)
+    verifier.entity_cache.update({'warsaw': True, 'car': False})
+    verifier.save_entity_cache(filename)
+
+    settings(False)
+    verifier.load_entity_cache(filename)
+    assert verifier.entity_cache == {}
+
+    verifier.entity_cache['car'] = True
+    verifier.save_entity_cache(filename)
+    settings(True)
+    verifier.load_entity_cache(filename)
+    assert verifier.entity_cache == {}
+
+
+def test_entity_cache_is_dropped_when_gazetteer_changes(tmp_path, settings):
+    filename = str(tmp_path / 'entity_cache.json')
+    settings(True)
+    verifier.entity_cache['warsaw'] = True
+    verifier.save_entity_cache(filename)
+
+    settings(True, dict(GAZETTEER, car=False))
+    verifier.load_entity_cache(filename)
+    assert verifier.entity_cache == {}
+
+
+def test_entity_cache_without_settings_is_dropped(tmp_path, settings):
+    filename = tmp_path / 'entity_cache.json'
+    # the format of earlier runs, keyed only by text
+    filename.write_text(json.dumps({'warsaw': True}), encoding='utf-8')
+    settings(True)
+    verifier.load_entity_cache(str(filename))
+    assert verifier.entity_cache == {}
+
+
+def test_manifest_is_dropped_when_classifier_mode_flips(tmp_path, settings):
+    filename = str(tmp_path / 'manifest.json')
+    settings(True)
+    verifier.save_manifest({'Car_triples_from_wikipedia.txt': {'digest': 'x', 'triples': {}}}, filename)
+
+    settings(True)
+    verifier.load_manifest(filename)
+    assert list(verifier.manifest) == ['Car_triples_from_wikipedia.txt']
+
+    settings(False)
+    verifier.load_manifest(filename)
+    assert verifier.manifest == {}
+
+
+def test_default_classifier_uses_only_the_transformer_model(monkeypatch):
+    monkeypatch.setattr(verifier, 'entity_classifier', None)
+    monkeypatch.setattr(verifier, 'load_gazetteer', lambda filenames: pytest.fail('gazetteer loaded'))
+    classifier = verifier.get_entity_classifier()
+    models = []
+    monkeypatch.setattr(classifier, 'run_ner', lambda model, texts: models.append(model) or [False] * len(texts))
+
+    assert classifier.classify(['warsaw', 'car']) == {'warsaw': False, 'car': False}
+    assert models == [classifier.accurate_model]
+    assert verifier.get_classifier_settings() == {'cascade': False}
@@ -0,0 +1,51 @@
+import entity_store
+from entity_store import EntityStore
+
+DAY = 24 * 60 * 60
+
+
+class FrozenTime:
+    """The time module of entity_store, with a clock moved by the tests."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_entries_expire_after_max_age(tmp_path, monkeypatch):
+    clock = FrozenTime(1000 * DAY)
+    monkeypatch.setattr(entity_store, 'time', clock)
+    store = EntityStore(str(tmp_path / 'entity_store.sqlite'), max_age=7 * DAY)
+    store.store_labels({'Q1': 'car', 'Q4': None})
+    store.store_claims({'Q1': {'P279': ['Q42']}})
+
+    clock.now += 7 * DAY
+    assert store.preload() == ({'Q1': 'car', 'Q4': None}, {'Q1': {'P279': ['Q42']}})
+
+    clock.now += 1
+    assert store.preload() == ({}, {})
+
+    # a refetched entry replaces the stale one and is fresh again
+    store.store_labels({'Q1': 'motor car'})
+    assert store.preload() == ({'Q1': 'motor car'}, {})
+
+
+def test_preload_skips_stale_rows(tmp_path):
+    path = str(tmp_path / 'entity_store.sqlite')
+    store = EntityStore(path, max_age=DAY)
+    store.store_labels({'Q1': 'car', 'Q2': 'wheel'})
+    store.store_claims({'Q1': {'P527': ['Q2']}, 'Q2': {}})
+    # rows fetched two days ago by an earlier run
+    with store.db:
+        store.db.execute("UPDATE labels SET fetched_at = fetched_at - ? WHERE entity_id = 'Q2'", (2 * DAY,))
+        store.db.execute("UPDATE claims SET fetched_at = fetched_at - ? WHERE entity_id = 'Q1'", (2 * DAY,))
+    store.db.close()
+
+    labels, claims = EntityStore(path, max_age=DAY).preload()
+    assert labels == {'Q1': 'car'}
+    assert claims == {'Q2': {}}
+    # with a longer maximum age the same rows are used
+    assert EntityStore(path, max_age=3 * DAY).preload() == (
+        {'Q1': 'car', 'Q2': 'wheel'}, {'Q1': {'P527': ['Q2']}, 'Q2': {}})
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip('spacy')
+
+from find_common_wikipedia_wikidata import TripleMatcher, match_triples
+
+WIKIPEDIA = [
+    ('motor car', 'composition', 'engine'),
+    ('Car', 'inheritance', ' road  vehicle'),
+    ('automobile', 'association', 'petrol'),
+    ('car', 'aggregation', 'wheel'),
+]
+WIKIDATA = [
+    ('car', 'aggregation', 'engine'),
+    ('car', 'inheritance', 'road vehicle'),
+    ('car', 'association', 'diesel'),
+]
+
+
+def test_equivalence_tables():
+    matcher = TripleMatcher(lemmatize=False, relation_equivalences={'composition': 'aggregation'},
+                            entity_equivalences={'motor car': 'car', 'automobile': 'car'})
+    common, precision, recall = match_triples(WIKIPEDIA, WIKIDATA, matcher)
+
+    # 'motor car' matches as 'car' and 'composition' as 'aggregation'
+    assert common == [('motor car', 'composition', 'engine'), ('Car', 'inheritance', ' road  vehicle')]
+    assert (precision, recall) == (2 / 4, 2 / 3)
+    # the configured tables hold the same equivalences
+    assert match_triples(WIKIPEDIA, WIKIDATA, TripleMatcher(lemmatize=False))[0] == common
+
+
+def test_without_equivalences_only_folded_strings_match():
+    matcher = TripleMatcher(lemmatize=False, relation_equivalences={}, entity_equivalences={})
+    common, precision, recall = match_triples(WIKIPEDIA, WIKIDATA, matcher)
+
+    assert common == [('Car', 'inheritance', ' road  vehicle')]
+    assert (precision, recall) == (1 / 4, 1 / 3)
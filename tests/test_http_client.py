@@ -0,0 +1,169 @@
+import gzip
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+requests = pytest.importorskip('requests')
+
+import http_client
+from http_client import HttpClient
+
+# Scripted responses of the stub server per path: (status, headers, body, seconds before answering)
+OK = (200, {}, b'ok', 0)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next scripted response of its path."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            script = server.scripts[self.path]
+            status, headers, body, delay = script.pop(0) if len(script) > 1 else script[0]
+        time.sleep(delay)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if 'Content-Length' not in headers and 'Connection' not in headers:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class RecordingTime:
+    """The time module of http_client, with the sleeps recorded instead of slept."""
+
+    def __init__(self):
+        self.sleeps = []
+        self.monotonic = time.monotonic
+        self.perf_counter = time.perf_counter
+        self.time = time.time
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+
+@pytest.fixture
+def server():
+    stub = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    stub.daemon_threads = True
+    stub.lock = threading.Lock()
+    stub.requests = []
+    stub.scripts = {}
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    stub.url = f'http://127.0.0.1:{stub.server_address[1]}'
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    recording = RecordingTime()
+    monkeypatch.setattr(http_client, 'time', recording)
+    return recording
+
+
+def make_client(**kwargs):
+    # a rate limit high enough not to wait in the retry tests
+    return HttpClient(**dict({'requests_per_second': 1000, 'burst': 100, 'max_retries': 3}, **kwargs))
+
+
+def test_retry_after_of_throttled_request(server, clock):
+    server.scripts['/throttled'] = [(429, {'Retry-After': '3'}, b'', 0),
+                                    (429, {'Retry-After': '1000'}, b'', 0), OK]
+    client = make_client()
+    response = client.get(server.url + '/throttled')
+
+    assert response.status_code == 200 and response.text == 'ok'
+    assert server.requests == ['/throttled'] * 3
+    # Retry-After is followed, up to MAX_BACKOFF
+    assert clock.sleeps == [3, http_client.MAX_BACKOFF]
+    assert [record.attempt for record in client.request_log] == [0, 1, 2]
+    stats = client.stats['127.0.0.1:' + str(server.server_address[1])]
+    assert (stats['requests'], stats['retries'], stats['errors']) == (3, 2, 2)
+
+
+def test_maxlag_is_retried(server, clock):
+    lagged = {'MediaWiki-API-Error': 'maxlag', 'Content-Type': 'application/json'}
+    server.scripts['/w/api.php?maxlag=5'] = [(200, dict(lagged, **{'Retry-After': '5'}), b'{}', 0),
+                                             (200, lagged, b'{}', 0), OK]
+    response = make_client().get(server.url + '/w/api.php', params={'maxlag': 5})
+
+    assert response.text == 'ok'
+    assert len(server.requests) == 3
+    # without Retry-After the second retry waits the exponential backoff
+    assert clock.sleeps[0] == 5
+    assert http_client.BACKOFF_FACTOR * 2 * 0.5 <= clock.sleeps[1] <= http_client.BACKOFF_FACTOR * 2
+
+
+def test_server_errors_back_off_exponentially(server, clock):
+    server.scripts['/error'] = [(503, {}, b'', 0), (502, {}, b'', 0), (500, {}, b'', 0)]
+    client = make_client()
+    response = client.get(server.url + '/error')
+
+    # the last response is returned when all retries failed
+    assert response.status_code == 500
+    assert len(server.requests) == client.max_retries + 1
+    assert len(clock.sleeps) == client.max_retries
+    for attempt, delay in enumerate(clock.sleeps):
+        full = min(http_client.MAX_BACKOFF, http_client.BACKOFF_FACTOR * 2 ** attempt)
+        assert full * 0.5 <= delay <= full
+
+
+def test_timeouts_are_retried(server, clock):
+    server.scripts['/slow'] = [(200, {}, b'late', 1), OK]
+    client = make_client(timeout=0.2)
+    response = client.get(server.url + '/slow')
+
+    assert response.text == 'ok'
+    assert [record.status_code for record in client.request_log] == [None, 200]
+    assert len(clock.sleeps) == 1
+
+    server.scripts['/slower'] = [(200, {}, b'late', 1)]
+    with pytest.raises(requests.Timeout):
+        make_client(timeout=0.2, max_retries=1).get(server.url + '/slower')
+
+
+def test_connection_errors_are_retried(clock):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    client = make_client(max_retries=2)
+    with pytest.raises(requests.ConnectionError):
+        client.get(f'http://127.0.0.1:{port}/closed')
+    assert len(client.request_log) == 3 and len(clock.sleeps) == 2
+
+
+def test_token_bucket_rate(server):
+    server.scripts['/page'] = [OK]
+    client = HttpClient(requests_per_second=20, burst=2, max_retries=0)
+    start_time = time.monotonic()
+    for _ in range(8):
+        client.get(server.url + '/page')
+    elapsed = time.monotonic() - start_time
+
+    # the burst is sent at once, the other requests at the rate limit
+    assert 6 / 20 <= elapsed < 6 / 20 + 1
+
+
+def test_size_is_the_received_body(server, clock):
+    body = gzip.compress(b'x' * 10000)
+    server.scripts['/gzip'] = [(200, {'Content-Encoding': 'gzip'}, body, 0)]
+    # without Content-Length the body ends with the connection
+    server.scripts['/chunked'] = [(200, {'Content-Encoding': 'gzip', 'Connection': 'close'}, body, 0)]
+    client = make_client()
+
+    for path in ('/gzip', '/chunked'):
+        response = client.get(server.url + path)
+        assert len(response.content) == 10000
+        assert client.request_log[-1].size == len(body)
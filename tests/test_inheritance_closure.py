@@ -0,0 +1,103 @@
+import random
+import pytest
+from convert_from_triples_to_UML import remove_implied_generalizations
+from inheritance_closure import InheritanceClosure
+
+
+def reachable(edges, start):
+    """Brute-force reachability: the names reached from start by following the edges."""
+    reached = set()
+    stack = [start]
+    while stack:
+        for parent in edges.get(stack.pop(), ()):
+            if parent not in reached:
+                reached.add(parent)
+                stack.append(parent)
+    return reached
+
+
+def random_edges(rng, count, names, acyclic=False):
+    edges = []
+    while len(edges) < count:
+        child, parent = rng.sample(range(names), 2)
+        if acyclic and child > parent:
+            child, parent = parent, child
+        edges.append((f'c{child}', f'c{parent}'))
+    return edges
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_closure_matches_brute_force_reachability(seed):
+    rng = random.Random(seed)
+    closure = InheritanceClosure()
+    edges = {}
+    for i, (child, parent) in enumerate(random_edges(rng, 120, 40)):
+        closure.add_edge(child, parent)
+        edges.setdefault(child, set()).add(parent)
+        # the closure is updated in place after every edge
+        if i % 20 == 19:
+            names = set(edges) | {parent for parents in edges.values() for parent in parents}
+            for name in names:
+                ancestors = reachable(edges, name)
+                assert closure.get_ancestors(name) == ancestors
+                assert closure.get_descendants(name) == {other for other in names
+                                                         if name in reachable(edges, other)}
+                for other in names:
+                    assert closure.is_ancestor(other, name) == (other in ancestors)
+
+    assert closure.get_ancestors_of_all(['c1', 'c2', 'unknown']) == \
+        reachable(edges, 'c1') | reachable(edges, 'c2')
+    assert closure.get_ancestors('unknown') == set() and not closure.is_ancestor('c1', 'unknown')
+
+
+def test_closure_of_triples():
+    closure = InheritanceClosure.from_triples([
+        ('car', 'subclass of', 'motor vehicle', 'inheritance', 'class', 'class'),
+        ('motor vehicle', 'is a', 'vehicle'),
+        ('vehicle', 'instance of', 'concept'),
+        ('car', 'have', 'wheel'),
+    ])
+    assert closure.get_ancestors('car') == {'motor vehicle', 'vehicle', 'concept'}
+    assert closure.get_descendants('vehicle') == {'car', 'motor vehicle'}
+    assert not closure.is_ancestor('wheel', 'car')
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_implied_generalizations_match_brute_force(seed):
+    rng = random.Random(seed)
+    edges = list(dict.fromkeys(random_edges(rng, 60, 25, acyclic=True)))
+    relations = [(child, 'is a', 'inheritance', parent) for child, parent in edges]
+    relations.append(('c0', 'have', 'aggregation', 'c1'))
+
+    kept = remove_implied_generalizations(relations)
+
+    # an edge is implied when its parent is reached from the child without it
+    expected = []
+    for child, parent in edges:
+        others = {}
+        for other_child, other_parent in edges:
+            if (other_child, other_parent) != (child, parent):
+                others.setdefault(other_child, set()).add(other_parent)
+        if parent not in reachable(others, child):
+            expected.append((child, 'is a', 'inheritance', parent))
+    assert kept == expected + [('c0', 'have', 'aggregation', 'c1')]
+
+
+def test_generalizations_in_cycle_are_kept():
+    relations = [('a', 'is a', 'inheritance', 'b'), ('b', 'is a', 'inheritance', 'a'),
+                 ('a', 'is a', 'inheritance', 'c'), ('a', 'subclass of', 'inheritance', 'a')]
+    assert remove_implied_generalizations(relations) == relations
+
+
+def test_identified_classes_get_their_ancestors():
+    pytest.importorskip('spacy')
+    import triples_parse_and_verify as verifier
+
+    verifier.identified_classes.clear()
+    verifier.identified_classes.update({'car'})
+    verifier.add_inherited_classes(InheritanceClosure.from_triples([
+        ('car', 'subclass of', 'motor vehicle'), ('motor vehicle', 'is a', 'vehicle'),
+        ('warsaw', 'instance of', 'city'),
+    ]))
+    assert verifier.identified_classes == {'car', 'motor vehicle', 'vehicle'}
+    verifier.identified_classes.clear()
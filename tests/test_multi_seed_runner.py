@@ -0,0 +1,88 @@
+from collections import Counter
+from multiprocessing.pool import ThreadPool
+import pytest
+
+spacy = pytest.importorskip('spacy')
+pytest.importorskip('requests')
+
+import spacy_models
+import multi_seed_runner
+from multi_seed_runner import run_seeds
+from wikipedia_triples_extract import WikipediaExtractor
+
+# Links of the lead section and infobox labels of each stub article;
+# both seeds reach Bus and Truck
+ARTICLES = {
+    'Car': (['Bus', 'Truck'], ['Classification', 'Powered']),
+    'Tram': (['Bus', 'Truck', 'Rail'], ['Track gauge']),
+    'Bus': (['Car', 'Coach'], ['Capacity']),
+    'Truck': (['Trailer'], ['Payload']),
+    'Rail': ([], ['Gauge']),
+    'Coach': ([], ['Seats']),
+    'Trailer': ([], ['Axles']),
+}
+SEEDS = ['/wiki/Car', '/wiki/Tram']
+
+
+class StubFetcher:
+    """Serves the stub articles and counts the fetches of each link."""
+
+    def __init__(self):
+        self.fetches = Counter()
+
+    def fetch(self, url, cache=None):
+        self.fetches[url] += 1
+        title = url.split('/')[2]
+        links, labels = ARTICLES[title]
+        rows = ''.join(f'<tr><th scope="row" class="infobox-label">{label}</th><td>x</td></tr>'
+                       for label in labels)
+        paragraph = ' '.join(f'<a href="/wiki/{link}" title="{link}">{link}</a>' for link in links)
+        return (f'<span class="mw-page-title-main">{title}</span>'
+                f'<div id="mw-content-text"><table class="infobox">{rows}</table>'
+                f'<p>{title} links to {paragraph}. \n</p></div>')
+
+
+@pytest.fixture(autouse=True)
+def blank_model(monkeypatch):
+    # worker processes are forked with the blank model already loaded
+    monkeypatch.setitem(spacy_models.loaded_models, spacy_models.DEFAULT_MODEL, spacy.blank('en'))
+
+
+def separate_runs(fetcher):
+    triples = {}
+    for seed in SEEDS:
+        we = WikipediaExtractor(max_depth_level=2, fetcher=fetcher)
+        we.extract(seed)
+        triples[seed] = we.triples
+    return triples
+
+
+def test_overlapping_seeds_are_processed_once(monkeypatch):
+    processed = Counter()
+    extract_articles = multi_seed_runner.extract_articles
+
+    def count_articles(articles):
+        processed.update(url for url, _ in articles)
+        return extract_articles(articles)
+
+    monkeypatch.setattr(multi_seed_runner, 'Pool', ThreadPool)
+    monkeypatch.setattr(multi_seed_runner, 'extract_articles', count_articles)
+    fetcher = StubFetcher()
+    seed_triples = run_seeds(SEEDS, processes=1, fetcher=fetcher)
+
+    urls = {'/wiki/' + title for title in ARTICLES}
+    assert set(fetcher.fetches) == urls and set(fetcher.fetches.values()) == {1}
+    assert set(processed) == urls and set(processed.values()) == {1}
+    assert seed_triples == separate_runs(StubFetcher())
+    # the shared articles are attributed to both seeds
+    assert ('bus', 'has properties', 'Capacity') in seed_triples['/wiki/Car']
+    assert ('bus', 'has properties', 'Capacity') in seed_triples['/wiki/Tram']
+    assert ('rail', 'has properties', 'Gauge') not in seed_triples['/wiki/Car']
+
+
+def test_run_seeds_is_deterministic(monkeypatch):
+    # one article per task, so that the workers finish the tasks in any order
+    monkeypatch.setattr(multi_seed_runner, 'ARTICLES_PER_TASK', 1)
+    first = run_seeds(SEEDS, processes=2, fetcher=StubFetcher())
+    second = run_seeds(SEEDS, processes=2, fetcher=StubFetcher())
+    assert first == second == separate_runs(StubFetcher())
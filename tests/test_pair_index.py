@@ -0,0 +1,27 @@
+import random
+from pair_index import PairIndex
+
+
+def test_has_reverse_matches_scan():
+    rng = random.Random(1)
+    names = [f'c{i}' for i in range(15)]
+    triples = [(rng.choice(names), 'have', rng.choice(names), rng.choice(['aggregation', 'association']),
+                'class', 'class') for _ in range(60)]
+    index = PairIndex(triples)
+    for sub in names:
+        for obj in names:
+            assert index.has_reverse(sub, obj) == \
+                any(triple[0] == obj and triple[2] == sub for triple in triples)
+
+
+def test_has_reverse():
+    index = PairIndex([('car', 'have', 'wheel', 'aggregation', 'class', 'class'),
+                       ('wheel', 'part of', 'car', 'aggregation', 'class', 'class'),
+                       ('car', 'use', 'petrol', 'association', 'class', 'class'),
+                       ('engine', 'is a', 'engine', 'inheritance', 'class', 'class')])
+    assert index.has_reverse('car', 'wheel') and index.has_reverse('wheel', 'car')
+    assert not index.has_reverse('car', 'petrol')
+    assert index.has_reverse('petrol', 'car')
+    # a triple from a name to itself is its own reverse
+    assert index.has_reverse('engine', 'engine')
+    assert not index.has_reverse('car', 'bus')
@@ -0,0 +1,231 @@
+import random
+import pytest
+
+spacy = pytest.importorskip('spacy')
+pytest.importorskip('requests')
+
+from spacy.language import Language
+import convert_from_triples_to_UML
+import spacy_models
+import pipeline
+import triple_store
+from convert_from_triples_to_UML import read_file, remove_implied_generalizations, write_file
+from find_common_wikipedia_wikidata import LEMMA_MODEL, TripleMatcher, match_triples
+from triple_store import load_triples
+import triples_parse_and_verify as verifier
+from triples_parse_and_verify import reprocess_aggregation_relations
+
+# Verified triples (sub, rel, obj, rel_t, sub_t, obj_t)
+VERIFIED = [
+    ('car', 'is a', 'vehicle', 'inheritance', 'class', 'class'),
+    ('car', 'have', 'wheel', 'aggregation', 'class', 'class'),
+    ('car', 'have', 'engine', 'aggregation', 'class', 'class'),
+    ('engine', 'part of', 'car', 'aggregation', 'class', 'class'),
+    ('car', 'use', 'petrol', 'association', 'class', 'class'),
+    ('warsaw', 'part of', 'poland', 'aggregation', 'object', 'object'),
+]
+REFERENCE = [('car', 'inheritance', 'vehicle'), ('car', 'aggregation', 'engine'),
+             ('poland', 'association', 'europe')]
+
+
+@Language.component('text_as_lemma')
+def text_as_lemma(doc):
+    for token in doc:
+        token.lemma_ = token.text
+    return doc
+
+
+@pytest.fixture
+def lemma_model(monkeypatch):
+    """A blank model as the lemmatizer of the comparison, counting its nlp.pipe calls."""
+    nlp = spacy.blank('en')
+    nlp.add_pipe('text_as_lemma', name='lemmatizer')
+    calls = []
+    pipe = nlp.pipe
+
+    def counting_pipe(texts, **kwargs):
+        texts = list(texts)
+        calls.append(texts)
+        return pipe(texts, **kwargs)
+
+    monkeypatch.setattr(nlp, 'pipe', counting_pipe)
+    monkeypatch.setitem(spacy_models.loaded_models, LEMMA_MODEL, nlp)
+    return calls
+
+
+def test_compare_lemmatizes_once_per_batch(lemma_model):
+    matcher = TripleMatcher(align=False)
+    reference = matcher.reference_keys(REFERENCE)
+    lemma_model.clear()
+
+    common = []
+    assert list(pipeline.compare(iter(VERIFIED), reference, common, matcher, batch_size=4)) == VERIFIED
+    # one call per batch of triples, for the strings not lemmatized with the reference
+    assert len(lemma_model) == 2
+    assert sorted(lemma_model[0]) == ['wheel']
+    assert sorted(lemma_model[1]) == ['petrol', 'warsaw']
+
+    compared = [(sub, rel_t, obj) for sub, _, obj, rel_t, _, _ in VERIFIED]
+    assert common == match_triples(compared, REFERENCE, TripleMatcher(lemmatize=False, align=False))[0]
+    assert common == [('car', 'inheritance', 'vehicle'), ('car', 'aggregation', 'engine')]
+
+
+def random_processed_triples(count, seed=1):
+    rng = random.Random(seed)
+    names = [f'part {i}' for i in range(count // 4)]
+    relations = [('have', 'aggregation'), ('part of', 'aggregation'), ('is a', 'inheritance'),
+                 ('use', 'association')]
+    triples = []
+    for _ in range(count):
+        rel, rel_t = rng.choice(relations)
+        triples.append((rng.choice(names), rel, rng.choice(names), rel_t,
+                        rng.choice(['class', 'object']), rng.choice(['class', 'object'])))
+    return triples
+
+
+def test_reprocess_matches_verifier_with_spilled_state(monkeypatch):
+    # a state cache far smaller than the state, so that SQLite writes it to disk
+    monkeypatch.setattr(pipeline, 'STATE_CACHE_KIB', 64)
+    triples = random_processed_triples(20000)
+    streamed = list(pipeline.reprocess(iter(triples)))
+    assert sorted(streamed) == sorted(reprocess_aggregation_relations(triples))
+    # triples which do not wait keep their order
+    passing = ('inheritance', 'association')
+    assert [triple for triple in streamed if triple[3] in passing] == \
+        [triple for triple in triples if triple[3] in passing]
+
+
+def test_extract_yields_each_triple_once(monkeypatch):
+    monkeypatch.setattr(pipeline, 'STATE_CACHE_KIB', 64)
+
+    class StubExtractor:
+        batch_size = 2
+
+        def __init__(self):
+            self.sentence_queue = []
+            self.triples = set()
+
+        def get_triples_from_infobox(self, article):
+            return {(article, 'has properties', f'label {i}') for i in range(500)}
+
+        def queue_sentences(self, article):
+            self.sentence_queue.append(article)
+
+        def process_sentence_queue(self):
+            triples = {article: {('car', 'have', 'wheel'), (article, 'is a', 'vehicle')}
+                       for article in self.sentence_queue}
+            self.sentence_queue.clear()
+            return triples
+
+    articles = [(None, name) for name in ['car', 'bus', 'car', 'truck', 'bus']]
+    triples = list(pipeline.extract(StubExtractor(), iter(articles)))
+    assert len(triples) == len(set(triples)) == 3 * 501 + 1
+
+
+# Extracted triples of one article with the NER results of their subjects and objects
+EXTRACTED = [
+    ('Car', 'has properties', 'Classification'),
+    ('car', 'is a', 'vehicle'),
+    ('car', 'is a', 'motor vehicle'),
+    ('motor vehicle', 'is a', 'vehicle'),
+    ('car', 'have', 'wheel'),
+    ('wheel', 'part of', 'car'),
+    ('car', 'consist of', 'engine'),
+    ('car', 'made up of', 'steel'),
+    ('warsaw', 'part of', 'poland'),
+    ('warsaw', 'is a', 'city'),
+    ('poland', 'use', 'polish language'),
+    ('vehicle', 'instance of', 'tesla'),
+    ('list of cars', 'include', 'car'),
+    ('car', 'have', '4 wheels'),
+    ('engine', 'use', 'petrol'),
+]
+ENTITIES = {
+    'car': False, 'classification': False, 'vehicle': False, 'motor vehicle': False, 'wheel': False,
+    'engine': False, 'steel': False, 'warsaw': True, 'poland': True, 'city': False,
+    'polish language': False, 'tesla': True, 'petrol': False,
+}
+DATASET = 'Fixture_triples_from_wikipedia.txt'
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """A triple store and the verifier's files in a temporary directory."""
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'verified_files').mkdir()
+    monkeypatch.setattr(triple_store, 'shared_store', triple_store.TripleStore(str(tmp_path / 'triples.sqlite')))
+    monkeypatch.setattr(verifier, 'PROCESSES', 1)
+    monkeypatch.setattr(verifier, 'entity_classifier', None)
+    monkeypatch.setattr(verifier, 'load_gazetteer', lambda filenames: {})
+    monkeypatch.setattr(verifier, 'entity_cache', dict(ENTITIES))
+    triple_store.save_triples(DATASET, EXTRACTED)
+
+
+def run_script_chain(monkeypatch, files):
+    monkeypatch.setattr(verifier, 'FILES', files)
+    verifier.main()
+    return list(load_triples(verifier.OUTPUT_FORMAT + DATASET))
+
+
+def run_stages():
+    pipeline.identified_classes.clear()
+    triples = pipeline.classify(iter(EXTRACTED))
+    triples = pipeline.reprocess(triples)
+    return list(pipeline.apply_identified_classes(triples))
+
+
+def uml_lines(filename):
+    with open(filename, encoding='utf-8') as f:
+        # the first line names the file
+        return sorted(f.read().splitlines()[1:])
+
+
+def write_uml(verified_filename, uml_filename, streamed):
+    relations, attributes = read_file(verified_filename)
+    if convert_from_triples_to_UML.DIRECT_GENERALIZATIONS_ONLY:
+        relations = remove_implied_generalizations(relations)
+    write_file(attributes, relations, uml_filename)
+    pipeline.emit_uml(iter(streamed), 'pipeline.iuml')
+    return uml_lines(uml_filename), uml_lines('pipeline.iuml')
+
+
+@pytest.mark.usefixtures('workspace')
+def test_pipeline_matches_script_chain_for_one_file(monkeypatch):
+    verified = run_script_chain(monkeypatch, [DATASET])
+    streamed = run_stages()
+    assert sorted(streamed) == sorted(verified)
+    # without INHERIT_CLASSES, a named entity which is the object of 'instance of' stays an object
+    assert ('vehicle', 'instance of', 'tesla', 'inheritance', 'class', 'object') in streamed
+    assert ('car', 'have', 'wheel', 'composition', 'class', 'class') in streamed
+
+    chain, streamed_uml = write_uml(verifier.OUTPUT_FORMAT + DATASET, 'chain.iuml', streamed)
+    assert streamed_uml == chain
+    # without DIRECT_GENERALIZATIONS_ONLY, the generalization implied through motor vehicle is kept
+    assert '"car" <|-- "vehicle" : is a' in streamed_uml
+
+
+@pytest.mark.usefixtures('workspace')
+def test_pipeline_matches_script_chain_with_inheritance_closure(monkeypatch):
+    monkeypatch.setattr(verifier, 'INHERIT_CLASSES', True)
+    monkeypatch.setattr(convert_from_triples_to_UML, 'DIRECT_GENERALIZATIONS_ONLY', True)
+    verified = run_script_chain(monkeypatch, [DATASET])
+    streamed = run_stages()
+    assert sorted(streamed) == sorted(verified)
+    # classes identified by later triples and inherited from are applied
+    assert ('vehicle', 'instance of', 'tesla', 'inheritance', 'class', 'class') in streamed
+
+    chain, streamed_uml = write_uml(verifier.OUTPUT_FORMAT + DATASET, 'chain.iuml', streamed)
+    assert streamed_uml == chain
+    # the generalization implied through motor vehicle is left out
+    assert '"car" <|-- "vehicle" : is a' not in streamed_uml
+
+
+@pytest.mark.usefixtures('workspace')
+def test_script_chain_merges_classes_of_other_files(monkeypatch):
+    # another file identifies 'poland' as a class, which the pipeline does not see
+    triple_store.save_triples('Other_triples_from_wikipedia.txt', [('poland', 'subclass of', 'city')])
+    verified = run_script_chain(monkeypatch, [DATASET, 'Other_triples_from_wikipedia.txt'])
+    streamed = run_stages()
+    assert ('warsaw', 'part of', 'poland', 'aggregation', 'object', 'class') in verified
+    assert ('warsaw', 'part of', 'poland', 'aggregation', 'object', 'object') in streamed
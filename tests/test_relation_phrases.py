@@ -0,0 +1,167 @@
+import pytest
+
+spacy = pytest.importorskip('spacy')
+pytest.importorskip('requests')
+
+from spacy.tokens import Doc
+import spacy_models
+from wikipedia_triples_extract import SentenceContext, WikipediaExtractor
+
+MODEL_NAME = 'blank_en'
+
+# Parsed sentences: (word, head index, dependency label, part of speech) per
+# token, with the links of the sentence as (text, title) pairs
+SENTENCES = [
+    ([('A', 1, 'det', 'DET'), ('car', 2, 'nsubj', 'NOUN'), ('is', 2, 'ROOT', 'AUX'),
+      ('a', 4, 'det', 'DET'), ('vehicle', 2, 'attr', 'NOUN'), ('.', 2, 'punct', 'PUNCT')], []),
+    ([('It', 1, 'nsubj', 'PRON'), ('refers', 1, 'ROOT', 'VERB'), ('to', 1, 'prep', 'ADP'),
+      ('a', 4, 'det', 'DET'), ('language', 2, 'pobj', 'NOUN'), ('.', 1, 'punct', 'PUNCT')], []),
+    ([('The', 1, 'det', 'DET'), ('brain', 2, 'nsubj', 'NOUN'), ('consists', 2, 'ROOT', 'VERB'),
+      ('of', 2, 'prep', 'ADP'), ('neurons', 3, 'pobj', 'NOUN'), ('.', 2, 'punct', 'PUNCT')], []),
+    ([('Computers', 1, 'nsubj', 'NOUN'), ('include', 1, 'ROOT', 'VERB'),
+      ('processors', 1, 'dobj', 'NOUN'), ('and', 2, 'cc', 'CCONJ'), ('memory', 2, 'conj', 'NOUN'),
+      ('.', 1, 'punct', 'PUNCT')], []),
+    ([('The', 1, 'det', 'DET'), ('planet', 2, 'nsubj', 'NOUN'), ('has', 2, 'ROOT', 'VERB'),
+      ('a', 4, 'det', 'DET'), ('moon', 2, 'dobj', 'NOUN'), ('.', 2, 'punct', 'PUNCT')], []),
+    ([('The', 1, 'det', 'DET'), ('engine', 3, 'nsubjpass', 'NOUN'), ('is', 3, 'auxpass', 'AUX'),
+      ('composed', 3, 'ROOT', 'VERB'), ('of', 3, 'prep', 'ADP'), ('parts', 4, 'pobj', 'NOUN'),
+      ('.', 3, 'punct', 'PUNCT')], []),
+    ([('The', 1, 'det', 'DET'), ('wheel', 3, 'nsubjpass', 'NOUN'), ('is', 3, 'auxpass', 'AUX'),
+      ('made', 3, 'ROOT', 'VERB'), ('up', 3, 'prt', 'ADP'), ('of', 3, 'prep', 'ADP'),
+      ('rubber', 5, 'pobj', 'NOUN'), ('.', 3, 'punct', 'PUNCT')], []),
+    ([('Airports', 2, 'nsubjpass', 'NOUN'), ('are', 2, 'auxpass', 'AUX'), ('made', 2, 'ROOT', 'VERB'),
+      ('of', 2, 'prep', 'ADP'), ('concrete', 3, 'pobj', 'NOUN'), ('.', 2, 'punct', 'PUNCT')], []),
+    ([('Warsaw', 1, 'nsubj', 'PROPN'), ('is', 1, 'ROOT', 'AUX'), ('part', 1, 'attr', 'NOUN'),
+      ('of', 2, 'prep', 'ADP'), ('Poland', 3, 'pobj', 'PROPN'), ('.', 1, 'punct', 'PUNCT')],
+     [('Warsaw', 'Warsaw'), ('Poland', 'Poland')]),
+    ([('Islam', 1, 'nsubj', 'PROPN'), ('uses', 1, 'ROOT', 'VERB'), ('Arabic', 1, 'dobj', 'PROPN'),
+      ('.', 1, 'punct', 'PUNCT')], [('Islam', 'Islam'), ('Arabic', 'Arabic language')]),
+    ([('The', 1, 'det', 'DET'), ('car', 2, 'nsubj', 'NOUN'), ('is', 2, 'ROOT', 'AUX'),
+      ('an', 4, 'det', 'DET'), ('automobile', 2, 'attr', 'NOUN'), ('and', 2, 'cc', 'CCONJ'),
+      ('uses', 2, 'conj', 'VERB'), ('fuel', 6, 'dobj', 'NOUN'), ('.', 2, 'punct', 'PUNCT')], []),
+    ([('She', 1, 'nsubj', 'PRON'), ('is', 1, 'ROOT', 'AUX'), ('a', 3, 'det', 'DET'),
+      ('doctor', 1, 'attr', 'NOUN'), ('.', 1, 'punct', 'PUNCT')], []),
+    ([('The', 1, 'det', 'DET'), ('giraffe', 2, 'nsubj', 'NOUN'), ('is', 2, 'ROOT', 'AUX'),
+      ('tall', 2, 'acomp', 'ADJ'), ('.', 2, 'punct', 'PUNCT')], []),
+]
+
+
+def legacy_get_triples_from_doc(extractor, doc, article_name, links_texts, links_titles):
+    """
+    The string scan over PHRASES_TO_MATCH before the PhraseMatcher: every
+    phrase is searched in the sentence text and its handler starts from the
+    first token equal to the base word of the phrase.
+    """
+    sentence_context = SentenceContext(doc, links_texts, links_titles)
+    tokens = [token.text for token in doc]
+    triples = set()
+
+    def class_name(token):
+        return extractor.get_full_class_name(token, sentence_context)
+
+    def find(subject_head, subject_dep, object_head, object_dep, pronoun):
+        first_noun = ''
+        second_noun = []
+        for child in doc[subject_head].children:
+            if child.dep_ == subject_dep:
+                if child.pos_ in ('NOUN', 'PROPN'):
+                    first_noun = class_name(child)[0]
+                if pronoun and child.pos_ in 'PRON':
+                    first_noun = article_name
+        for child in doc[object_head].children:
+            if child.dep_ == object_dep and child.pos_ in ('NOUN', 'PROPN'):
+                second_noun = class_name(child)
+        return first_noun, second_noun
+
+    phrases = [" is a ", " is an ", " is the ", " refer to ", " refers to ", " consists of ",
+               " include ", " includes ", " has a ", " have a ", " is composed of ",
+               " made up of ", " made of ", " is part of ", " uses "]
+    for phrase in phrases:
+        if phrase not in ' ' + doc.text + ' ':
+            continue
+        words = phrase.split(" ")
+        if words[1] not in tokens:
+            continue
+        index = tokens.index(words[1])
+        first_noun, second_noun = '', []
+        if phrase in (" is a ", " is an ", " is the "):
+            relation = 'is a'
+            if doc[index].pos_ == 'AUX':
+                first_noun, second_noun = find(index, 'nsubj', index, 'attr', False)
+        elif phrase in (" refer to ", " refers to "):
+            relation = 'is a'
+            first_noun, second_noun = find(index, 'nsubj', index + 1, 'pobj', True)
+        elif phrase == " consists of ":
+            relation = 'consist of'
+            first_noun, second_noun = find(index, 'nsubj', index + 1, 'pobj', True)
+        elif phrase in (" include ", " includes "):
+            relation = 'include'
+            first_noun, second_noun = find(index, 'nsubj', index, 'dobj', True)
+        elif phrase in (" has a ", " have a "):
+            relation = 'have'
+            first_noun, second_noun = find(index, 'nsubj', index, 'dobj', True)
+        elif phrase == " is composed of ":
+            relation = 'is composed of'
+            index = tokens.index('composed')
+            first_noun, second_noun = find(index, 'nsubjpass', index + 1, 'pobj', True)
+        elif phrase == " made up of ":
+            relation = 'made up of'
+            first_noun, second_noun = find(index, 'nsubjpass', index + 2, 'pobj', True)
+        elif phrase == " made of ":
+            relation = 'made of'
+            first_noun, second_noun = find(index, 'nsubjpass', index + 1, 'pobj', True)
+        elif phrase == " is part of ":
+            relation = 'part of'
+            index = tokens.index('part')
+            first_noun, second_noun = find(index - 1, 'nsubj', index + 1, 'pobj', True)
+        else:
+            relation = 'use'
+            first_noun, second_noun = find(index, 'nsubj', index, 'dobj', True)
+
+        if first_noun != '' and len(second_noun) > 0:
+            for noun in second_noun:
+                if noun != '':
+                    triples.add((first_noun.lower(), relation, noun.lower()))
+    return triples
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    monkeypatch.setitem(spacy_models.loaded_models, MODEL_NAME, spacy.blank('en'))
+    return WikipediaExtractor(model_name=MODEL_NAME)
+
+
+def make_doc(vocab, tokens):
+    words, heads, deps, pos = zip(*tokens)
+    return Doc(vocab, words=list(words), heads=list(heads), deps=list(deps), pos=list(pos))
+
+
+def test_phrase_matcher_gives_same_triples_as_string_scan(extractor):
+    found = set()
+    for tokens, links in SENTENCES:
+        doc = make_doc(extractor.nlp.vocab, tokens)
+        links_texts = [text for text, _ in links]
+        links_titles = [title for _, title in links]
+        triples = extractor.get_triples_from_doc(doc, 'Article', links_texts, links_titles)
+        assert triples == legacy_get_triples_from_doc(extractor, doc, 'Article', links_texts, links_titles)
+        found |= triples
+
+    assert found == {
+        ('car', 'is a', 'vehicle'), ('article', 'is a', 'language'),
+        ('brain', 'consist of', 'neurons'), ('computers', 'include', 'processors'),
+        ('computers', 'include', 'memory'),
+        ('planet', 'have', 'moon'), ('engine', 'is composed of', 'parts'),
+        ('wheel', 'made up of', 'rubber'), ('airports', 'made of', 'concrete'),
+        ('warsaw', 'part of', 'poland'), ('islam', 'use', 'arabic language'),
+        ('car', 'is a', 'automobile'),
+    }
+
+
+def test_phrase_matcher_finds_every_occurrence(extractor):
+    # the string scan only looked at the first 'uses' of the sentence
+    doc = make_doc(extractor.nlp.vocab, [
+        ('Cars', 1, 'nsubj', 'NOUN'), ('uses', 1, 'ROOT', 'VERB'), ('fuel', 1, 'dobj', 'NOUN'),
+        ('and', 1, 'cc', 'CCONJ'), ('bikes', 5, 'nsubj', 'NOUN'), ('uses', 1, 'conj', 'VERB'),
+        ('pedals', 5, 'dobj', 'NOUN'), ('.', 1, 'punct', 'PUNCT')])
+    assert extractor.get_triples_from_doc(doc, 'Article', [], []) == {
+        ('cars', 'use', 'fuel'), ('bikes', 'use', 'pedals')}
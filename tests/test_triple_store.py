@@ -0,0 +1,50 @@
+import pytest
+import triple_store
+from triple_store import TripleStore, load_triples, save_triples
+
+TRIPLES = [('car', 'is a', 'vehicle'), ('car', 'have', 'wheel')]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # text files are read and written next to the store
+    monkeypatch.chdir(tmp_path)
+    store = TripleStore(str(tmp_path / 'triples.sqlite'))
+    monkeypatch.setattr(triple_store, 'shared_store', store)
+    return store
+
+
+def write_legacy_file(name, triples):
+    with open(name, 'w', encoding='utf-8') as f:
+        f.writelines(str(triple) + '\n' for triple in triples)
+
+
+def test_empty_dataset_is_not_absent(store):
+    write_legacy_file('Car_triples_from_wikipedia.txt', TRIPLES)
+    store.write('Car_triples_from_wikipedia.txt', [])
+
+    assert store.has_dataset('Car_triples_from_wikipedia.txt')
+    assert store.datasets() == ['Car_triples_from_wikipedia.txt']
+    # the stale text file is not imported over the empty dataset
+    assert list(load_triples('Car_triples_from_wikipedia.txt')) == []
+
+
+def test_absent_dataset_is_imported_from_text_file(store):
+    write_legacy_file('Car_triples_from_wikipedia.txt', TRIPLES)
+    assert not store.has_dataset('Car_triples_from_wikipedia.txt')
+    assert list(load_triples('Car_triples_from_wikipedia.txt')) == TRIPLES
+    assert store.has_dataset('Car_triples_from_wikipedia.txt')
+
+    assert not store.has_dataset('Bus_triples_from_wikipedia.txt')
+    assert list(load_triples('Bus_triples_from_wikipedia.txt')) == []
+    assert not store.has_dataset('Bus_triples_from_wikipedia.txt')
+
+
+def test_dataset_emptied_by_a_later_run(store, monkeypatch):
+    save_triples('Car_triples_from_wikipedia.txt', TRIPLES)
+    monkeypatch.setattr(triple_store, 'EXPORT_TEXT_FILES', False)
+    save_triples('Car_triples_from_wikipedia.txt', [])
+    assert list(load_triples('Car_triples_from_wikipedia.txt')) == []
+    # strings of other datasets are not datasets
+    assert store.datasets() == ['Car_triples_from_wikipedia.txt']
+
@@ -0,0 +1,106 @@
+import pytest
+
+pytest.importorskip('spacy')
+
+import triple_store
+import triples_parse_and_verify as verifier
+from entity_classifier import EntityClassifier
+from triple_store import load_triples
+
+# Subjects and objects the stub NER finds as named entities
+NAMED_ENTITIES = {'warsaw', 'poland', 'tesla'}
+
+
+@pytest.fixture
+def ner_calls(monkeypatch):
+    """A classifier running a stub NER, which records the texts of each of its batches."""
+    calls = []
+    classifier = EntityClassifier(cascade=False)
+
+    def run_ner(model_name, texts):
+        calls.append(list(texts))
+        return [text in NAMED_ENTITIES for text in texts]
+
+    monkeypatch.setattr(classifier, 'run_ner', run_ner)
+    monkeypatch.setattr(verifier, 'entity_classifier', classifier)
+    monkeypatch.setattr(verifier, 'entity_cache', {})
+    monkeypatch.setattr(verifier, 'manifest', {})
+    return calls
+
+
+def test_subjects_and_objects_are_classified_once(ner_calls):
+    verifier.identify_entities(['car', 'warsaw', 'car', 'vehicle', 'warsaw'])
+    verifier.identify_entities(['vehicle', 'poland', 'car', 'poland'])
+
+    # one batch of distinct strings per call, without the strings classified before
+    assert ner_calls == [['car', 'warsaw', 'vehicle'], ['poland']]
+    assert verifier.entity_cache == {'car': False, 'warsaw': True, 'vehicle': False, 'poland': True}
+    verifier.identify_entities(['car', 'poland'])
+    assert len(ner_calls) == 2
+
+
+# Extracted triples of two files; only the second one identifies 'poland' as a class
+DATASETS = {
+    'Warsaw_triples_from_wikipedia.txt': [
+        ('warsaw', 'part of', 'poland'), ('warsaw', 'is a', 'city'), ('car', 'use', 'petrol')],
+    'Q36_triples.txt': [('poland', 'subclass of', 'country'), ('country', 'have', 'border')],
+}
+
+
+def run_verifier(directory, monkeypatch, files, processes):
+    """Run the verifier on the files in a new directory and return its outputs."""
+    directory.mkdir()
+    monkeypatch.chdir(directory)
+    (directory / 'verified_files').mkdir()
+    monkeypatch.setattr(triple_store, 'shared_store', triple_store.TripleStore(str(directory / 'triples.sqlite')))
+    for name, triples in DATASETS.items():
+        triple_store.save_triples(name, triples)
+    monkeypatch.setattr(verifier, 'FILES', files)
+    monkeypatch.setattr(verifier, 'PROCESSES', processes)
+    verifier.entity_cache.clear()
+    verifier.main()
+    return {name: list(load_triples(verifier.OUTPUT_FORMAT + name)) for name in files}
+
+
+def test_parallel_output_does_not_depend_on_file_order(tmp_path, monkeypatch, ner_calls):
+    files = list(DATASETS)
+    forward = run_verifier(tmp_path / 'forward', monkeypatch, files, 2)
+    backward = run_verifier(tmp_path / 'backward', monkeypatch, files[::-1], 2)
+    sequential = run_verifier(tmp_path / 'sequential', monkeypatch, files, 1)
+
+    assert forward == backward == sequential
+    # the class identified by the second file is applied to the first one
+    assert ('warsaw', 'part of', 'poland', 'aggregation', 'object', 'class') in \
+        forward['Warsaw_triples_from_wikipedia.txt']
+
+
+def test_manifest_reverifies_only_changed_triples(tmp_path, monkeypatch, ner_calls):
+    outputs = run_verifier(tmp_path / 'run', monkeypatch, list(DATASETS), 1)
+    written = []
+    write_processed_triples = verifier.write_processed_triples
+
+    def recording_write(triples, output_filename):
+        written.append(output_filename)
+        write_processed_triples(triples, output_filename)
+
+    monkeypatch.setattr(verifier, 'write_processed_triples', recording_write)
+    ner_calls.clear()
+
+    # nothing changed: nothing is classified or written
+    verifier.main()
+    assert (ner_calls, written) == ([], [])
+    assert {name: list(load_triples(verifier.OUTPUT_FORMAT + name)) for name in DATASETS} == outputs
+
+    # a new triple: only its new string is classified and only its file is written
+    warsaw, country = DATASETS
+    triple_store.save_triples(warsaw, DATASETS[warsaw] + [('car', 'have', 'engine')])
+    verifier.main()
+    assert ner_calls == [['engine']]
+    assert written == [verifier.OUTPUT_FORMAT + warsaw]
+
+    # a new class changes the classes digest, so every output is written again
+    triple_store.save_triples(country, DATASETS[country] + [('engine', 'subclass of', 'machine')])
+    written.clear()
+    verifier.main()
+    assert ner_calls[1:] == [['machine']]
+    assert sorted(written) == sorted(verifier.OUTPUT_FORMAT + name for name in DATASETS)
@@ -0,0 +1,92 @@
+import gzip
+import json
+import random
+import pytest
+
+pytest.importorskip('numpy')
+
+from wikidata_dump_index import WikidataIndex, import_dump
+
+PROPERTY_IDS = ['P279', 'P31']
+
+
+def item_claim(number, with_numeric_id=True):
+    value = {'entity-type': 'item', 'id': f'Q{number}'}
+    if with_numeric_id:
+        value['numeric-id'] = number
+    return {'mainsnak': {'datavalue': {'value': value}}}
+
+
+def make_entities(count, seed=1):
+    """
+    Items in a shuffled order with random English labels and claims, mixed
+    with entities and claims the index leaves out.
+    """
+    rng = random.Random(seed)
+    numbers = rng.sample(range(1, count * 10), count)
+    entities = []
+    for number in numbers:
+        entity = {'type': 'item', 'id': f'Q{number}', 'claims': {}}
+        if rng.random() < 0.8:
+            entity['labels'] = {'en': {'value': f'item {number} ż'}, 'de': {'value': 'x'}}
+        for property_id in PROPERTY_IDS + ['P17']:
+            if rng.random() < 0.6:
+                entity['claims'][property_id] = [item_claim(rng.choice(numbers), rng.random() < 0.5)
+                                                 for _ in range(rng.randint(1, 4))]
+        if rng.random() < 0.2:
+            entity['claims'].setdefault('P31', []).append(
+                {'mainsnak': {'datavalue': {'value': {'amount': '+1'}}}})
+            entity['claims']['P31'].append({'mainsnak': {'snaktype': 'novalue'}})
+        entities.append(entity)
+    entities.insert(count // 2, {'type': 'property', 'id': 'P31', 'labels': {'en': {'value': 'instance of'}}})
+    return entities
+
+
+def write_dump(path, entities):
+    open_dump = gzip.open if str(path).endswith('.gz') else open
+    with open_dump(path, 'wt', encoding='utf-8') as f:
+        f.write('[\n' + ',\n'.join(json.dumps(entity) for entity in entities) + '\n]\n')
+
+
+def expected_claims(entity):
+    claims = {}
+    for property_id in PROPERTY_IDS:
+        targets = [claim['mainsnak']['datavalue']['value']['id']
+                   for claim in entity['claims'].get(property_id, [])
+                   if 'id' in claim['mainsnak'].get('datavalue', {}).get('value', {})]
+        if targets:
+            claims[property_id] = targets
+    return claims
+
+
+@pytest.mark.parametrize('dump_name, run_size', [('dump.json.gz', 7), ('dump.json', 1000)])
+def test_index_of_synthetic_dump(tmp_path, dump_name, run_size):
+    entities = make_entities(200)
+    write_dump(tmp_path / dump_name, entities)
+    directory = str(tmp_path / 'index')
+
+    # small runs spread the nodes and edges over many sorted runs on disk
+    count = import_dump(str(tmp_path / dump_name), PROPERTY_IDS, directory, run_size=run_size)
+    index = WikidataIndex(PROPERTY_IDS, directory)
+
+    items = [entity for entity in entities if entity['type'] == 'item']
+    assert count == len(items)
+    assert index.nodes.tolist() == sorted(int(entity['id'][1:]) for entity in items)
+    for entity in items:
+        assert index.label(entity['id']) == entity.get('labels', {}).get('en', {}).get('value')
+        # the claims of an item keep their dump order
+        assert index.claims(entity['id']) == expected_claims(entity)
+
+    assert index.claims('Q0') == {} and index.label('Q0') is None
+    assert index.node('P31') is None
+    assert sorted(tmp.name for tmp in (tmp_path / 'index').iterdir()) == sorted(
+        ['labels.bin', 'nodes.npy', 'label_offsets.npy', 'label_lengths.npy']
+        + [property_id + suffix for property_id in PROPERTY_IDS for suffix in ('_offsets.npy', '_targets.npy')])
+
+
+def test_index_of_empty_dump(tmp_path):
+    write_dump(tmp_path / 'dump.json', [])
+    directory = str(tmp_path / 'index')
+    assert import_dump(str(tmp_path / 'dump.json'), PROPERTY_IDS, directory) == 0
+    index = WikidataIndex(PROPERTY_IDS, directory)
+    assert index.label('Q1') is None and index.claims('Q1') == {}
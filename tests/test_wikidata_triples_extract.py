@@ -0,0 +1,154 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import pytest
+
+pytest.importorskip('requests')
+
+import wikidata_triples_extract as extractor
+from http_client import HttpClient
+
+# English labels of the stub entities; Q4 has none, Q5 redirects to Q1
+LABELS = {'Q1': 'car', 'Q2': 'wheel', 'Q3': 'engine', 'Q4': None}
+LABEL_IDS = [f'Q{i}' for i in range(10, 130)]
+
+
+def stub_entity(entity_id):
+    if entity_id == 'Q5':
+        return 'Q1', dict(stub_entity('Q1')[1], redirects={'from': 'Q5', 'to': 'Q1'})
+    if entity_id == 'Q404':
+        return entity_id, {'id': entity_id, 'missing': ''}
+    label = LABELS.get(entity_id, f'item {entity_id[1:]}')
+    labels = {} if label is None else {'en': {'language': 'en', 'value': label}}
+    return entity_id, {'type': 'item', 'id': entity_id, 'labels': labels}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Answers wbgetentities label requests and records the ids of each request."""
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        ids = query['ids'][0].split('|')
+        with self.server.lock:
+            self.server.requests.append(ids)
+        entities = dict(stub_entity(entity_id) for entity_id in ids)
+        body = json.dumps({'entities': entities}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(monkeypatch):
+    stub = ThreadingHTTPServer(('127.0.0.1', 0), ApiHandler)
+    stub.daemon_threads = True
+    stub.lock = threading.Lock()
+    stub.requests = []
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    monkeypatch.setattr(extractor, 'API_ENDPOINT', f'http://127.0.0.1:{stub.server_address[1]}/w/api.php')
+    monkeypatch.setattr(extractor, 'session', HttpClient(requests_per_second=1000, burst=100, max_retries=0))
+    monkeypatch.setattr(extractor, 'entity_name_cache', {})
+    monkeypatch.setattr(extractor, 'entity_store', None)
+    monkeypatch.setattr(extractor, 'offline_index', None)
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+def test_labels_are_resolved_in_batches_of_50(api):
+    extractor.resolve_labels(LABEL_IDS + LABEL_IDS[:10] + [None])
+
+    # 120 distinct ids in 3 requests instead of one request per id
+    assert sorted(len(ids) for ids in api.requests) == [20, 50, 50]
+    assert sorted(entity_id for ids in api.requests for entity_id in ids) == sorted(LABEL_IDS)
+    assert extractor.entity_name_cache['Q10'] == 'item 10'
+
+
+def test_missing_labels_are_cached(api):
+    extractor.resolve_labels(['Q1', 'Q4', 'Q5', 'Q404'])
+    assert len(api.requests) == 1
+    # entities without an English label, and missing ones, are cached as None
+    assert extractor.entity_name_cache == {'Q1': 'car', 'Q4': None, 'Q5': 'car', 'Q404': None}
+
+    assert extractor.convert_id_to_name('Q4') is None
+    assert extractor.convert_id_to_name('Q5') == 'car'
+    extractor.resolve_labels(['Q1', 'Q4', 'Q404', 'Q2'])
+    # only the new id is requested
+    assert api.requests[1:] == [['Q2']]
+
+
+# An in-memory claims graph: ID -> (label, {property ID: [entity IDs]})
+GRAPH = {
+    'Q1': ('car', {'P527': ['Q2', 'Q3'], 'P279': ['Q4']}),
+    'Q2': ('wheel', {'P527': ['Q5']}),
+    'Q3': ('engine', {'P527': ['Q6'], 'P361': ['Q1']}),
+    'Q4': ('vehicle', {'P279': ['Q7']}),
+    'Q5': ('tyre', {'P527': ['Q8']}),
+    'Q6': ('piston', {}),
+    'Q7': ('object', {}),
+    'Q8': ('rubber', {'P527': ['Q9']}),
+    'Q9': ('molecule', {}),
+}
+
+
+class GraphIndex:
+    """Serves the claims graph like the offline index and records the claims looked up."""
+
+    def __init__(self):
+        self.claims_lookups = []
+        self.levels = []
+
+    def label(self, entity_id):
+        return GRAPH[entity_id][0]
+
+    def claims(self, entity_id):
+        self.claims_lookups.append(entity_id)
+        return GRAPH[entity_id][1]
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    index = GraphIndex()
+    monkeypatch.setattr(extractor, 'offline_index', index)
+    monkeypatch.setattr(extractor, 'entity_store', None)
+    monkeypatch.setattr(extractor, 'entity_name_cache', {})
+    monkeypatch.setattr(extractor, 'claims_cache', {})
+    monkeypatch.setattr(extractor, 'triples_global', [])
+    monkeypatch.setattr(extractor, 'visited_entities', set())
+    get_claims = extractor.get_claims
+
+    def recording_get_claims(entity_ids):
+        index.levels.append(list(entity_ids))
+        return get_claims(entity_ids)
+
+    monkeypatch.setattr(extractor, 'get_claims', recording_get_claims)
+    return index
+
+
+def test_structure_is_searched_level_by_level(graph, monkeypatch):
+    monkeypatch.setattr(extractor, 'MAX_LEVEL_DEEP', 2)
+    extractor.search_structure_from_top('Q1', 0)
+
+    # claims of one level are looked up together, in the order the entities were found
+    assert graph.levels == [['Q1'], ['Q2', 'Q3', 'Q4'], ['Q5', 'Q6', 'Q7']]
+    assert graph.claims_lookups == ['Q1', 'Q2', 'Q3', 'Q4', 'Q5', 'Q6', 'Q7']
+    assert extractor.triples_global == [
+        ('car', 'has parts', 'wheel'), ('car', 'has parts', 'engine'), ('car', 'subclass of', 'vehicle'),
+        ('wheel', 'has parts', 'tyre'), ('engine', 'has parts', 'piston'),
+        ('vehicle', 'subclass of', 'object'),
+        # entities of the last level give their triples, but are not searched further
+        ('tyre', 'has parts', 'rubber'),
+    ]
+
+
+def test_search_stops_at_max_level(graph, monkeypatch):
+    monkeypatch.setattr(extractor, 'MAX_LEVEL_DEEP', 0)
+    extractor.search_structure_from_top('Q1', 0)
+    assert graph.levels == [['Q1']]
+    assert [triple[2] for triple in extractor.triples_global] == ['wheel', 'engine', 'vehicle']
@@ -0,0 +1,91 @@
+import gc
+import weakref
+from article_parser import parse_article
+from wikipedia_dump import MultistreamDumpFetcher, write_multistream_dump
+
+CAR = """{{Short description|Motorized vehicle}}
+{{Infobox vehicle
+| name = Car
+| image = Car.jpg
+| classification = [[Vehicle]]
+| fuel_source = Petrol & [[Electricity|electric power]]
+}}
+A '''car''' is a [[motor vehicle]] with [[Wheel|wheels]].<ref>Source</ref> Cars run on [[road]]s.
+
+Most cars use [[Petrol engine#Fuel|petrol]]. [[File:Car.jpg|thumb|A car]]
+
+== History ==
+The [[Benz Patent-Motorwagen]] was the first car.
+"""
+
+PAGES = [
+    ('Bus', 'A bus is a [[road vehicle]]. '),
+    ('Car', CAR),
+    ('Automobile', '#REDIRECT [[Car]]', 'Car'),
+    ('Tram', 'A tram is a [[rail vehicle]]. '),
+    ('Motorcar', '#REDIRECT [[Automobile]]', 'Automobile'),
+]
+
+
+def make_fetcher(tmp_path, index_name):
+    dump_path = str(tmp_path / 'dump-multistream.xml.bz2')
+    index_path = str(tmp_path / index_name)
+    # two pages per stream, so the pages are spread over several streams
+    write_multistream_dump(PAGES, dump_path, index_path, pages_per_stream=2)
+    return MultistreamDumpFetcher(dump_path, index_path)
+
+
+def test_dump_round_trip(tmp_path):
+    fetcher = make_fetcher(tmp_path, 'dump-multistream-index.txt.bz2')
+    article = parse_article(fetcher.fetch('/wiki/Car'))
+
+    assert article.title == 'Car'
+    assert article.infobox_labels == ['Classification', 'Fuel source']
+    assert article.get_hrefs() == ['/wiki/Motor_vehicle', '/wiki/Wheel', '/wiki/Road',
+                                   '/wiki/Petrol_engine#Fuel']
+    texts = [article.lead_text[start:end] for start, end in article.sentences]
+    assert texts[0] == 'A car is a motor vehicle with wheels. '
+    # the lead ends at the first heading
+    assert not any('Benz' in text for text in texts)
+    links = article.sentence_links(*article.sentences[0])
+    assert [(link.text, link.title) for link in links] == [('motor vehicle', 'motor vehicle'),
+                                                           ('wheels', 'Wheel')]
+
+
+def test_dump_follows_redirect(tmp_path):
+    fetcher = make_fetcher(tmp_path, 'dump-multistream-index.txt')
+    # the redirect and its target are stored in different streams
+    assert fetcher.offsets['Automobile'] != fetcher.offsets['Car']
+    assert fetcher.fetch('/wiki/Automobile') == fetcher.fetch('/wiki/Car')
+    assert parse_article(fetcher.fetch('/wiki/Automobile')).title == 'Car'
+    # a single redirect is followed, not a chain of them
+    assert fetcher.fetch('/wiki/Motorcar') == ''
+
+
+def test_dump_missing_page(tmp_path):
+    fetcher = make_fetcher(tmp_path, 'dump-multistream-index.txt')
+    assert fetcher.fetch('/wiki/Bicycle') == ''
+    assert fetcher.fetch('/w/index.php?title=Car') == ''
+    assert parse_article(fetcher.fetch('/wiki/Tram')).get_hrefs() == ['/wiki/Rail_vehicle']
+
+
+def test_stream_cache_belongs_to_the_fetcher(tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    fetcher = make_fetcher(tmp_path / 'a', 'dump-multistream-index.txt')
+    other = make_fetcher(tmp_path / 'b', 'dump-multistream-index.txt')
+    fetcher.fetch('/wiki/Car')
+    fetcher.fetch('/wiki/Bus')
+    other.fetch('/wiki/Tram')
+
+    # Car and Bus share a stream
+    assert fetcher.read_stream.cache_info()[:2] == (1, 1)
+    assert other.read_stream.cache_info()[:2] == (0, 1)
+
+    # the cache does not keep the fetcher alive
+    reference = weakref.ref(fetcher)
+    fetcher.dump.close()
+    del fetcher
+    gc.collect()
+    assert reference() is None
+    other.dump.close()
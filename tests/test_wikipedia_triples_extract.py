@@ -0,0 +1,101 @@
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+spacy = pytest.importorskip('spacy')
+pytest.importorskip('requests')
+
+import spacy_models
+from article_fetchers import FullPageFetcher
+from http_client import HttpClient
+from wikipedia_triples_extract import WikipediaExtractor
+
+# Links of the lead section and infobox labels of each stub page. Truck is
+# linked from Car and from Bus; Deep is beyond the maximum depth level.
+PAGES = {
+    'Car': (['Bus', 'Truck'], ['Classification', 'Powered']),
+    'Bus': (['Truck', 'Coach', 'Car'], ['Capacity']),
+    'Truck': (['Trailer'], ['Payload']),
+    'Coach': (['Deep'], ['Seats']),
+    'Trailer': (['Deep'], ['Axles']),
+    'Deep': ([], ['Depth']),
+}
+
+
+def render(title):
+    links, labels = PAGES[title]
+    rows = ''.join(f'<tr><th scope="row" class="infobox-label">{label}</th><td>x</td></tr>'
+                   for label in labels)
+    paragraph = ' '.join(f'<a href="/wiki/{link}" title="{link}">{link}</a>' for link in links)
+    return (f'<html><body><h1><span class="mw-page-title-main">{title}</span></h1>'
+            f'<div id="mw-content-text"><table class="infobox">{rows}</table>'
+            f'<p>{title} links to {paragraph}.\n</p></div></body></html>')
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Serves the stub pages under /wiki/ and counts the requests of each path."""
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests[self.path] += 1
+        title = self.path[len('/wiki/'):]
+        if title not in PAGES:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = render(title).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    stub = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    stub.daemon_threads = True
+    stub.lock = threading.Lock()
+    stub.requests = Counter()
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    stub.url = f'http://127.0.0.1:{stub.server_address[1]}'
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture(autouse=True)
+def blank_model(monkeypatch):
+    monkeypatch.setitem(spacy_models.loaded_models, spacy_models.DEFAULT_MODEL, spacy.blank('en'))
+
+
+def make_extractor(server):
+    client = HttpClient(requests_per_second=1000, burst=100, max_retries=0)
+    return WikipediaExtractor(max_depth_level=2, fetcher=FullPageFetcher(client, server.url))
+
+
+def test_concurrent_crawl_matches_sequential_extract(server):
+    sequential = make_extractor(server)
+    sequential.extract('/wiki/Car')
+    # the recursive traversal fetches the seed again when Bus links back to it,
+    # and reaches Truck at depth 2 first, so it never visits Trailer
+    assert server.requests == Counter({'/wiki/Car': 2, '/wiki/Bus': 1, '/wiki/Truck': 1,
+                                       '/wiki/Coach': 1})
+    server.requests.clear()
+
+    concurrent = make_extractor(server)
+    concurrent.extract_concurrent('/wiki/Car', max_workers=4)
+
+    assert concurrent.triples == sequential.triples
+    assert ('car', 'has properties', 'Classification') in concurrent.triples
+    assert ('coach', 'has properties', 'Seats') in concurrent.triples
+    assert ('trailer', 'has properties', 'Axles') not in concurrent.triples
+    # every page within the maximum depth level is fetched once, Deep not at all;
+    # Trailer is fetched but not extracted, like in the sequential traversal
+    assert server.requests == Counter({f'/wiki/{title}': 1 for title in PAGES if title != 'Deep'})
+    assert not concurrent.loaded_articles
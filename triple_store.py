@@ -0,0 +1,240 @@
+import ast
+import os
+import re
+import sqlite3
+import sys
+
+# Configuration
+STORE_PATH = 'triples.sqlite'
+EXPORT_TEXT_FILES = True    # also write the text files read by older versions of the scripts
+
+# CONSTANTS
+# Line of a verified file: 'sub' (sub_t), 'rel', 'obj' (obj_t) : rel_t
+VERIFIED_LINE = re.compile(r"^'(.*)' \((.*?)\), '(.*)', '(.*)' \((.*?)\) : (.*)$")
+
+# Global variables
+shared_store = None
+
+
+class TripleStore:
+    """
+    An SQLite store of the triples passed between the scripts.
+
+    Triples are kept in named datasets, named after the text files they
+    replace (e.g. 'Car_triples_from_wikipedia.txt'). A dataset holds either
+    extracted triples (sub, rel, obj) or verified triples (sub, rel, obj,
+    rel_t, sub_t, obj_t). Every string is stored once in a table of
+    interned strings and the triples refer to it by integer ID. Written
+    datasets are recorded in a table of their own, so that a dataset saved
+    without triples is not taken for a missing one.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        """
+        Open (or create) the store.
+
+        :param path: Path of the SQLite database.
+        """
+        self.pid = os.getpid()
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS strings (
+                id INTEGER PRIMARY KEY, text TEXT UNIQUE NOT NULL);
+            CREATE TABLE IF NOT EXISTS triples (
+                dataset INTEGER, position INTEGER, sub INTEGER, rel INTEGER, obj INTEGER,
+                rel_t INTEGER, sub_t INTEGER, obj_t INTEGER,
+                PRIMARY KEY (dataset, position));
+            CREATE TABLE IF NOT EXISTS datasets (id INTEGER PRIMARY KEY);
+        """)
+        self.string_ids = {}
+
+    def intern(self, text):
+        """
+        Return the ID of a string, adding the string if it is new.
+
+        :param text: The string, or None.
+        :return: Its ID, or None for None.
+        """
+        if text is None:
+            return None
+        string_id = self.string_ids.get(text)
+        if string_id is None:
+            self.db.execute('INSERT OR IGNORE INTO strings (text) VALUES (?)', (text,))
+            string_id = self.db.execute('SELECT id FROM strings WHERE text = ?', (text,)).fetchone()[0]
+            self.string_ids[text] = string_id
+        return string_id
+
+    def dataset_id(self, name):
+        """Return the ID of a written dataset, even one without triples, or None."""
+        row = self.db.execute('SELECT datasets.id FROM datasets JOIN strings ON strings.id = datasets.id'
+                              ' WHERE strings.text = ?', (name,)).fetchone()
+        return None if row is None else row[0]
+
+    def has_dataset(self, name):
+        """Check whether the named dataset was written to the store, with or without triples."""
+        return self.dataset_id(name) is not None
+
+    def datasets(self):
+        """Return the names of all datasets."""
+        return [name for name, in self.db.execute(
+            'SELECT text FROM strings WHERE id IN (SELECT id FROM datasets) ORDER BY text')]
+
+    def write(self, name, triples):
+        """
+        Replace the triples of a dataset.
+
+        :param name: Name of the dataset.
+        :param triples: Iterable of (sub, rel, obj) or (sub, rel, obj, rel_t,
+                        sub_t, obj_t) tuples; it is consumed as a stream.
+        :return: Number of written triples.
+        """
+        dataset = self.intern(name)
+        count = 0
+
+        def rows():
+            nonlocal count
+            for position, triple in enumerate(triples):
+                count += 1
+                yield (dataset, position) + tuple(self.intern(text) for text in triple) \
+                    + (None,) * (6 - len(triple))
+
+        with self.db:
+            self.db.execute('INSERT OR IGNORE INTO datasets VALUES (?)', (dataset,))
+            self.db.execute('DELETE FROM triples WHERE dataset = ?', (dataset,))
+            self.db.executemany('INSERT INTO triples VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows())
+        return count
+
+    def iterate(self, name):
+        """
+        Stream the triples of a dataset in the order they were written.
+
+        :param name: Name of the dataset.
+        :return: A generator of (sub, rel, obj) tuples, or of (sub, rel, obj,
+                 rel_t, sub_t, obj_t) tuples for verified triples.
+        """
+        dataset = self.dataset_id(name)
+        if dataset is None:
+            return
+        cursor = self.db.execute("""
+            SELECT s.text, r.text, o.text, rt.text, st.text, ot.text FROM triples
+            LEFT JOIN strings s ON s.id = triples.sub
+            LEFT JOIN strings r ON r.id = triples.rel
+            LEFT JOIN strings o ON o.id = triples.obj
+            LEFT JOIN strings rt ON rt.id = triples.rel_t
+            LEFT JOIN strings st ON st.id = triples.sub_t
+            LEFT JOIN strings ot ON ot.id = triples.obj_t
+            WHERE dataset = ? ORDER BY position""", (dataset,))
+        for row in cursor:
+            yield row if row[3] is not None else row[:3]
+
+    def import_text(self, name, filename=None):
+        """
+        Import a text file written by the scripts before the store: one
+        triple tuple per line, or lines of the verified format.
+
+        :param name: Name of the dataset.
+        :param filename: Path of the file, by default the name of the dataset.
+        :return: Number of imported triples.
+        """
+        return self.write(name, read_text_file(filename or name))
+
+    def export_text(self, name, filename=None):
+        """
+        Write a dataset in the text format of the scripts before the store.
+
+        :param name: Name of the dataset.
+        :param filename: Path of the file, by default the name of the dataset.
+        """
+        with open(filename or name, 'w', encoding='utf-8') as f:
+            for triple in self.iterate(name):
+                if len(triple) == 3:
+                    f.write(str(triple) + '\n')
+                else:
+                    sub, rel, obj, rel_t, sub_t, obj_t = triple
+                    f.write(f"'{sub}' ({sub_t}), '{rel}', '{obj}' ({obj_t}) : {rel_t}\n")
+
+
+def read_text_file(filename):
+    """
+    Read triples from a text file written by the scripts before the store.
+
+    :param filename: Path of the file.
+    :return: A generator of triple tuples; lines in neither format are skipped.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line.startswith('('):
+                try:
+                    triple = ast.literal_eval(line)
+                except (ValueError, SyntaxError):
+                    continue
+                if isinstance(triple, tuple) and len(triple) == 3 \
+                   and all(isinstance(part, str) for part in triple):
+                    yield triple
+            else:
+                match = VERIFIED_LINE.match(line)
+                if match is not None:
+                    sub, sub_t, rel, obj, obj_t, rel_t = match.groups()
+                    yield (sub, rel, obj, rel_t, sub_t, obj_t)
+
+def get_store():
+    """
+    Return the store shared by the process, opening it on first use. A worker
+    process forked from a process with an open store opens its own.
+
+    :return: The shared TripleStore.
+    """
+    global shared_store
+    if shared_store is None or shared_store.pid != os.getpid():
+        shared_store = TripleStore()
+    return shared_store
+
+def save_triples(name, triples):
+    """
+    Save the triples as a dataset of the shared store and, if
+    EXPORT_TEXT_FILES is set, also as a text file of the same name.
+
+    :param name: Name of the dataset, e.g. 'Car_triples_from_wikipedia.txt'.
+    :param triples: Iterable of triple tuples.
+    """
+    store = get_store()
+    store.write(name, triples)
+    if EXPORT_TEXT_FILES:
+        store.export_text(name)
+
+def load_triples(name):
+    """
+    Stream the triples of a dataset of the shared store. A dataset missing
+    from the store is imported from the text file of the same name, if any.
+
+    :param name: Name of the dataset, e.g. 'Car_triples_from_wikipedia.txt'.
+    :return: A generator of triple tuples.
+    """
+    store = get_store()
+    if not store.has_dataset(name) and os.path.exists(name):
+        store.import_text(name)
+    return store.iterate(name)
+
+
+def main():
+    """
+    Import or export datasets from the command line:
+        python triple_store.py import FILE...
+        python triple_store.py export DATASET...
+        python triple_store.py list
+    """
+    store = get_store()
+    command, names = sys.argv[1], sys.argv[2:]
+    if command == 'import':
+        for name in names:
+            print(f"Imported {store.import_text(name)} triples from {name}")
+    elif command == 'export':
+        for name in names:
+            store.export_text(name)
+    elif command == 'list':
+        for name in store.datasets():
+            print(name)
+
+if __name__ == "__main__":
+    main()
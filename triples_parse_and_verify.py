@@ -1,7 +1,21 @@
-import spacy
+import hashlib
+import json
+import os
+from multiprocessing import Pool
+from entity_classifier import EntityClassifier, load_gazetteer
+from inheritance_closure import InheritanceClosure
+from pair_index import PairIndex
+from triple_store import get_store, load_triples, save_triples
 
 # Configuration
 OUTPUT_FORMAT = 'verified_files/output_'
+ENTITY_CACHE_FILE = 'entity_cache.json'     # NER results kept between runs
+USE_CASCADE_CLASSIFIER = False      # settle clear cases without the transformer model (needs en_core_web_sm)
+MEASURE_CLASSIFIER_AGREEMENT = False    # compare the cascade with the transformer model
+PROCESSES = None        # worker processes classifying the files, None for one per core, 1 for none
+MANIFEST_FILE = 'verification_manifest.json'    # processed triples of the previous run
+MANIFEST_VERSION = 1
+INHERIT_CLASSES = False     # also mark the classes an identified class inherits from as classes
 FILES = [
     'Airport_triples_from_wikipedia.txt',
     'Brain_triples_from_wikipedia.txt',
@@ -22,8 +36,10 @@ FILES = [
 ]
 
 # Global variables
-nlp = spacy.load("en_core_web_trf")
 identified_classes = set()
+entity_cache = {}
+entity_classifier = None
+manifest = {}
 
 def has_numbers(inputString):
     """
@@ -33,6 +49,156 @@ def has_numbers(inputString):
     """
     return any(char.isdigit() for char in inputString)
 
+def load_entity_cache(filename=ENTITY_CACHE_FILE):
+    """
+    Load the NER results of previous runs into the entity_cache. Results
+    saved with other classifier settings are not used.
+    :param filename: Path to the JSON file with the results.
+    """
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('settings') == get_classifier_settings():
+            entity_cache.update(saved['entities'])
+
+def save_entity_cache(filename=ENTITY_CACHE_FILE):
+    """
+    Save the entity_cache with the classifier settings it was built with,
+    so that later runs do not repeat the NER.
+    :param filename: Path to the JSON file with the results.
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump({'settings': get_classifier_settings(), 'entities': entity_cache},
+                  f, ensure_ascii=False)
+
+def get_entity_classifier():
+    """
+    Return the classifier of subjects and objects, creating it on first use;
+    with USE_CASCADE_CLASSIFIER, with a gazetteer built from the Wikidata
+    files among FILES.
+    :return: EntityClassifier
+    """
+    global entity_classifier
+    if entity_classifier is None:
+        entity_classifier = EntityClassifier(
+            load_gazetteer([file for file in FILES if file.startswith('Q')])
+            if USE_CASCADE_CLASSIFIER else {},
+            cascade=USE_CASCADE_CLASSIFIER,
+            measure_agreement=MEASURE_CLASSIFIER_AGREEMENT)
+    return entity_classifier
+
+def get_classifier_settings():
+    """
+    Return the settings the classification of subjects and objects depends
+    on: the classifier mode and, for the cascade, the digest of its gazetteer.
+    """
+    settings = {'cascade': USE_CASCADE_CLASSIFIER}
+    if USE_CASCADE_CLASSIFIER:
+        gazetteer = sorted(get_entity_classifier().gazetteer.items())
+        settings['gazetteer'] = get_digest(json.dumps(gazetteer, ensure_ascii=False))
+    return settings
+
+def identify_entities(texts):
+    """
+    Check which subjects and objects are named entities (ORG or GPE). Each
+    text not yet in the entity_cache is classified once, in batches.
+    :param texts: Subjects and objects of the triples.
+    """
+    pending = list(dict.fromkeys(text for text in texts if text not in entity_cache))
+    if not pending:
+        return
+    entity_cache.update(get_entity_classifier().classify(pending))
+
+def normalize_triple(triple):
+    """
+    Normalize an extracted triple, or reject it if it is not verified
+    (lists, Wikidata properties, numbers).
+    :param triple: Extracted triple (subject, relation, object).
+    :return: The lowercase (subject, relation, object) tuple, or None.
+    """
+    # e.g. Wikidata entities without an English label
+    if None in triple[:3]:
+        return None
+    sub, rel, obj = (text.replace('\xa0', ' ').lower() for text in triple[:3])
+    line = ' '.join((sub, rel, obj))
+
+    if any(term in line for term in 
+           ['list of', 'wikidata property', 'wikidata qualifier']) \
+       or has_numbers(line):
+        return None
+
+    return (sub.replace('"',"'"), rel, obj.replace('"',"'"))
+
+def read_triples_file(filename):
+    """
+    Read the triples of a dataset of the triple store, skipping the ones
+    which are not verified.
+    :param filename: Name of the dataset, the file the triples were saved to.
+    :return: A list of (subject, relation, object) tuples.
+    """
+    triples = []
+    for triple in load_triples(filename):
+        triple = normalize_triple(triple)
+        if triple is not None:
+            triples.append(triple)
+    return triples
+
+def type_triple(sub, rel, obj):
+    """
+    Identify whether the subject and object are classes, objects or
+    attributes and assign the relation type. The subjects and objects must
+    have been checked by identify_entities().
+    :param sub: Subject of the normalized triple.
+    :param rel: Relation of the normalized triple.
+    :param obj: Object of the normalized triple.
+    :return: The processed triple (sub, rel, obj, rel_t, sub_t, obj_t).
+    """
+    subject_is_entity = entity_cache[sub]
+    obj_is_entity = entity_cache[obj]
+
+    obj_t = 'object' if obj_is_entity else 'class'
+    sub_t = 'object' if subject_is_entity else 'class'
+
+    if rel in ['is a', 'instance of', 'part of'] and not obj_is_entity:
+        obj_t = 'class'
+        identified_classes.add(obj)
+    if rel in ['subclass of']:
+        obj_t = 'class'
+        identified_classes.add(obj)
+        sub_t = 'class'
+        identified_classes.add(sub)
+    if rel in ['properties for this type', 'has characteristic', 
+               'has properties']:
+        obj_t = 'attribute name' 
+    
+    if rel in ('made from material', 'made up of',):
+        rel_t = 'composition'
+    elif rel in ('have', 'include','part of', 'has parts', 
+                 'made of', 'is composed of', 'consist of'):
+        rel_t = 'aggregation'
+    elif rel in ('is a', 'instance of', 'subclass of'):
+        rel_t = 'inheritance'
+    elif rel in ('properties for this type', 'has characteristic', 
+                 'has properties'):
+        rel_t = 'attributes'
+    else:
+        rel_t = 'association'
+    
+    rel_t = 'composition' if rel in ['made from material', 
+                                    'made up of'] else \
+            'aggregation' if rel in ['have', 'is composed of', 
+                                    'part of', 'has parts', 
+                                    'made of', 'include', 
+                                    'consist of'] else \
+            'inheritance' if rel in ['is a', 'instance of', 
+                                    'subclass of'] else \
+            'attributes' if rel in ['properties for this type', 
+                                    'has characteristic', 
+                                    'has properties'] else \
+            'association'
+
+    return (sub, rel, obj, rel_t, sub_t, obj_t)
+
 def reprocess_aggregation_relations(triples):
     """
     Reprocess aggregation relations in triples to detect reverse compositions.
@@ -40,11 +206,11 @@ def reprocess_aggregation_relations(triples):
     :return: Updated list of triples with corrected relation types
     """
     final_triples = []
+    pair_index = PairIndex(triples)
     for triple in triples:
         sub, rel, obj, rel_t, sub_t, obj_t = triple 
         if rel_t == 'aggregation':
-            if any(sub == obj_rev and obj == sub_rev \
-            for (sub_rev, _, obj_rev,_,_,_) in triples):
+            if pair_index.has_reverse(sub, obj):
                 triple = (sub, rel, obj, 'composition', sub_t, obj_t)
         final_triples.append(triple)
     return final_triples
@@ -56,105 +222,181 @@ def process_triples_file(filename):
     :param filename: The path to the input file with triples.
     :return: A list of processed triples with classification and relation type.
     """
-    processed_triples = []
-    
-    with open(filename, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        for line in lines:
-            line = line.replace('\\xa0', ' ').lower()
-
-            if any(term in line for term in 
-                   ['list of', 'wikidata property', 'wikidata qualifier']) \
-               or has_numbers(line):
-                continue
-
-            line = line[2:-3]
-            triples = line.split(", ")
-            if len(triples) != 3:
-                continue
-
-            sub = triples[0][:-1].replace('"',"'")
-            rel = triples[1][1:-1]
-            obj = triples[2][1:].replace('"',"'")
-
-            doc_subject = nlp(sub)
-            doc_object = nlp(obj)
-
-            subject_is_entity = any(ent.label_ in ['ORG', 'GPE']
-                                    for ent in doc_subject.ents)
-            obj_is_entity = any(ent.label_ in ['ORG', 'GPE']
-                                   for ent in doc_object.ents)
-
-            obj_t = 'object' if obj_is_entity else 'class'
-            sub_t = 'object' if subject_is_entity else 'class'
-
-            if rel in ['is a', 'instance of', 'part of'] and not obj_is_entity:
-                obj_t = 'class'
-                identified_classes.add(obj)
-            if rel in ['subclass of']:
-                obj_t = 'class'
-                identified_classes.add(obj)
-                sub_t = 'class'
-                identified_classes.add(sub)
-            if rel in ['properties for this type', 'has characteristic', 
-                       'has properties']:
-                obj_t = 'attribute name' 
-            
-            if rel in ('made from material', 'made up of',):
-                rel_t = 'composition'
-            elif rel in ('have', 'include','part of', 'has parts', 
-                         'made of', 'is composed of', 'consist of'):
-                rel_t = 'aggregation'
-            elif rel in ('is a', 'instance of', 'subclass of'):
-                rel_t = 'inheritance'
-            elif rel in ('properties for this type', 'has characteristic', 
-                         'has properties'):
-                rel_t = 'attributes'
-            else:
-                rel_t = 'association'
-            
-            rel_t = 'composition' if rel in ['made from material', 
-                                            'made up of'] else \
-                    'aggregation' if rel in ['have', 'is composed of', 
-                                            'part of', 'has parts', 
-                                            'made of', 'include', 
-                                            'consist of'] else \
-                    'inheritance' if rel in ['is a', 'instance of', 
-                                            'subclass of'] else \
-                    'attributes' if rel in ['properties for this type', 
-                                            'has characteristic', 
-                                            'has properties'] else \
-                    'association'
-
-            processed_triples.append((sub, rel, obj, rel_t, sub_t, obj_t))
+    triples = read_triples_file(filename)
+    identify_entities([text for sub, _, obj in triples for text in (sub, obj)])
+
+    processed_triples = [type_triple(sub, rel, obj) for sub, rel, obj in triples]
 
     processed_triples = reprocess_aggregation_relations(processed_triples)
 
     return processed_triples
 
+def add_inherited_classes(closure):
+    """
+    Add to identified_classes every class an identified class inherits
+    from, directly or through other classes, as only a class can be
+    inherited from: with ('car', 'subclass of', 'motor vehicle') and
+    ('motor vehicle', 'is a', 'vehicle'), 'vehicle' is a class too. Used
+    with INHERIT_CLASSES only, as it also marks named entities which are
+    the object of 'is a' or 'instance of'.
+    :param closure: InheritanceClosure of the processed triples.
+    """
+    identified_classes.update(closure.get_ancestors_of_all(identified_classes))
+
 def write_processed_triples(triples, output_filename):
     """
     Write the processed triples into a new file with subjects, relation
     and object types.
     :param triples: List of processed triples.
-    :param output_filename: Path to the output file.
+    :param output_filename: Name of the dataset of the triple store (and
+                            of the exported file).
     """
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        for triple in triples:
-            sub, rel, obj, rel_t, sub_t, obj_t = triple
-            if obj in identified_classes:
-                obj_t = 'class'
-            if sub in identified_classes:
-                sub_t = 'class'
-            f.write(f"'{sub}' ({sub_t}), '{rel}', '{obj}' ({obj_t}) : {rel_t}\n")
+    verified_triples = []
+    for triple in triples:
+        sub, rel, obj, rel_t, sub_t, obj_t = triple
+        if obj in identified_classes:
+            obj_t = 'class'
+        if sub in identified_classes:
+            sub_t = 'class'
+        verified_triples.append((sub, rel, obj, rel_t, sub_t, obj_t))
+    save_triples(output_filename, verified_triples)
 
-for file in FILES:
+def get_digest(text):
+    """
+    Return the content hash of a text.
+    :param text: The text, e.g. the parts of a triple joined together.
+    :return: Hexadecimal SHA-256 digest.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def get_manifest_settings():
+    """
+    Return the settings the processed triples of the manifest depend on;
+    a manifest written with other settings is not used.
+    """
+    return dict(get_classifier_settings(), version=MANIFEST_VERSION)
+
+def load_manifest(filename=MANIFEST_FILE):
+    """
+    Load the manifest of the previous run: for every file, the digest of
+    its triples, the processed triple and identified classes of each of
+    them, and the digest of the classes its output was written with.
+    :param filename: Path to the JSON file with the manifest.
+    """
+    manifest.clear()
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('settings') == get_manifest_settings():
+            manifest.update(saved['files'])
+
+def save_manifest(files, filename=MANIFEST_FILE):
+    """
+    Save the manifest of this run.
+    :param files: Dictionary mapping files to their manifest entries.
+    :param filename: Path to the JSON file with the manifest.
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump({'settings': get_manifest_settings(), 'files': files}, f, ensure_ascii=False)
+
+def init_worker():
+    """
+    Prepare a process classifying files: load the NER results and the
+    manifest of previous runs.
+    """
+    # cached results would hide the strings from the comparison
+    if not MEASURE_CLASSIFIER_AGREEMENT:
+        load_entity_cache()
+        load_manifest()
+
+def classify_file(filename):
+    """
+    Phase one of the verification: process one file on its own, collecting
+    the classes it identifies instead of sharing them with other files.
+    Triples processed in the previous run, found in the manifest by their
+    content hash, are reused; only new triples are classified and typed.
+    :param filename: The path to the input file with triples.
+    :return: A tuple (processed triples, identified classes, NER results of
+             new subjects and objects, classifier counts, manifest entry).
+    """
+    triples = read_triples_file(filename)
+    keys = [get_digest('\x1f'.join(triple)) for triple in triples]
+    previous = manifest.get(filename, {}).get('triples', {})
+
+    new_triples = [triple for triple, key in zip(triples, keys) if key not in previous]
+    identify_entities([text for sub, _, obj in new_triples for text in (sub, obj)])
+
+    typed_triples = {}
+    for triple, key in zip(triples, keys):
+        if key in typed_triples:
+            continue
+        if key in previous:
+            typed_triples[key] = previous[key]
+        else:
+            identified_classes.clear()
+            typed_triples[key] = [list(type_triple(*triple)), sorted(identified_classes)]
+
+    processed_triples = []
+    classes = set()
+    for key in keys:
+        typed, triple_classes = typed_triples[key]
+        processed_triples.append(tuple(typed))
+        classes.update(triple_classes)
+    processed_triples = reprocess_aggregation_relations(processed_triples)
+
+    entities = {text: entity_cache[text] for sub, _, obj in new_triples for text in (sub, obj)}
+    entry = {'digest': get_digest('\n'.join(keys)), 'triples': typed_triples}
+    return (processed_triples, classes, entities,
+            get_entity_classifier().pop_counts(), entry)
+
+def main():
     """
     Process each file in the FILES list, transform triples, and save the output 
     to a corresponding output file.
+
+    Files are classified in parallel, then the classes identified in any of
+    them are merged (with INHERIT_CLASSES, together with the classes they
+    inherit from in the triples of all files), and all output files are
+    written with the same classes, so the output does not depend on the order of the files. An output is
+    written again only if its file's triples or the merged classes changed.
     """
-    input_filename = file
-    output_filename = OUTPUT_FORMAT + file
+    init_worker()
+    if PROCESSES == 1:
+        results = [classify_file(file) for file in FILES]
+    else:
+        with Pool(PROCESSES, initializer=init_worker) as pool:
+            results = pool.map(classify_file, FILES)
+
+    classifier = get_entity_classifier()
+    identified_classes.clear()
+    closure = InheritanceClosure()
+    for processed_triples, classes, entities, counts, _ in results:
+        identified_classes.update(classes)
+        if INHERIT_CLASSES:
+            closure.add_triples(processed_triples)
+        entity_cache.update(entities)
+        classifier.add_counts(counts)
+    if INHERIT_CLASSES:
+        add_inherited_classes(closure)
+    classes_digest = get_digest('\n'.join(sorted(identified_classes)))
+
+    files = {}
+    written = 0
+    for file, (processed_triples, _, _, _, entry) in zip(FILES, results):
+        output_filename = OUTPUT_FORMAT + file
+        previous = manifest.get(file, {})
+        if previous.get('digest') != entry['digest'] \
+           or previous.get('classes_digest') != classes_digest \
+           or not get_store().has_dataset(output_filename):
+            write_processed_triples(processed_triples, output_filename)
+            written += 1
+        entry['classes_digest'] = classes_digest
+        files[file] = entry
+
+    save_manifest(files)
+    save_entity_cache()
+    print(f"Wrote {written} of {len(FILES)} output files")
+    classifier.report()
 
-    processed_triples = process_triples_file(input_filename)
-    write_processed_triples(processed_triples, output_filename)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import bz2
+import gzip
+import heapq
+import json
+import os
+import sys
+import tempfile
+from operator import itemgetter
+import numpy as np
+
+# Configuration
+INDEX_DIRECTORY = 'wikidata_index'
+PROGRESS_EVERY = 1000000    # entities between progress messages of the import
+RUN_SIZE = 1000000          # nodes or edges sorted in memory at once by the import
+MERGE_BLOCK_SIZE = 65536    # records read from a sorted run or written to an array at once
+
+# CONSTANTS
+NODE_RECORD = np.dtype([('number', np.int64), ('label_offset', np.int64), ('label_length', np.int32)])
+EDGE_RECORD = np.dtype([('source', np.int64), ('target', np.int64)])
+
+
+def open_dump(dump_path):
+    """Open a Wikidata JSON dump as text, decompressing '.bz2' and '.gz' files."""
+    if dump_path.endswith('.bz2'):
+        return bz2.open(dump_path, 'rt', encoding='utf-8')
+    if dump_path.endswith('.gz'):
+        return gzip.open(dump_path, 'rt', encoding='utf-8')
+    return open(dump_path, 'r', encoding='utf-8')
+
+def iterate_entities(dump_path):
+    """
+    Stream the entities of a Wikidata JSON dump, which holds one entity per
+    line inside a JSON array, without reading the whole dump into memory.
+
+    :param dump_path: Path of the 'latest-all.json(.bz2/.gz)' dump.
+    :return: A generator of entity dictionaries.
+    """
+    with open_dump(dump_path) as f:
+        for line in f:
+            line = line.strip().rstrip(',')
+            if line in ('', '[', ']'):
+                continue
+            yield json.loads(line)
+
+def entity_number(entity_id):
+    """Convert an entity ID, e.g. 'Q809', into its number, e.g. 809."""
+    return int(entity_id[1:])
+
+def get_target_numbers(claims):
+    """
+    Return the numbers of the items the given claims of a property point to.
+
+    :param claims: Claims of one property of the entity.
+    :return: A list of item numbers, in the order of the claims.
+    """
+    numbers = []
+    for claim in claims:
+        try:
+            value = claim['mainsnak']['datavalue']['value']
+        except (KeyError, TypeError):
+            continue
+        if isinstance(value, dict) and value.get('entity-type') == 'item':
+            numbers.append(value['numeric-id'] if 'numeric-id' in value else entity_number(value['id']))
+    return numbers
+
+
+class SortedRuns:
+    """
+    External sort of fixed-size records by their first field. Records are
+    buffered, every full buffer is sorted and written to a temporary run
+    file, and merge() streams all records in order by merging the runs, so
+    memory is bounded by the buffer and one block of each run. Records with
+    equal keys keep the order they were added in.
+    """
+
+    def __init__(self, dtype, directory, run_size=RUN_SIZE):
+        """
+        :param dtype: NumPy structured dtype of the records; the first field is the sort key.
+        :param directory: Directory of the temporary run files.
+        :param run_size: Number of records sorted in memory at once.
+        """
+        self.dtype = np.dtype(dtype)
+        self.directory = directory
+        self.buffer = np.empty(run_size, dtype=self.dtype)
+        self.buffered = 0
+        self.runs = []
+        self.count = 0
+
+    def add(self, record):
+        """Add a record given as a tuple of its fields."""
+        self.buffer[self.buffered] = record
+        self.buffered += 1
+        self.count += 1
+        if self.buffered == len(self.buffer):
+            self.write_run()
+
+    def write_run(self):
+        """Sort the buffered records and write them to a new run file."""
+        records = self.buffer[:self.buffered]
+        run = tempfile.TemporaryFile(dir=self.directory)
+        run.write(records[np.argsort(records[self.dtype.names[0]], kind='stable')].tobytes())
+        run.seek(0)
+        self.runs.append(run)
+        self.buffered = 0
+
+    def read_run(self, run):
+        """Stream the records of a run file as tuples, one block at a time."""
+        with run:
+            while True:
+                data = run.read(MERGE_BLOCK_SIZE * self.dtype.itemsize)
+                if not data:
+                    return
+                yield from np.frombuffer(data, dtype=self.dtype).tolist()
+
+    def merge(self):
+        """
+        Stream all records sorted by their first field. The run files are
+        removed once they are read.
+
+        :return: A generator of record tuples.
+        """
+        if self.buffered:
+            self.write_run()
+        # heapq.merge takes equal keys from earlier runs first, which keeps them stable
+        return heapq.merge(*(self.read_run(run) for run in self.runs), key=itemgetter(0))
+
+
+class ArrayWriter:
+    """
+    Writes a one-dimensional .npy array of a known length value by value,
+    in blocks, through a temporary file so readers never see a partial one.
+    """
+
+    def __init__(self, directory, name, dtype, length):
+        """
+        :param directory: Directory of the array.
+        :param name: Name of the array, without the '.npy' extension.
+        :param dtype: NumPy dtype of the values.
+        :param length: Number of values which will be appended.
+        """
+        self.path = os.path.join(directory, name + '.npy')
+        self.dtype = np.dtype(dtype)
+        self.values = []
+        self.count = 0
+        self.file = tempfile.NamedTemporaryFile(dir=directory, suffix='.npy', delete=False)
+        np.lib.format.write_array_header_1_0(self.file, {
+            'descr': np.lib.format.dtype_to_descr(self.dtype),
+            'fortran_order': False,
+            'shape': (length,),
+        })
+
+    def append(self, value):
+        """Append a value to the array."""
+        self.values.append(value)
+        self.count += 1
+        if len(self.values) == MERGE_BLOCK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Write the appended values to the file."""
+        self.file.write(np.array(self.values, dtype=self.dtype).tobytes())
+        self.values.clear()
+
+    def close(self):
+        """Finish the array and move it to its place in the index."""
+        self.flush()
+        self.file.close()
+        os.replace(self.file.name, self.path)
+
+
+def import_dump(dump_path, property_ids, directory=INDEX_DIRECTORY, run_size=RUN_SIZE):
+    """
+    Build the index of a Wikidata JSON dump in one streaming pass, keeping
+    only the English labels of items and their claims of the given properties.
+
+    The index directory holds:
+      - nodes.npy: sorted item numbers,
+      - labels.bin with label_offsets.npy and label_lengths.npy: UTF-8 labels
+        of the nodes (length 0 for items without an English label),
+      - <property>_offsets.npy and <property>_targets.npy for each property:
+        CSR adjacency, targets[offsets[i]:offsets[i + 1]] are the item numbers
+        the claims of node i point to.
+
+    Labels are written to disk as they are read, and nodes and edges are
+    sorted by item number through sorted runs on disk (SortedRuns) which are
+    merged straight into the arrays of the index, so peak memory stays the
+    same whatever the size of the dump.
+
+    :param dump_path: Path of the 'latest-all.json(.bz2/.gz)' dump.
+    :param property_ids: IDs of the relation properties to keep, e.g. ['P279', 'P31'].
+    :param directory: Directory the index is written to.
+    :param run_size: Number of nodes or edges sorted in memory at once.
+    :return: Number of imported items.
+    """
+    os.makedirs(directory, exist_ok=True)
+    nodes = SortedRuns(NODE_RECORD, directory, run_size)
+    edges = {property_id: SortedRuns(EDGE_RECORD, directory, run_size) for property_id in property_ids}
+
+    labels_path = os.path.join(directory, 'labels.bin')
+    with open(labels_path, 'wb') as labels:
+        for entity in iterate_entities(dump_path):
+            if entity.get('type') != 'item':
+                continue
+            number = entity_number(entity['id'])
+            label = entity.get('labels', {}).get('en', {}).get('value', '').encode('utf-8')
+
+            nodes.add((number, labels.tell(), len(label)))
+            labels.write(label)
+
+            claims = entity.get('claims', {})
+            for property_id in property_ids:
+                for target in get_target_numbers(claims.get(property_id, [])):
+                    edges[property_id].add((number, target))
+
+            if nodes.count % PROGRESS_EVERY == 0:
+                print(f"Imported {nodes.count} items")
+
+    node_array = ArrayWriter(directory, 'nodes', np.int64, nodes.count)
+    label_offsets = ArrayWriter(directory, 'label_offsets', np.int64, nodes.count)
+    label_lengths = ArrayWriter(directory, 'label_lengths', np.int32, nodes.count)
+    adjacency = {}
+    for property_id in property_ids:
+        offsets = ArrayWriter(directory, property_id + '_offsets', np.int64, nodes.count + 1)
+        targets = ArrayWriter(directory, property_id + '_targets', np.int64, edges[property_id].count)
+        offsets.append(0)
+        adjacency[property_id] = (edges[property_id].merge(), offsets, targets)
+
+    # the edges of every property are sorted by their source, so each node
+    # takes the next edges of the merged streams while their source is the node
+    next_edges = {property_id: next(stream, None) for property_id, (stream, _, _) in adjacency.items()}
+    for number, label_offset, label_length in nodes.merge():
+        node_array.append(number)
+        label_offsets.append(label_offset)
+        label_lengths.append(label_length)
+        for property_id, (stream, offsets, targets) in adjacency.items():
+            edge = next_edges[property_id]
+            while edge is not None and edge[0] == number:
+                targets.append(edge[1])
+                edge = next(stream, None)
+            next_edges[property_id] = edge
+            offsets.append(targets.count)
+
+    writers = [node_array, label_offsets, label_lengths]
+    for _, offsets, targets in adjacency.values():
+        writers += [offsets, targets]
+    for writer in writers:
+        writer.close()
+    return nodes.count
+
+
+class WikidataIndex:
+    """
+    Read access to an index built by import_dump(). The arrays and the label
+    table are memory-mapped, so opening the index reads almost nothing and
+    lookups touch only the pages they need.
+    """
+
+    def __init__(self, property_ids, directory=INDEX_DIRECTORY):
+        """
+        :param property_ids: IDs of the relation properties to load.
+        :param directory: Directory of the index.
+        """
+        self.nodes = self.load(directory, 'nodes')
+        self.label_offsets = self.load(directory, 'label_offsets')
+        self.label_lengths = self.load(directory, 'label_lengths')
+        labels_path = os.path.join(directory, 'labels.bin')
+        self.labels = np.memmap(labels_path, dtype=np.uint8, mode='r') \
+            if os.path.getsize(labels_path) else np.zeros(0, dtype=np.uint8)
+        self.adjacency = {property_id: (self.load(directory, property_id + '_offsets'),
+                                        self.load(directory, property_id + '_targets'))
+                          for property_id in property_ids}
+
+    @staticmethod
+    def load(directory, name):
+        """Memory-map one array of the index."""
+        return np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+
+    def node(self, entity_id):
+        """
+        Find the position of an item in the index.
+
+        :param entity_id: The ID of the entity, e.g. 'Q809'.
+        :return: The node index, or None if the dump has no such item.
+        """
+        if not entity_id or entity_id[0] != 'Q' or not entity_id[1:].isdigit():
+            return None
+        number = entity_number(entity_id)
+        node = int(np.searchsorted(self.nodes, number))
+        if node < len(self.nodes) and self.nodes[node] == number:
+            return node
+        return None
+
+    def label(self, entity_id):
+        """
+        Return the English label of an entity.
+
+        :param entity_id: The ID of the entity.
+        :return: The label, or None for unknown entities and entities without one.
+        """
+        node = self.node(entity_id)
+        if node is None or self.label_lengths[node] == 0:
+            return None
+        start = int(self.label_offsets[node])
+        return self.labels[start:start + int(self.label_lengths[node])].tobytes().decode('utf-8')
+
+    def claims(self, entity_id):
+        """
+        Return the relation claims of an entity.
+
+        :param entity_id: The ID of the entity.
+        :return: A dictionary mapping property IDs to lists of entity IDs, in
+                 the same form as wikidata_triples_extract.filter_claims.
+        """
+        node = self.node(entity_id)
+        if node is None:
+            return {}
+        claims = {}
+        for property_id, (offsets, targets) in self.adjacency.items():
+            entity_targets = targets[offsets[node]:offsets[node + 1]]
+            if len(entity_targets):
+                claims[property_id] = ['Q' + str(target) for target in entity_targets.tolist()]
+        return claims
+
+
+def main():
+    """
+    Import the Wikidata JSON dump given as the first argument, keeping the
+    relation properties used by wikidata_triples_extract.py.
+    """
+    from wikidata_triples_extract import RELATION_PROPERTIES
+
+    directory = sys.argv[2] if len(sys.argv) > 2 else INDEX_DIRECTORY
+    count = import_dump(sys.argv[1], [property_id for property_id, _ in RELATION_PROPERTIES], directory)
+    print(f"Imported {count} items into {directory}")
+
+if __name__ == "__main__":
+    main()
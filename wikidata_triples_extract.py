@@ -1,12 +1,18 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from entity_store import EntityStore
+from http_client import MAXLAG, get_client
+from triple_store import save_triples
 
 # CONSTANTS
 API_ENDPOINT = "https://www.wikidata.org/w/api.php"
-PARAMS = {
+# Read-only; every request copies it and adds its own 'props' and 'ids'
+PARAMS = MappingProxyType({
     'action': 'wbgetentities',
     'format': 'json',
-    'languages': 'en'
-}
+    'languages': 'en',
+    'maxlag': MAXLAG
+})
 
 RELATION_PROPERTIES = [
     ('P527','has parts'),                      # aggregation/composition
@@ -34,11 +40,20 @@ ENTITIES_TO_TEST = [
 
 MAX_LEVEL_DEEP = 0
 
+# Maximum number of ids in one wbgetentities request allowed by the API
+MAX_IDS_PER_REQUEST = 50
+MAX_CONCURRENT_REQUESTS = 4
+USE_ENTITY_STORE = True     # keep labels and claims between runs in entity_store.sqlite
+WIKIDATA_INDEX_DIRECTORY = None     # e.g. 'wikidata_index' built by wikidata_dump_index.py, to run offline
+
 # Global variables
 triples_global = []
 visited_entities = set()
 entity_name_cache = {}
-session = requests.Session()
+claims_cache = {}
+entity_store = None
+offline_index = None
+session = get_client()
 
 def recursive_find(data, match):
     """
@@ -54,6 +69,77 @@ def recursive_find(data, match):
         elif isinstance(v, dict):
             return recursive_find(v, match)
 
+def get_claim_entity_id(item):
+    """
+    Returns the ID of the entity a claim points to.
+
+    :param item: A claim of the entity.
+    :return: The entity ID, or None for claims with other kinds of values.
+    """
+    try:
+        return item['mainsnak']['datavalue']['value']['id']
+    except:
+        return None
+
+def request_entities(entity_ids, props):
+    """
+    Sends one wbgetentities request for the given entities. The parameters
+    are built for every request, so requests can run concurrently.
+
+    :param entity_ids: The IDs of the entities, at most MAX_IDS_PER_REQUEST.
+    :param props: The entity data to return, e.g. 'labels' or 'claims'.
+    :return: A dictionary mapping entity IDs to their data.
+    """
+    parameters = dict(PARAMS, props=props, ids='|'.join(entity_ids))
+    response = session.get(url=API_ENDPOINT, params=parameters)
+    return response.json().get('entities', {})
+
+def fetch_entities(entity_ids, props):
+    """
+    Fetches the data of all given entities in requests of up to
+    MAX_IDS_PER_REQUEST ids, with several requests running at the same time.
+
+    :param entity_ids: The IDs of the entities.
+    :param props: The entity data to return, e.g. 'labels' or 'claims'.
+    :return: A dictionary mapping entity IDs to their data.
+    """
+    if not entity_ids:
+        return {}
+    chunks = [entity_ids[i:i + MAX_IDS_PER_REQUEST]
+              for i in range(0, len(entity_ids), MAX_IDS_PER_REQUEST)]
+    entities = {}
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        for result in executor.map(lambda chunk: request_entities(chunk, props), chunks):
+            entities.update(result)
+    return entities
+
+def resolve_labels(entity_ids):
+    """
+    Fetches the names of all given entities which are not yet in the
+    entity_name_cache, with up to MAX_IDS_PER_REQUEST ids per API request.
+
+    :param entity_ids: The IDs of the entities to resolve.
+    """
+    pending = list(dict.fromkeys(
+        entity_id for entity_id in entity_ids
+        if entity_id is not None and entity_id not in entity_name_cache))
+
+    if offline_index is not None:
+        entity_name_cache.update((entity_id, offline_index.label(entity_id)) for entity_id in pending)
+        return
+
+    names = {}
+    for entity_id, entity in fetch_entities(pending, 'labels').items():
+        # entities without an English label are cached as None
+        name = recursive_find(entity, 'value') or None
+        names[entity_id] = name
+        if 'redirects' in entity:
+            names[entity['redirects']['from']] = name
+
+    entity_name_cache.update(names)
+    if entity_store is not None and names:
+        entity_store.store_labels(names)
+
 def convert_id_to_name(entity_id):
     """
     Converts an entity ID to its corresponding name using the Wikidata API.
@@ -61,87 +147,147 @@ def convert_id_to_name(entity_id):
     :param entity_id: The ID of the entity to convert.
     :return: The name of the entity.
     """
-    if entity_id in entity_name_cache:
-        return entity_name_cache[entity_id]
-    
-    parameters = PARAMS
-    parameters['props'] = 'labels'
-    parameters['ids'] =  entity_id
+    resolve_labels([entity_id])
+    return entity_name_cache.get(entity_id)
 
-    response = session.get(url=API_ENDPOINT, params=parameters)
-    name = recursive_find(response.json(), 'value')
+def filter_claims(claims):
+    """
+    Keeps only the claims of RELATION_PROPERTIES pointing to other entities.
+
+    :param claims: The claims data of the entity as returned by the API.
+    :return: A dictionary mapping property IDs to lists of entity IDs.
+    """
+    filtered = {}
+    for property_id, _ in RELATION_PROPERTIES:
+        entity_ids = [get_claim_entity_id(item) for item in claims.get(property_id, [])]
+        entity_ids = [entity_id for entity_id in entity_ids if entity_id is not None]
+        if entity_ids:
+            filtered[property_id] = entity_ids
+    return filtered
 
-    if name:
-        entity_name_cache[entity_id] = name
-    return name
+def get_claims(entity_ids):
+    """
+    Fetches the relation claims of all given entities which are not yet in
+    the claims_cache.
+
+    :param entity_ids: The IDs of the entities.
+    :return: A dictionary mapping entity IDs to their filtered claims.
+    """
+    pending = [entity_id for entity_id in entity_ids if entity_id not in claims_cache]
+    if offline_index is not None:
+        claims_cache.update((entity_id, offline_index.claims(entity_id)) for entity_id in pending)
+        pending = []
+
+    entities = fetch_entities(pending, 'claims')
+    claims = {entity_id: filter_claims(entity.get('claims', {}))
+              for entity_id, entity in entities.items()}
+
+    claims_cache.update(claims)
+    if entity_store is not None and claims:
+        entity_store.store_claims(claims)
+    return {entity_id: claims_cache[entity_id]
+            for entity_id in entity_ids if entity_id in claims_cache}
+
+def open_entity_store(store):
+    """
+    Uses the given store for labels and claims: its fresh entries are loaded
+    into entity_name_cache and claims_cache, and fetched entities are saved in it.
+
+    :param store: An EntityStore.
+    """
+    global entity_store
+    entity_store = store
+    labels, claims = store.preload()
+    entity_name_cache.update(labels)
+    claims_cache.update(claims)
+    print(f"Loaded {len(labels)} labels and {len(claims)} claims from the entity store")
 
 
 def get_entities_of_property(claims, property_id, parent):
     """
     Retrieves entities associated with a given property from the claims.
 
-    :param claims: The claims data for the entity.
+    :param claims: The filtered claims of the entity.
     :param property_id: The property ID to search for.
     :param parent: The ID of the parent entity to avoid recursion.
     :return: A list of tuples containing entity IDs and their labels.
     """
-    if property_id in claims:
-        items = claims[property_id]
-        table_of_entities = []
-
-        for item in items:
-            try:
-                sub_entity_id = item['mainsnak']['datavalue']['value']['id']
-            except:
-                continue
+    table_of_entities = []
+    for sub_entity_id in claims.get(property_id, []):
+        if sub_entity_id == parent:
+            continue
 
-            if sub_entity_id == parent:
-                continue
+        label = entity_name_cache.get(sub_entity_id)
+        if label is not None:
+            table_of_entities.append((sub_entity_id, label))
 
-            label = convert_id_to_name(sub_entity_id)
-            if label is not None:
-                table_of_entities.append((sub_entity_id, label))
+    return table_of_entities
 
-        return table_of_entities
-    else:
-        return []
 
-
-def search_structure_from_top(entity_id, level, parent=''):
+def search_structure_from_top(entity_id, level=0, parent=''):
     """
-    Recursively searches the structure of an entity and extracts relations.
+    Searches the structure of an entity breadth-first and extracts relations.
+    Claims and names of all entities of one level are fetched together.
 
     :param entity_id: The ID of the entity to search.
-    :param level: Current depth level in the recursion.
+    :param level: Depth level of the entity.
     :param parent: ID of the parent entity to avoid cycles.
     """
-    parameters = PARAMS
-    parameters['props'] = 'claims'
-    parameters['ids'] =  entity_id
-    
-    result = session.get(url= API_ENDPOINT, params=parameters)
-    claims = result.json()['entities'][entity_id]['claims']
-    name = convert_id_to_name(entity_id)
-
-    for property_id, relation_label in RELATION_PROPERTIES:
-        tbl_of_entities = get_entities_of_property(claims, property_id, parent)
-        for item in tbl_of_entities:
-            triples_global.append((name, relation_label, item[1]))
-
-            if level < MAX_LEVEL_DEEP and item[1] not in visited_entities:
-                visited_entities.add(item[1])
-                search_structure_from_top(item[0], level+1, entity_id)
-
-
-for entity_id in ENTITIES_TO_TEST:
-    triples_global.clear()
-    visited_entities.clear()
-    
-    print("Tested entity: " + entity_id)
-    search_structure_from_top(entity_id, 0)
-    print("Found triples: " + str(len(triples_global)))
-
-    triples = sorted(triples_global, key=lambda x: (x[0], x[1]))
-    lines = [str(i) + '\n' for i in triples]
-    with open(entity_id + '_triples.txt', 'w', encoding='utf-8') as f:
-        f.writelines(lines)
\ No newline at end of file
+    frontier = [(entity_id, parent)]
+
+    while frontier:
+        frontier_ids = list(dict.fromkeys(current_id for current_id, _ in frontier))
+        claims = get_claims(frontier_ids)
+        resolve_labels(frontier_ids + [
+            sub_entity_id
+            for entity_claims in claims.values()
+            for sub_entity_ids in entity_claims.values()
+            for sub_entity_id in sub_entity_ids
+        ])
+
+        next_frontier = []
+        for current_id, current_parent in frontier:
+            name = entity_name_cache.get(current_id)
+            entity_claims = claims.get(current_id, {})
+
+            for property_id, relation_label in RELATION_PROPERTIES:
+                tbl_of_entities = get_entities_of_property(entity_claims, property_id, current_parent)
+                for item in tbl_of_entities:
+                    triples_global.append((name, relation_label, item[1]))
+
+                    if level < MAX_LEVEL_DEEP and item[1] not in visited_entities:
+                        visited_entities.add(item[1])
+                        next_frontier.append((item[0], current_id))
+
+        frontier = next_frontier
+        level += 1
+
+
+def main():
+    """
+    Extracts triples for every tested entity and saves them to files.
+    """
+    global offline_index
+    if WIKIDATA_INDEX_DIRECTORY is not None:
+        # NumPy is only needed by the offline index
+        from wikidata_dump_index import WikidataIndex
+        offline_index = WikidataIndex([property_id for property_id, _ in RELATION_PROPERTIES],
+                                      WIKIDATA_INDEX_DIRECTORY)
+    elif USE_ENTITY_STORE:
+        open_entity_store(EntityStore())
+
+    for entity_id in ENTITIES_TO_TEST:
+        triples_global.clear()
+        visited_entities.clear()
+
+        print("Tested entity: " + entity_id)
+        search_structure_from_top(entity_id, 0)
+        print("Found triples: " + str(len(triples_global)))
+
+        triples = sorted(triples_global, key=lambda x: (x[0], x[1]))
+        save_triples(entity_id + '_triples.txt', triples)
+
+    session.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import bz2
+import re
+import threading
+import xml.etree.ElementTree as ET
+from bisect import bisect_right
+from functools import lru_cache
+from html import escape, unescape
+from urllib.parse import unquote
+
+# CONSTANTS
+ARTICLE_PATH = "/wiki/"
+PAGES_PER_STREAM = 100
+STREAM_CACHE_SIZE = 32      # decompressed streams kept by each dump fetcher
+
+# Infobox parameters which are not shown as labelled rows of the infobox
+INFOBOX_SKIPPED_PARAMETERS = {
+    'name', 'image', 'image_size', 'imagesize', 'image_alt', 'alt', 'caption',
+    'logo', 'logo_size', 'map', 'map_size', 'map_caption', 'title', 'native_name',
+}
+
+LEAD_END = re.compile(r'^==', re.MULTILINE)
+COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+REFERENCE = re.compile(r'<ref[^>/]*/>|<ref[^>]*>.*?</ref>', re.DOTALL)
+FORMATTING = re.compile(r"'{2,}")
+LINK = re.compile(r'\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]')
+EXTERNAL_LINK = re.compile(r'\[https?://[^\s\]]+ ?([^\]]*)\]')
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+def title_to_link(title):
+    """
+    Convert a page title into its link, e.g. 'polish language' into
+    '/wiki/Polish_language'.
+    """
+    title = title.strip().replace(' ', '_')
+    return ARTICLE_PATH + title[:1].upper() + title[1:]
+
+def link_to_title(url):
+    """
+    Convert a link in format '/wiki/ARTICLE_NAME' into the page title.
+    """
+    title = unquote(url[len(ARTICLE_PATH):].split('#')[0]).replace('_', ' ').strip()
+    return title[:1].upper() + title[1:]
+
+def find_closing(text, start, opening, closing):
+    """
+    Find the end of a balanced construct, e.g. a template '{{...}}'.
+
+    :param text: The wikitext.
+    :param start: Index where the opening sequence begins.
+    :param opening: Opening sequence, e.g. '{{'.
+    :param closing: Closing sequence, e.g. '}}'.
+    :return: Index after the matching closing sequence, or the text length.
+    """
+    depth = 0
+    i = start
+    while i < len(text):
+        if text.startswith(opening, i):
+            depth += 1
+            i += len(opening)
+        elif text.startswith(closing, i):
+            depth -= 1
+            i += len(closing)
+            if depth == 0:
+                return i
+        else:
+            i += 1
+    return len(text)
+
+def remove_balanced(text, opening, closing, prefixes=('',)):
+    """
+    Remove all balanced constructs, e.g. templates, from the wikitext.
+
+    :param text: The wikitext.
+    :param opening: Opening sequence, e.g. '{{'.
+    :param closing: Closing sequence, e.g. '}}'.
+    :param prefixes: Only constructs whose content starts with one of these
+                     prefixes are removed, e.g. 'File:' for '[['.
+    :return: The text without the constructs.
+    """
+    parts = []
+    position = 0
+    start = text.find(opening)
+    while start != -1:
+        if text.startswith(prefixes, start + len(opening)):
+            parts.append(text[position:start])
+            position = find_closing(text, start, opening, closing)
+            start = text.find(opening, position)
+        else:
+            start = text.find(opening, start + len(opening))
+    parts.append(text[position:])
+    return ''.join(parts)
+
+def split_template_parameters(template):
+    """
+    Split the content of a template into its top-level '|' separated parts.
+
+    :param template: The template text without the enclosing braces.
+    :return: A list of parts, the first one being the template name.
+    """
+    parts = []
+    depth = 0
+    current = []
+    i = 0
+    while i < len(template):
+        pair = template[i:i + 2]
+        if pair in ('{{', '[['):
+            depth += 1
+            current.append(pair)
+            i += 2
+        elif pair in ('}}', ']]'):
+            depth -= 1
+            current.append(pair)
+            i += 2
+        else:
+            if template[i] == '|' and depth == 0:
+                parts.append(''.join(current))
+                current = []
+            else:
+                current.append(template[i])
+            i += 1
+    parts.append(''.join(current))
+    return parts
+
+def get_infobox_labels(wikitext):
+    """
+    Return the labels of the rows of the first infobox of the article.
+
+    :param wikitext: The wikitext of the article.
+    :return: A list of labels, e.g. 'Official language' for 'official_language'.
+    """
+    start = wikitext.find('{{Infobox')
+    if start == -1:
+        return []
+    template = wikitext[start + 2:find_closing(wikitext, start, '{{', '}}') - 2]
+
+    labels = []
+    for parameter in split_template_parameters(template)[1:]:
+        name, separator, value = parameter.partition('=')
+        name = name.strip().replace('_', ' ')
+        if not separator or not value.strip() or name.replace(' ', '_') in INFOBOX_SKIPPED_PARAMETERS:
+            continue
+        labels.append(name[:1].upper() + name[1:])
+    return labels
+
+def link_to_html(match):
+    """Render a wikitext link '[[Target|text]]' as an HTML anchor."""
+    target, text = unescape(match.group(1)), match.group(2)
+    title = target.split('#')[0].strip()
+    href = escape(title_to_link(target), quote=True)
+    return f'<a href="{href}" title="{escape(title, quote=True)}">{text or escape(target)}</a>'
+
+def wikitext_to_html(title, wikitext):
+    """
+    Render the parts of an article used for extraction, the title, the lead
+    paragraphs with their links and the infobox labels, as the markup of a
+    Wikipedia page understood by article_parser.parse_article.
+
+    :param title: Title of the article.
+    :param wikitext: The wikitext of the article.
+    :return: The HTML content of the article.
+    """
+    labels = ''.join(f'<tr><th class="infobox-label">{escape(label)}</th></tr>'
+                     for label in get_infobox_labels(wikitext))
+
+    match = LEAD_END.search(wikitext)
+    lead = wikitext[:match.start()] if match else wikitext
+    lead = COMMENT.sub('', lead)
+    lead = REFERENCE.sub('', lead)
+    lead = remove_balanced(lead, '{{', '}}')
+    lead = remove_balanced(lead, '{|', '|}')
+    lead = remove_balanced(lead, '[[', ']]', ('File:', 'Image:', 'Category:'))
+    lead = FORMATTING.sub('', lead)
+    lead = EXTERNAL_LINK.sub(r'\1', lead)
+    lead = LINK.sub(link_to_html, escape(lead, quote=False))
+
+    paragraphs = ''.join(f'<p>{paragraph.strip()}\n</p>'
+                         for paragraph in PARAGRAPH_BREAK.split(lead) if paragraph.strip())
+    return (f'<span class="mw-page-title-main">{escape(title)}</span>'
+            f'<div id="mw-content-text"><table class="infobox">{labels}</table>{paragraphs}</div>')
+
+
+class MultistreamDumpFetcher:
+    """
+    Serves articles from a local bz2 multistream XML dump of Wikipedia.
+
+    The offset index of the dump tells in which bz2 stream (block of about
+    100 pages) a title is stored, so an article is read by decompressing only
+    that stream. It provides the fetch(url, cache) method of the fetchers in
+    article_fetchers.py and can replace them in WikipediaExtractor.
+    """
+
+    name = 'dump'
+
+    def __init__(self, dump_path, index_path):
+        """
+        :param dump_path: Path of the '...-multistream.xml.bz2' dump.
+        :param index_path: Path of its '...-multistream-index.txt(.bz2)' index
+                           with 'offset:page_id:title' lines.
+        """
+        self.offsets = {}
+        open_index = bz2.open if index_path.endswith('.bz2') else open
+        with open_index(index_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                offset, _, title = line.rstrip('\n').split(':', 2)
+                self.offsets[title] = int(offset)
+        self.stream_starts = sorted(set(self.offsets.values()))
+
+        self.dump = open(dump_path, 'rb')
+        self.dump_size = self.dump.seek(0, 2)
+        self.lock = threading.Lock()
+        # a cache of this dump only, released with the fetcher
+        self.read_stream = lru_cache(maxsize=STREAM_CACHE_SIZE)(self.read_stream)
+
+    def read_stream(self, offset):
+        """
+        Decompress the bz2 stream beginning at the given offset.
+
+        :param offset: Offset of the stream in the dump file.
+        :return: A dictionary mapping page titles to (redirect, wikitext) pairs.
+        """
+        next_stream = bisect_right(self.stream_starts, offset)
+        end = self.stream_starts[next_stream] if next_stream < len(self.stream_starts) else self.dump_size
+        with self.lock:
+            self.dump.seek(offset)
+            data = self.dump.read(end - offset)
+
+        pages = {}
+        # the decompressor stops at the end of the first stream
+        xml = bz2.BZ2Decompressor().decompress(data).decode('utf-8')
+        root = ET.fromstring('<pages>' + xml + '</pages>')
+        for page in root.iter('page'):
+            redirect = page.find('redirect')
+            text = page.find('revision/text')
+            pages[page.findtext('title')] = (
+                redirect.get('title') if redirect is not None else None,
+                (text.text or '') if text is not None else '')
+        return pages
+
+    def get_page(self, title):
+        """
+        Return the wikitext of a page, following a redirect.
+
+        :param title: Title of the page.
+        :return: A tuple (title, wikitext) or None if the dump has no such page.
+        """
+        for _ in range(2):
+            if title not in self.offsets:
+                return None
+            redirect, wikitext = self.read_stream(self.offsets[title]).get(title, (None, None))
+            if wikitext is None:
+                return None
+            if redirect is None:
+                return title, wikitext
+            title = redirect
+        return None
+
+    def fetch(self, url, cache=None):
+        """
+        Read the article from the dump.
+
+        :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+        :param cache: Unused, the dump is already local.
+        :return: The HTML content of the article, or empty text if the dump
+                 has no such article.
+        """
+        if not url.startswith(ARTICLE_PATH):
+            return ''
+        page = self.get_page(link_to_title(url))
+        if page is None:
+            return ''
+        return wikitext_to_html(*page)
+
+
+def write_multistream_dump(pages, dump_path, index_path, pages_per_stream=PAGES_PER_STREAM):
+    """
+    Write pages as a multistream dump with its index, e.g. to build a small
+    dump from recorded articles for offline runs and benchmarks.
+
+    :param pages: A list of (title, wikitext) or (title, wikitext, redirect) tuples.
+    :param dump_path: Path of the written '.xml.bz2' dump.
+    :param index_path: Path of the written index, bz2-compressed if it ends with '.bz2'.
+    :param pages_per_stream: Number of pages compressed into one bz2 stream.
+    """
+    index_lines = []
+    with open(dump_path, 'wb') as dump:
+        dump.write(bz2.compress(b'<mediawiki>\n'))
+        for first in range(0, len(pages), pages_per_stream):
+            offset = dump.tell()
+            stream = []
+            for page_id, page in enumerate(pages[first:first + pages_per_stream], first + 1):
+                title, wikitext = page[0], page[1]
+                redirect = f'<redirect title="{escape(page[2])}" />' if len(page) > 2 and page[2] else ''
+                stream.append(f'<page><title>{escape(title)}</title><id>{page_id}</id>{redirect}'
+                              f'<revision><text>{escape(wikitext)}</text></revision></page>\n')
+                index_lines.append(f'{offset}:{page_id}:{title}\n')
+            dump.write(bz2.compress(''.join(stream).encode('utf-8')))
+        dump.write(bz2.compress(b'</mediawiki>\n'))
+
+    open_index = bz2.open if index_path.endswith('.bz2') else open
+    with open_index(index_path, 'wt', encoding='utf-8') as f:
+        f.writelines(index_lines)
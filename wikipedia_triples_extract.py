@@ -1,47 +1,52 @@
-import requests
-import spacy
 import time
-import re
-from bs4 import BeautifulSoup
-
-# Regular expressions for various patterns in the article content
-BEFORE_LINK =  re.compile("((?:[a-zA-Z]+ ){1,3})<a")
-AFTER_LINK = re.compile("a>((?: [a-zA-Z]+){1,3})")
-LINK_A = re.compile("<a[^>]*[^>]*>[^~]*?</a>")
-LINK_TEXT = re.compile("<a[^>]*[^>]*>([^~]*?)</a>")
-LINK_TITLE = re.compile(' title="([^~]*?)">')
-LINK_HREF = re.compile('href=\"(/.*)?\" ')
-SPAN = re.compile("<span[^>]*[^>]*>[^~]*?</span>")
-SUP = re.compile("<sup[^>]*[^>]*>[^~]*?</sup>")
-P_TAG = re.compile("<p>(.*)")
-SENTENCE_UNTIL_PERIOD = re.compile(".*?\.[ ]")
-
-INFOBOX_BEGIN_PATTERN = '<table class="infobox"'
-INFOBOX_END_PATTERN = '</table>'
-
-HEADER_CONTENT_BEGIN_PATTERN = '<div id="mw-content-text"'
-HEADER_CONTENT_END_PATTERN = '<div class="mw-heading mw-heading2'
-
-ARTICLE_TITLE_PATTERN = re.compile('<span class="mw-page-title-main">([^~]*?)</span>')
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from spacy.matcher import PhraseMatcher
+from article_cache import ArticleCache, CacheMiss
+from article_fetchers import FullPageFetcher, LeadSectionFetcher
+from article_parser import parse_article
+from http_client import get_client
+from spacy_models import DEFAULT_MODEL, disabled_components, get_model
+from triple_store import save_triples
+from wikipedia_dump import MultistreamDumpFetcher
+
+# Handler of a relation phrase; offsets are counted in tokens from the
+# beginning of the phrase matched in the sentence
+RelationHandler = namedtuple('RelationHandler', [
+    'relation',             # name of the extracted relation
+    'subject_head',         # offset of the token the subject depends on
+    'subject_dep',          # dependency label of the subject
+    'object_head',          # offset of the token the object depends on
+    'object_dep',           # dependency label of the object
+    'pronoun_subject',      # whether a pronoun subject refers to the article
+    'requires_auxiliary',   # whether the subject head has to be an auxiliary verb
+])
 
 # Phrases used to match specific relationships in sentences
-PHRASES_TO_MATCH = [
+PHRASES_TO_MATCH = {
     # inheritance
-    " is a ", " is an "," is the ",
-    " refer to ", " refers to ",
+    "is a": RelationHandler('is a', 0, 'nsubj', 0, 'attr', False, True),
+    "is an": RelationHandler('is a', 0, 'nsubj', 0, 'attr', False, True),
+    "is the": RelationHandler('is a', 0, 'nsubj', 0, 'attr', False, True),
+    "refer to": RelationHandler('is a', 0, 'nsubj', 1, 'pobj', True, False),
+    "refers to": RelationHandler('is a', 0, 'nsubj', 1, 'pobj', True, False),
 
     # aggregations
-    " consists of ",
-    " include ", " includes ",
-    " has a ",  " have a ",
-    " is composed of ",
-    " made up of ",
-    " made of ",
-    " is part of ",
+    "consists of": RelationHandler('consist of', 0, 'nsubj', 1, 'pobj', True, False),
+    "include": RelationHandler('include', 0, 'nsubj', 0, 'dobj', True, False),
+    "includes": RelationHandler('include', 0, 'nsubj', 0, 'dobj', True, False),
+    "has a": RelationHandler('have', 0, 'nsubj', 0, 'dobj', True, False),
+    "have a": RelationHandler('have', 0, 'nsubj', 0, 'dobj', True, False),
+    # 'composed' and 'part' are the verbs of the following phrases
+    "is composed of": RelationHandler('is composed of', 1, 'nsubjpass', 2, 'pobj', True, False),
+    "made up of": RelationHandler('made up of', 0, 'nsubjpass', 2, 'pobj', True, False),
+    "made of": RelationHandler('made of', 0, 'nsubjpass', 1, 'pobj', True, False),
+    "is part of": RelationHandler('part of', 0, 'nsubj', 2, 'pobj', True, False),
 
     # associations
-    " uses ",
-]
+    "uses": RelationHandler('use', 0, 'nsubj', 0, 'dobj', True, False),
+}
 
 # Links to be tested
 TESTED_LINKS = [
@@ -55,12 +60,70 @@ TESTED_LINKS = [
     '/wiki/Planet'
     ]
 
+# Number of articles fetched at the same time in the concurrent crawl mode
+MAX_CONCURRENT_FETCHES = 8
+
+# If True, articles are served only from the on-disk article cache
+OFFLINE_MODE = False
+
+# If True, only the lead section with the infobox is downloaded instead of the full page
+LEAD_SECTION_ONLY = False
+
+# Local multistream dump and its index to read the articles from instead of
+# Wikipedia, e.g. 'enwiki-latest-pages-articles-multistream.xml.bz2'
+DUMP_PATH = None
+DUMP_INDEX_PATH = None
+
+class SentenceContext:
+    """
+    Lookups over a parsed sentence and its links, computed once per sentence
+    and shared by all phrase handlers and get_full_class_name() calls on it.
+    """
+
+    def __init__(self, doc, links_texts, links_titles):
+        """
+        :param doc: The SpaCy Doc of the sentence.
+        :param links_texts: List of text from links found in the sentence.
+        :param links_titles: List of titles corresponding to the links.
+        """
+        self.token_counts = Counter(token.text for token in doc)
+        self.link_counts = Counter(links_texts)
+        self.link_titles = {}
+        for text, title in zip(links_texts, links_titles):
+            self.link_titles.setdefault(text, title)
+        self.matching_links = {}
+        self.token_lefts = {}
+        self.class_names = {}
+
+    def find_link(self, text):
+        """
+        Find the only link of the sentence containing the given text.
+
+        :param text: Text searched for in the link texts.
+        :return: The link text, or None if no link or more than one link contains it.
+        """
+        if text not in self.matching_links:
+            matches = [link for link in self.link_counts if text in link]
+            if len(matches) == 1 and self.link_counts[matches[0]] == 1:
+                self.matching_links[text] = matches[0]
+            else:
+                self.matching_links[text] = None
+        return self.matching_links[text]
+
+    def lefts(self, token):
+        """Return the list of the token's left children."""
+        if token.i not in self.token_lefts:
+            self.token_lefts[token.i] = list(token.lefts)
+        return self.token_lefts[token.i]
+
+
 class WikipediaExtractor:
     """A class to extract triples from Wikipedia articles."""
 
     URL_BASE = "https://en.wikipedia.org"
 
-    def __init__(self, max_depth_level=1, max_sentences_from_paragraph=7):
+    def __init__(self, max_depth_level=1, max_sentences_from_paragraph=7, cache=None,
+                 batch_size=32, n_process=1, model_name=DEFAULT_MODEL, fetcher=None):
         """
         Initialize the WikipediaExtractor with parameters for depth level 
         and number of sentences to process.
@@ -68,119 +131,135 @@ class WikipediaExtractor:
         :param max_depth_level: Maximum depth level for recursion.
         :param max_sentences_from_paragraph: Maximum number of sentences 
                                               to extract from each paragraph.
+        :param cache: Optional ArticleCache serving previously fetched articles.
+        :param batch_size: Number of sentences parsed together by nlp.pipe.
+        :param n_process: Number of processes used by nlp.pipe.
+        :param model_name: Name of the SpaCy model, shared by all extractors.
+        :param fetcher: Fetcher of the articles' HTML, by default FullPageFetcher.
         """
         self.triples = set()
         self.visited_articles = set()
-        self.session = requests.Session()
-        self.nlp = spacy.load("en_core_web_trf")
+        self.loaded_articles = {}
+        self.missing_articles = set()
+        self.session = get_client()
+        self.model_name = model_name
         self.max_depth_level = max_depth_level
         self.max_sentences_from_paragraph = max_sentences_from_paragraph
+        self.cache = cache
+        self.fetcher = fetcher or FullPageFetcher(self.session, self.URL_BASE)
+        self.sentence_queue = []
+        self.batch_size = batch_size
+        self.n_process = n_process
+
+    @property
+    def nlp(self):
+        """The SpaCy model shared by the whole process, loaded on first use."""
+        return get_model(self.model_name)
+
+    @cached_property
+    def phrase_matcher(self):
+        """
+        All relation phrases compiled into one matcher, which finds every
+        occurrence of every phrase in a sentence in a single pass over its tokens.
+        """
+        matcher = PhraseMatcher(self.nlp.vocab)
+        for phrase in PHRASES_TO_MATCH:
+            matcher.add(phrase, [self.nlp.make_doc(phrase)])
+        return matcher
 
     def get_article(self, url):
-        """Fetch the article text from Wikipedia given its URL."""
-        return self.session.get(self.URL_BASE + url).text
+        """
+        Fetch the article text from Wikipedia given its URL. In offline mode
+        an article missing from the cache is reported and skipped, so that
+        it is not mistaken for an empty article.
+        """
+        try:
+            return self.fetcher.fetch(url, self.cache)
+        except CacheMiss:
+            self.missing_articles.add(url)
+            print(f"Warning: {url} is not in the article cache, skipped")
+            return ''
 
-    def trim_first_paragraph_and_extract_infobox(self, text):
+    def load_article(self, url):
         """
-        Extract the first paragraph and infobox content from the article text.
+        Fetch the article and parse the parts used for extraction.
+        Articles already fetched by the concurrent crawl are served from memory.
 
-        :param text: The HTML content of the article.
-        :return: A tuple containing the first paragraph and the infobox content.
+        :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+        :return: ParsedArticle or None if the page has no article title.
         """
-        content = text[text.find(HEADER_CONTENT_BEGIN_PATTERN):text.find(HEADER_CONTENT_END_PATTERN)]
-        content = " ".join(re.findall(P_TAG, content))
-        content = re.sub(SPAN, '', content)
-        content = re.sub(SUP, '', content)
+        if url in self.loaded_articles:
+            return self.loaded_articles[url]
 
-        infobox = text[text.find(INFOBOX_BEGIN_PATTERN) : text.find(INFOBOX_END_PATTERN)]
+        article = parse_article(self.get_article(url))
+        if article.title is None:
+            return None
+        return article
 
-        return content, infobox
-        
-    def get_links(self, text):
+    def get_links(self, article):
         """
-        Extract links from the article text.
+        Extract links from the first paragraph of the article.
 
-        :param text: The HTML content of the article.
-        :return: A list of links found in the article.
+        :param article: ParsedArticle of the article.
+        :return: A list of links found in the first paragraph.
         """
-        links = re.findall(LINK_A, text)
-        result = []
-        for link in links:
-            url = re.findall(LINK_HREF, link)
-            if len(url) > 0:
-                result.append(url[0].split('"')[0])
-        return result
+        return article.get_hrefs()
 
-    def get_triples_from_infobox(self, infobox_content, article_name):
+    def get_triples_from_infobox(self, article):
         """
-        Extract triples from the infobox content of the article.
+        Extract triples from the infobox labels of the article.
 
-        :param infobox_content: The HTML content of the infobox.
-        :param article_name: The title of the article for context.
+        :param article: ParsedArticle of the article.
+        :return: The set of triples found in the infobox.
         """
-        infobox_content = re.sub(SUP, '', infobox_content)
-        soup = BeautifulSoup(infobox_content, 'html.parser')
-        infobox = soup.find('table', class_='infobox')
+        triples = {(article.title.lower(), 'has properties', label)
+                   for label in article.infobox_labels}
+        self.triples.update(triples)
+        return triples
 
-        for row in infobox.find_all('tr'):
-            label_cell = row.find('th', class_='infobox-label')
-            # skipping sub-properties with •, as they were raising exception
-            if label_cell and not '•' in label_cell.get_text():
-                self.triples.add(
-                    (article_name.lower(), 'has properties', label_cell.get_text().strip()))
-
-    def get_full_class_name(self, value, links_text, links_titles):
+    def get_full_class_name(self, value, sentence_context):
         """
         Determine the full class name based on dependency parsing.
 
         :param value: The SpaCy token representing a potential class.
-        :param links_text: List of text from links found in the sentence.
-        :param links_titles: List of titles corresponding to the links.
+        :param sentence_context: SentenceContext of the sentence with the token.
         :return: A list containing the full class name and any additional connections.
         """
+        if value.i in sentence_context.class_names:
+            return sentence_context.class_names[value.i]
+
         class_name = value.text
         context = []
         other_conenctions = []
-        sentence_links = links_text        
+        lefts = sentence_context.lefts(value)
 
         link_class_name = None
         children_deps = [child.dep_ for child in value.children]
         if 'compund' in children_deps or 'amod' in children_deps:
-            if len(list(value.lefts)) > 0:
-                class_name = list(value.lefts)[-1].text+" "+class_name
-                match_ctr = 0
-                for link in sentence_links:
-                    if class_name in link:
-                        if match_ctr == 0:
-                            link_class_name = link
-                        else:
-                            link_class_name = None
-                        match_ctr += 1
+            if len(lefts) > 0:
+                class_name = lefts[-1].text+" "+class_name
+                link_class_name = sentence_context.find_link(class_name)
         if link_class_name is None:
             class_name = value.text
-            if [t.text for t in value.doc].count(class_name)<2:
-                match_ctr = 0                
-                for link in sentence_links:
-                    if class_name in link:
-                        if match_ctr == 0:
-                            link_class_name = link
-                        else:
-                            link_class_name = None
-                        match_ctr += 1
+            if sentence_context.token_counts[class_name] < 2:
+                link_class_name = sentence_context.find_link(class_name)
             if link_class_name is None:
                 if value.pos_ != 'NOUN':
+                    sentence_context.class_names[value.i] = ['']
                     return ['']
-                
+
                 for child in value.children:
                     if child.text == 'of':
+                        sentence_context.class_names[value.i] = ['']
                         return ['']
                     if (child.dep_ == 'compound' or child.dep_ == 'amod') \
-                       and child in value.lefts:
+                       and child.i < value.i:
                         class_name = child.text +' '+ class_name
                         context.append(child.text)
 
                 if len(context) > 1:
-                    context = sorted(context, key=lambda x: [v.text for v in value.lefts].index(x), reverse=True)
+                    lefts_texts = [v.text for v in lefts]
+                    context = sorted(context, key=lambda x: lefts_texts.index(x), reverse=True)
                     class_name = value.text
                     for v in context[:-1]:
                         if v[:-1] == '-':
@@ -188,197 +267,121 @@ class WikipediaExtractor:
                         else:
                             class_name = v + ' ' + class_name
         if link_class_name is not None:
-            class_name = links_titles[links_text.index(link_class_name)]
+            class_name = sentence_context.link_titles[link_class_name]
         for child in value.children:
             if child.dep_ == 'conj':
-                other_conenctions += self.get_full_class_name(
-                    child, 
-                    links_text, 
-                    links_titles)
+                other_conenctions += self.get_full_class_name(child, sentence_context)
+
+        sentence_context.class_names[value.i] = [class_name] + other_conenctions
+        return sentence_context.class_names[value.i]
+
+    def queue_sentences(self, article, key=None):
+        """
+        Queue the first sentences of the article, together with the links they
+        contain, for batched parsing in process_sentence_queue().
+
+        :param article: ParsedArticle of the article.
+        :param key: Optional key under which process_sentence_queue() returns
+                    the triples found in these sentences.
+        """
+        for start, end in article.sentences[:self.max_sentences_from_paragraph]:
+            links = article.sentence_links(start, end)
+            links_texts = [link.text for link in links]
+            links_titles = [link.title for link in links]
 
-        return [class_name] + other_conenctions
+            self.sentence_queue.append(
+                (article.lead_text[start:end], (article.title, links_texts, links_titles, key)))
 
+    def process_sentence_queue(self):
+        """
+        Parse all queued sentences in batches with nlp.pipe and extract triples
+        from each of them in the context of the article it comes from.
 
-    def get_triples(self, content, article_name):
+        :return: A dictionary mapping the keys the sentences were queued with
+                 to the triples found in them.
+        """
+        triples_by_key = {}
+        docs = self.nlp.pipe(self.sentence_queue, as_tuples=True,
+                             batch_size=self.batch_size, n_process=self.n_process,
+                             disable=disabled_components(self.nlp, 'extraction'))
+        for doc, (article_name, links_texts, links_titles, key) in docs:
+            triples = self.get_triples_from_doc(doc, article_name, links_texts, links_titles)
+            self.triples.update(triples)
+            triples_by_key.setdefault(key, set()).update(triples)
+        self.sentence_queue.clear()
+        return triples_by_key
+
+    def get_triples(self, article):
         """
         Extract triples from the article content based on predefined phrases.
 
-        :param content: The content of the article to analyze.
-        :param article_name: The title of the article for context.
+        :param article: ParsedArticle of the article to analyze.
         """
-        sentences = re.findall(SENTENCE_UNTIL_PERIOD, content)
+        self.queue_sentences(article)
+        self.process_sentence_queue()
 
-        for sentence_raw in sentences[:self.max_sentences_from_paragraph]:
-            try:
-                soup = BeautifulSoup(sentence_raw, "html.parser")
-                sentence_text = soup.get_text()
-            except:
-                print(sentence_raw)
-                continue
+    def get_triples_from_doc(self, doc, article_name, links_texts, links_titles):
+        """
+        Extract triples from a parsed sentence based on predefined phrases.
 
-            doc = self.nlp(sentence_text)
-            tokens = [token.text for token in doc]
+        :param doc: The SpaCy Doc of the sentence.
+        :param article_name: The title of the article the sentence comes from.
+        :param links_texts: List of text from links found in the sentence.
+        :param links_titles: List of titles corresponding to the links.
+        :return: The set of triples found in the sentence.
+        """
+        triples = set()
+        sentence_context = None
+        for match_id, start, _ in self.phrase_matcher(doc):
+            handler = PHRASES_TO_MATCH[self.nlp.vocab.strings[match_id]]
+            subject_head = doc[start + handler.subject_head]
+            if handler.requires_auxiliary and subject_head.pos_ != 'AUX':
+                continue
 
-            links_texts = [a.get_text() for a in soup.find_all('a')]
-            links_titles = [a.get('title') if a.get('title') else a.get_text() for a in soup.find_all('a')]
+            if sentence_context is None:
+                sentence_context = SentenceContext(doc, links_texts, links_titles)
+
+            first_noun = ''
+            second_noun = []
+            for child in subject_head.children:
+                if child.dep_ == handler.subject_dep:
+                    if child.pos_ in ('NOUN', 'PROPN'):
+                        first_noun = self.get_full_class_name(child, sentence_context)[0]
+                    if child.pos_ == 'PRON' and handler.pronoun_subject:
+                        first_noun = article_name
+            for child in doc[start + handler.object_head].children:
+                if child.dep_ == handler.object_dep and child.pos_ in ('NOUN', 'PROPN'):
+                    second_noun = self.get_full_class_name(child, sentence_context)
+
+            if first_noun != '' and len(second_noun) > 0:
+                for noun in second_noun:
+                    if noun != '':
+                        triples.add((first_noun.lower(), handler.relation, noun.lower()))
+
+        return triples
+
+    def traverse(self, url, depth_level=0):
+        """
+        Recursively visit the article and the articles linked from its first
+        paragraph until reaching the maximum depth level.
 
+        :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+        :param depth_level: Current depth level of recursion (default is set to 0).
+        :return: Generator of (url, ParsedArticle) pairs in the order of visiting.
+        """
+        article = self.load_article(url)
+        if article is None:
+            return
 
-            for phrase in PHRASES_TO_MATCH:
-                sentence_copy = sentence_text
-                relation = ''
-                first_noun = ''
-                second_noun = []
-                if phrase in sentence_copy:
-                    try:
-                        index_of_phrase_base = tokens.index(phrase.split(" ")[1])
-                    except ValueError:
-                        print(sentence_copy)
-                        continue
+        yield url, article
 
-                    match phrase:
-                        case " is a " | " is an " | " is the " | " are the ":
-                            if doc[index_of_phrase_base].pos_ == 'AUX':
-                                relation = 'is a'
-                                for child in doc[index_of_phrase_base].children:
-                                    
-                                    if child.dep_ == 'nsubj':
-                                        if child.pos_ in ('NOUN', 'PROPN'):
-                                            first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.dep_ == 'attr':                                        
-                                        if child.pos_ in ('NOUN', 'PROPN'):
-                                            second_noun = self.get_full_class_name(child, links_texts, links_titles)
-                                    
-                        case " refer to " | " refers to ":                            
-                            relation = 'is a'
-                            for child in doc[index_of_phrase_base].children:
-                                if child.dep_ == 'nsubj':
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.pos_ in 'PRON':
-                                        first_noun = article_name
-                            for child in doc[index_of_phrase_base+1].children:            
-                                if child.dep_ == 'pobj':                                        
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        second_noun = self.get_full_class_name(child, links_texts, links_titles)
-
-                        case " consists of ":
-                            relation = 'consist of'
-                            for child in doc[index_of_phrase_base].children:
-                                if child.dep_ == 'nsubj':
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.pos_ in 'PRON':
-                                        first_noun = article_name
-                            for child in doc[index_of_phrase_base+1].children:            
-                                if child.dep_ == 'pobj':                                        
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        second_noun = self.get_full_class_name(child, links_texts, links_titles)
-
-                        case " include " | " includes ":
-                            relation = 'include'
-                            for child in doc[index_of_phrase_base].children:
-                                if child.dep_ == 'nsubj':
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.pos_ in 'PRON':
-                                        first_noun = article_name
-                            for child in doc[index_of_phrase_base].children:            
-                                if child.dep_ == 'dobj':                                        
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        second_noun = self.get_full_class_name(child, links_texts, links_titles)
-                        case " has a " | " have a ":
-                            relation = 'have'
-                            for child in doc[index_of_phrase_base].children:
-                                if child.dep_ == 'nsubj':
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.pos_ in 'PRON':
-                                        first_noun = article_name
-                            for child in doc[index_of_phrase_base].children:            
-                                if child.dep_ == 'dobj':                                        
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        second_noun = self.get_full_class_name(child, links_texts, links_titles)
-                        case " is composed of ":                            
-                            # SPECIAL CASE where 'composed' is better word to find index
-                            try:
-                                index_of_phrase_base = tokens.index(phrase.split(" ")[2])
-                            except ValueError:
-                                print(sentence_copy)
-                                continue
-                            relation = 'is composed of'
-                            for child in doc[index_of_phrase_base].children:
-                                if child.dep_ == 'nsubjpass':
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.pos_ in 'PRON':
-                                        first_noun = article_name
-                            for child in doc[index_of_phrase_base+1].children:            
-                                if child.dep_ == 'pobj':                                        
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        second_noun = self.get_full_class_name(child, links_texts, links_titles)
-                        case " made up of ":
-                            relation = 'made up of'
-                            for child in doc[index_of_phrase_base].children:
-                                if child.dep_ == 'nsubjpass':
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.pos_ in 'PRON':
-                                        first_noun = article_name
-                            for child in doc[index_of_phrase_base+2].children:            
-                                if child.dep_ == 'pobj':                                        
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        second_noun = self.get_full_class_name(child, links_texts, links_titles)
-                        case " made of ":
-                            relation = 'made of'
-                            for child in doc[index_of_phrase_base].children:
-                                if child.dep_ == 'nsubjpass':
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.pos_ in 'PRON':
-                                        first_noun = article_name
-                            for child in doc[index_of_phrase_base+1].children:            
-                                if child.dep_ == 'pobj':                                        
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        second_noun = self.get_full_class_name(child, links_texts, links_titles)
-                        case " is part of ":
-                            # SPECIAL CASE where 'part' is better word to find index
-                            try:
-                                index_of_phrase_base = tokens.index(phrase.split(" ")[2])
-                            except ValueError:
-                                print(sentence_copy)
-                                continue
-
-                            relation = 'part of'
-                            for child in doc[index_of_phrase_base-1].children:
-                                if child.dep_ == 'nsubj':
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.pos_ in 'PRON':
-                                        first_noun = article_name
-                            for child in doc[index_of_phrase_base+1].children:            
-                                if child.dep_ == 'pobj':                                        
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        second_noun = self.get_full_class_name(child, links_texts, links_titles)
-                        case " uses ":
-                            relation = 'use'
-                            for child in doc[index_of_phrase_base].children:
-                                if child.dep_ == 'nsubj':
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        first_noun = self.get_full_class_name(child, links_texts, links_titles)[0]
-                                    if child.pos_ in 'PRON':
-                                        first_noun = article_name
-                            for child in doc[index_of_phrase_base].children:            
-                                if child.dep_ == 'dobj':                                        
-                                    if child.pos_ in ('NOUN', 'PROPN'):
-                                        second_noun = self.get_full_class_name(child, links_texts, links_titles)
-                        case default:
-                            print('Phrase detected, but handler not implemented.')
-
-                    if first_noun != '' and len(second_noun) > 0 :
-                        for noun in second_noun:
-                            if noun != '':
-                                self.triples.add((first_noun.lower(), relation, noun.lower()))
+        if depth_level < self.max_depth_level:
+            links = self.get_links(article)
 
+            for link in links:
+                if link not in self.visited_articles:
+                    self.visited_articles.add(link)
+                    yield from self.traverse(link, depth_level + 1)
 
     def extract(self, url, depth_level=0):
         """
@@ -389,46 +392,93 @@ class WikipediaExtractor:
         :param depth_level: Current depth level of recursion (default is set to 0).
         :return: None; triples are saved to the class's triples set.
         """
-        article_content = self.get_article(url)
-        try:
-            article_name = re.findall(ARTICLE_TITLE_PATTERN, article_content)[0]
-        except IndexError:
-            return
+        for _, article in self.traverse(url, depth_level):
+            self.get_triples_from_infobox(article)
+            self.queue_sentences(article)
 
-        first_paragraph, infobox = self.trim_first_paragraph_and_extract_infobox(article_content)
+        self.process_sentence_queue()
 
-        if len(infobox) > 0:
-            self.get_triples_from_infobox(infobox, article_name)
+    def prefetch_articles(self, url, max_workers=MAX_CONCURRENT_FETCHES):
+        """
+        Fetch all articles reachable from the given one within the maximum depth
+        level, level by level, with several requests running at the same time.
+        Fetched articles are kept in memory for the following extraction.
 
-        self.get_triples(first_paragraph, article_name)
+        :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+        :param max_workers: Number of articles fetched concurrently.
+        """
+        frontier = [url]
+        seen = self.visited_articles | {url}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for depth_level in range(self.max_depth_level + 1):
+                next_frontier = []
+                for link, article in zip(frontier, executor.map(self.load_article, frontier)):
+                    self.loaded_articles[link] = article
+                    if article is None or depth_level == self.max_depth_level:
+                        continue
+                    for next_link in self.get_links(article):
+                        if next_link not in seen:
+                            seen.add(next_link)
+                            next_frontier.append(next_link)
+                frontier = next_frontier
 
-        if depth_level < self.max_depth_level:
-            links = self.get_links(first_paragraph)
+    def extract_concurrent(self, url, max_workers=MAX_CONCURRENT_FETCHES):
+        """
+        Crawl mode of extract() that first fetches the articles level by level
+        with concurrent requests and only then runs the parsing on them. Every
+        article visited by the recursive traversal is reachable within the
+        maximum depth level, so the triples are the same as from extract().
 
-            for link in links:
-                if link not in self.visited_articles:
-                    self.visited_articles.add(link)
-                    self.extract(link, depth_level + 1)
+        :param url: Link ending for Wikipedia article in format '/wiki/ARTICLE_NAME'
+        :param max_workers: Number of articles fetched concurrently.
+        :return: None; triples are saved to the class's triples set.
+        """
+        self.prefetch_articles(url, max_workers)
+        try:
+            self.extract(url)
+        finally:
+            self.loaded_articles.clear()
 
 
     def save_triples_to_file(self, filename):
         """
-        Save all the extracted triples to a file in sorted order.
+        Save all the extracted triples in sorted order to the triple store
+        (and, with triple_store.EXPORT_TEXT_FILES, to a text file).
 
-        :param filename: The filename to which the triples will be saved.
+        :param filename: The filename to which the triples will be saved,
+                         also the name of the dataset in the triple store.
         :return: None
         """
-        self.triples = sorted(self.triples, key=lambda x: (x[0], x[1]))
-        lines = [str(i) + '\n' for i in self.triples]
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
-
-# Run extraction for tested links and measure execution time
-for tested_link in TESTED_LINKS:
-    start_time = time.time()
-    we = WikipediaExtractor(max_depth_level=2)
-    we.extract(tested_link)
-    end_time = time.time()
-    print(f'\rRun finished for {tested_link}, execution time: {end_time - start_time}')
+        self.triples = sorted(self.triples)
+        save_triples(filename, self.triples)
+
+def create_fetcher():
+    """
+    Create the fetcher of articles selected by the configuration.
+
+    :return: MultistreamDumpFetcher if DUMP_PATH is set, otherwise
+             LeadSectionFetcher or FullPageFetcher.
+    """
+    if DUMP_PATH is not None:
+        return MultistreamDumpFetcher(DUMP_PATH, DUMP_INDEX_PATH)
+    if LEAD_SECTION_ONLY:
+        return LeadSectionFetcher(get_client())
+    return FullPageFetcher(get_client())
+
+if __name__ == "__main__":
+    # Run extraction for tested links and measure execution time
+    article_cache = ArticleCache(offline=OFFLINE_MODE)
+    fetcher = create_fetcher()
+    for tested_link in TESTED_LINKS:
+        start_time = time.time()
+        we = WikipediaExtractor(max_depth_level=2, cache=article_cache, fetcher=fetcher)
+        we.extract_concurrent(tested_link)
+        end_time = time.time()
+        print(f'\rRun finished for {tested_link}, execution time: {end_time - start_time}')
+        if we.missing_articles:
+            print(f'{len(we.missing_articles)} articles were not in the article cache')
+
+        we.save_triples_to_file(tested_link.split('/')[2]+'_triples_from_wikipedia.txt')
+    get_client().report()
 
-    we.save_triples_to_file(tested_link.split('/')[2]+'_triples_from_wikipedia.txt')
@@ -1,6 +1,8 @@
-import requests
 import re
 import json
+from article_cache import ArticleCache, CacheMiss
+from article_fetchers import FullPageFetcher
+from http_client import get_client
 
 # Base Wikipedia URL
 URL_BASE = "https://en.wikipedia.org"
@@ -18,9 +20,12 @@ P_TAG = "<p>(.*)"
 
 # Configuration
 DEPTH_LEVEL = 2
+OFFLINE_MODE = False    # serve articles only from the on-disk article cache
 
 # Global variables
-session = requests.Session()
+session = get_client()
+article_cache = None       # created by main()
+fetcher = FullPageFetcher(session, URL_BASE)
 visited_links = set()
 histogram = {}
 
@@ -69,8 +74,11 @@ def search_in_depth(url, level=0):
     :param url: Wikipedia article URL (relative path)
     :param level: Current depth level of recursive exploration
     """
-    r = session.get(URL_BASE + url)
-    content = trim_content(r.text)
+    try:
+        content = trim_content(fetcher.fetch(url, article_cache))
+    except CacheMiss:
+        print(f"\nWarning: {url} is not in the article cache, skipped")
+        return
     
     words = get_words(content)
     for word in words:
@@ -93,6 +101,8 @@ def main():
     """
     Main function to initialize the process, search articles, and save result.
     """
+    global article_cache
+    article_cache = ArticleCache(offline=OFFLINE_MODE)
     TESTED_LINKS = [
         '/wiki/Polish_language',
         '/wiki/Computer',
@@ -111,6 +121,7 @@ def main():
     sorted_histogram =sorted(histogram.items(),key=lambda x: x[1],reverse=True)
     with open("global_test.json", 'w') as f:
         json.dump(dict(sorted_histogram), f, ensure_ascii=False, indent=4)
+    session.report()
 
 if __name__ == "__main__":
     main()